@@ -0,0 +1,320 @@
+"""
+Persistent audio output for the coyote interactive project.
+Keeps one aplay process (and so one open ALSA device) while sounds are playing
+and mixes raw PCM from speech and sound effects into it, instead of opening
+the device per utterance or per effect. After a short idle spell aplay is
+closed, so other players (the one-shot speech pipeline, mpg123, the manager's
+paplay) can open the device; the next sound reopens it.
+"""
+
+import array
+import subprocess
+import threading
+import time
+import warnings
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+# All PCM handed to the output is signed 16-bit little-endian mono at this rate.
+SAMPLE_RATE = 22050
+SAMPLE_WIDTH = 2
+# Size of each write to aplay, and how far ahead of the playback clock we let
+# writes run. Keeping this small keeps stop() and new sounds responsive.
+PERIOD_FRAMES = SAMPLE_RATE // 50
+MAX_LEAD_SECONDS = 0.04
+BUFFER_TIME_US = 60000
+# How long the device is kept open with nothing playing.
+DEFAULT_IDLE_CLOSE_SECONDS = 2.0
+
+
+def resample_pcm(pcm, in_rate, out_rate):
+    """Linear-interpolation resample of 16-bit mono PCM."""
+    if audioop is not None:
+        return audioop.ratecv(pcm, SAMPLE_WIDTH, 1, in_rate, out_rate, None)[0]
+    samples = array.array("h")
+    samples.frombytes(pcm)
+    if len(samples) < 2:
+        return bytes(pcm)
+    step = in_rate / out_rate
+    count = int((len(samples) - 1) / step)
+    out = array.array("h", bytes(count * 2))
+    for index in range(count):
+        position = index * step
+        base = int(position)
+        frac = position - base
+        out[index] = int(samples[base] + (samples[base + 1] - samples[base]) * frac)
+    return out.tobytes()
+
+
+def mix_pcm(chunks):
+    """Sum equal-length 16-bit chunks, clipping instead of wrapping."""
+    if audioop is not None:
+        mixed = chunks[0]
+        for chunk in chunks[1:]:
+            mixed = audioop.add(mixed, chunk, SAMPLE_WIDTH)
+        return mixed
+    total = array.array("h", bytes(len(chunks[0])))
+    for chunk in chunks:
+        samples = array.array("h")
+        samples.frombytes(chunk)
+        for index, sample in enumerate(samples):
+            total[index] = max(-32768, min(32767, total[index] + sample))
+    return total.tobytes()
+
+
+class Playback:
+    """Handle for one sound being played on the output."""
+
+    def __init__(self, pcm):
+        self.pcm = memoryview(pcm)
+        self.position = 0
+        self.done = threading.Event()
+        self.stopped = False
+
+    @property
+    def frames_played(self):
+        return self.position // SAMPLE_WIDTH
+
+    @property
+    def fraction_played(self):
+        """How much of the sound has been played, from 0.0 to 1.0."""
+        return self.position / len(self.pcm) if len(self.pcm) else 1.0
+
+    def stop(self):
+        """Stop playback as soon as the data already handed to ALSA has drained."""
+        self.stopped = True
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class PcmOutput:
+    """
+    Mixes every active Playback into a single long-lived aplay process.
+
+    A sound handed to play() joins the mix on the next period, so triggering
+    one costs at most PERIOD_FRAMES of latency plus what is already buffered.
+    When nothing is playing the mixer thread sleeps and writes nothing, and
+    after `idle_close` seconds of that it closes aplay.
+    """
+
+    def __init__(self, device=None, idle_close=DEFAULT_IDLE_CLOSE_SECONDS):
+        self.device = device
+        self.idle_close = idle_close
+        self.process = None
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.voices = []
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _command(self, device):
+        command = ["aplay", "-q"]
+        if device:
+            command.extend(["-D", device])
+        command.extend([
+            "-r", str(SAMPLE_RATE), "-f", "S16_LE", "-c", "1", "-t", "raw",
+            f"--buffer-time={BUFFER_TIME_US}",
+        ])
+        return command
+
+    def _start_process(self):
+        if self.process is not None and self.process.poll() is None:
+            return self.process
+        self.process = None
+        for device in ([self.device, None] if self.device else [None]):
+            try:
+                process = subprocess.Popen(
+                    self._command(device), stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+            except FileNotFoundError:
+                print("aplay not found; audio output unavailable.")
+                return None
+            # aplay exits straight away when it cannot open the device.
+            time.sleep(0.05)
+            if process.poll() is None:
+                self.process = process
+                return process
+            print(f"Configured speaker device '{device}' failed; retrying default output.")
+        return None
+
+    def _close_process(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            # aplay plays what it has buffered, then exits and lets go of the device.
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def release(self):
+        """Close aplay now if nothing is playing, e.g. before another program plays on the device."""
+        with self.condition:
+            if not self.voices:
+                self._close_process()
+
+    def play(self, pcm):
+        """Start playing PCM, mixed with anything already playing, and return its Playback handle."""
+        playback = Playback(pcm)
+        with self.condition:
+            self.voices.append(playback)
+            self.condition.notify()
+        return playback
+
+    def _write(self, chunk):
+        process = self._start_process()
+        if process is None:
+            return False
+        try:
+            process.stdin.write(chunk)
+            process.stdin.flush()
+            return True
+        except (BrokenPipeError, OSError):
+            self.process = None
+            return False
+
+    def _next_period(self, voices):
+        chunk_bytes = PERIOD_FRAMES * SAMPLE_WIDTH
+        chunks = []
+        for playback in voices:
+            chunk = playback.pcm[playback.position:playback.position + chunk_bytes]
+            playback.position += len(chunk)
+            chunks.append(chunk)
+        if len(chunks) == 1:
+            return chunks[0]
+        # Pad the shorter tails so every voice lines up for mixing.
+        return mix_pcm([bytes(chunk) + bytes(chunk_bytes - len(chunk)) for chunk in chunks])
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.voices:
+                    if self.process is None:
+                        self.condition.wait()
+                    elif not self.condition.wait(self.idle_close) and not self.voices:
+                        self._close_process()
+
+            clock_start = time.monotonic()
+            frames_written = 0
+            draining = []
+            while True:
+                with self.condition:
+                    active = []
+                    for playback in list(self.voices):
+                        if playback.stopped:
+                            self.voices.remove(playback)
+                            playback.done.set()
+                        elif playback.position >= len(playback.pcm):
+                            self.voices.remove(playback)
+                            draining.append((clock_start + frames_written / SAMPLE_RATE, playback))
+                        else:
+                            active.append(playback)
+
+                # Report sounds as done once their last sample has left the device.
+                now = time.monotonic()
+                for end_time, playback in list(draining):
+                    if end_time <= now or playback.stopped:
+                        draining.remove((end_time, playback))
+                        playback.done.set()
+
+                if not active:
+                    if not draining:
+                        break
+                    time.sleep(max(0.0, min(end for end, _ in draining) - now))
+                    continue
+
+                chunk = self._next_period(active)
+                if not self._write(chunk):
+                    with self.condition:
+                        for playback in active:
+                            playback.stopped = True
+                    continue
+                frames_written += len(chunk) // SAMPLE_WIDTH
+                # Pace writes against the playback clock so little sits in the pipe.
+                ahead = clock_start + frames_written / SAMPLE_RATE - time.monotonic()
+                if ahead > MAX_LEAD_SECONDS:
+                    time.sleep(ahead - MAX_LEAD_SECONDS)
+
+
+class AudioArbiter:
+    """
+    Decides whose speech is on the speaker. Sounds played for an interaction
+    (with its CancelToken) stop when that interaction is cancelled, and when a
+    different interaction starts speaking the previous one's sounds are cut off,
+    so two replies never talk over each other. Sounds played without a token,
+    such as effects, are simply mixed in.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.lock = threading.Lock()
+        self.owner = None
+        self.playbacks = []
+
+    def play(self, pcm, token=None):
+        if token is None:
+            return self.output.play(pcm)
+        with self.lock:
+            if token is not self.owner:
+                for playback in self.playbacks:
+                    playback.stop()
+                self.owner = token
+                self.playbacks = []
+            if token.cancelled:
+                playback = Playback(b"")
+                playback.stopped = True
+                playback.done.set()
+                return playback
+            self.playbacks = [playback for playback in self.playbacks if not playback.done.is_set()]
+            playback = self.output.play(pcm)
+            self.playbacks.append(playback)
+        token.on_cancel(playback.stop)
+        return playback
+
+
+_output = None
+_arbiter = None
+_output_lock = threading.Lock()
+
+
+def get_output():
+    """Return the shared PcmOutput on the configured speaker device."""
+    global _output
+    with _output_lock:
+        if _output is None:
+            from config import SPEAKER_DEVICE
+            import config
+            _output = PcmOutput(
+                SPEAKER_DEVICE.strip() if SPEAKER_DEVICE else None,
+                getattr(config, "AUDIO_OUTPUT_IDLE_CLOSE_SECONDS", DEFAULT_IDLE_CLOSE_SECONDS),
+            )
+        return _output
+
+
+def release_output():
+    """Let go of the speaker device, if the shared output holds it and is idle, before playing it another way."""
+    with _output_lock:
+        output = _output
+    if output is not None:
+        output.release()
+
+
+def get_arbiter():
+    """Return the AudioArbiter for the shared output."""
+    global _arbiter
+    output = get_output()
+    with _output_lock:
+        if _arbiter is None:
+            _arbiter = AudioArbiter(output)
+        return _arbiter
@@ -123,4 +123,19 @@ def resolve_capture_device(preferred, preferred_name="", preferred_name_match_in
     if preferred_index in available_cards:
         return str(available_cards.index(preferred_index))
 
-    return "0"
\ No newline at end of file
+    return "0"
+
+
+def resolve_alsa_capture_device(preferred, preferred_name="", preferred_name_match_index=0):
+    """
+    Return an ALSA device string (e.g. "plughw:2,0") for tools like arecord.
+    Uses the same selection rules as resolve_capture_device.
+    """
+    devices = _capture_device_details()
+    available_cards = sorted({dev["card"] for dev in devices})
+    if not available_cards:
+        return "default"
+    index = int(resolve_capture_device(preferred, preferred_name, preferred_name_match_index))
+    card = available_cards[min(index, len(available_cards) - 1)]
+    device = next((dev["device"] for dev in devices if dev["card"] == card), 0)
+    return f"plughw:{card},{device}"
@@ -0,0 +1,149 @@
+"""
+Resident speech recognizer for the intercom.
+
+Keeps a whisper-server process running with PERSON_WHISPER_MODEL loaded and
+keeps the intercom mic open, so a button press only has to mark where the
+utterance starts and ends. The captured span is sent to the already-loaded
+model; no model load or fixed start-up delay sits in front of each exchange.
+Because the mic is always recording into a ring buffer, the span can start a
+little before the press, so the first word is not clipped.
+"""
+
+import subprocess
+import threading
+import time
+
+try:
+    from audio_to_text.audio_device import resolve_alsa_capture_device
+    from audio_to_text.ring_buffer import PcmRingBuffer
+    from audio_to_text.whisper_server import WhisperServer, SAMPLE_RATE, SAMPLE_WIDTH
+except ModuleNotFoundError:
+    from audio_device import resolve_alsa_capture_device
+    from ring_buffer import PcmRingBuffer
+    from whisper_server import WhisperServer, SAMPLE_RATE, SAMPLE_WIDTH
+
+BYTES_PER_SECOND = SAMPLE_RATE * SAMPLE_WIDTH
+READ_BYTES = BYTES_PER_SECOND // 50
+
+
+class PersonSpeechService:
+    """whisper-server with the person model loaded, fed from an always-open intercom mic."""
+
+    def __init__(self, whisper_model, threads, mic, mic_name="", mic_match_index=0,
+                 port=8910, buffer_seconds=40, preroll_seconds=0.5):
+        self.mic = mic
+        self.mic_name = mic_name
+        self.mic_match_index = mic_match_index
+        self.buffer = PcmRingBuffer(int(buffer_seconds * BYTES_PER_SECOND), SAMPLE_WIDTH)
+        self.preroll_bytes = int(preroll_seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+        self.server = WhisperServer(whisper_model, threads, port)
+        self.recorder = None
+        self.reader = None
+
+    def start(self):
+        """Start the recognizer and the mic. Returns False if either could not be started."""
+        if not self.server.start():
+            return False
+        try:
+            device = resolve_alsa_capture_device(self.mic, self.mic_name, self.mic_match_index)
+            self.recorder = subprocess.Popen(
+                ["arecord", "-q", "-D", device, "-f", "S16_LE", "-r", str(SAMPLE_RATE), "-c", "1", "-t", "raw"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            print(f"Person speech service unavailable: {e}")
+            self.stop()
+            return False
+        print(f"Person speech service listening on {device}.")
+        self.reader = threading.Thread(target=self._read_mic, daemon=True)
+        self.reader.start()
+        return True
+
+    def _read_mic(self):
+        # Read straight into the ring so capturing allocates nothing per frame.
+        recorder = self.recorder
+        while recorder is not None and recorder.poll() is None:
+            count = recorder.stdout.readinto(self.buffer.write_view(READ_BYTES))
+            if not count:
+                break
+            self.buffer.commit(count)
+
+    def is_running(self):
+        return self.server.is_running() and self.recorder is not None and self.recorder.poll() is None
+
+    def transcribe(self, pcm):
+        """Send captured PCM (bytes or a memoryview) to the resident model and return the text, or None on failure."""
+        return self.server.transcribe(pcm)
+
+    def capture_utterance(self, bm, max_duration=30, tap_duration=5, post_roll=0.3, pressed_at=None):
+        """
+        Capture from just before the press until the intercom button is released, then transcribe.
+        A press released almost immediately is treated as a tap and records tap_duration seconds.
+        `pressed_at` is the time.monotonic() of the press when capture starts some time after it.
+        Returns the text, or None if the service failed.
+        """
+        started_at = time.monotonic() if pressed_at is None else pressed_at
+        lag_bytes = int((time.monotonic() - started_at) * SAMPLE_RATE) * SAMPLE_WIDTH
+        start = max(self.buffer.start_position(), self.buffer.position() - self.preroll_bytes - lag_bytes)
+        released = threading.Event()
+
+        def on_release():
+            released.set()
+
+        bm.register_release_callback(on_release)
+        try:
+            if bm.get_initial_state():
+                # Poll as a backstop in case the release edge is missed.
+                while not released.wait(0.1):
+                    if not bm.get_initial_state() or time.monotonic() - started_at >= max_duration:
+                        break
+            held_for = time.monotonic() - started_at
+            if held_for < 0.5:
+                time.sleep(max(0.0, tap_duration - held_for))
+            else:
+                time.sleep(post_roll)
+        finally:
+            bm.unregister_release_callback(on_release)
+
+        end = self.buffer.position()
+        return self.transcribe(self.buffer.span(start, end))
+
+    def stop(self):
+        if self.recorder is not None and self.recorder.poll() is None:
+            self.recorder.terminate()
+            try:
+                self.recorder.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.recorder.kill()
+        self.recorder = None
+        self.server.stop()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_person_speech_service(config):
+    """Return the shared, started PersonSpeechService, or None if it is disabled or failed to start."""
+    global _service
+    if not getattr(config, "PERSON_SPEECH_SERVICE", False):
+        return None
+    with _service_lock:
+        if _service is None:
+            service = PersonSpeechService(
+                config.PERSON_WHISPER_MODEL,
+                config.PERSON_THREADS,
+                config.PERSON_MIC_NUMBER,
+                getattr(config, "PERSON_MIC_NAME_MATCH", ""),
+                getattr(config, "PERSON_MIC_MATCH_INDEX", 0),
+                port=getattr(config, "PERSON_WHISPER_SERVER_PORT", 8910),
+                preroll_seconds=getattr(config, "PERSON_PREROLL_SECONDS", 0.5),
+            )
+            if not service.start():
+                return None
+            _service = service
+        if not _service.is_running():
+            # Release the mic so the whisper-stream fallback can use it; retry on the next press.
+            _service.stop()
+            _service = None
+        return _service
@@ -0,0 +1,121 @@
+"""
+Products the television has been advertising lately, extracted as the transcript streams in.
+
+Each usable transcript record is scanned for product names and prices:
+  - names are runs of capitalized words (whisper capitalizes brand and product
+    names), minus leading sentence words like "The" or "Order"; a lone
+    capitalized word that starts a sentence is skipped, since it is usually
+    just the start of the sentence
+  - prices are dollar amounts like "$19.99", credited to the names heard in
+    the same segment
+A ProductIndex counts how often each name is repeated, weighting mentions by
+how recent they are, so the product being pitched right now ranks first.
+"""
+
+import re
+import threading
+import time
+
+DEFAULT_MAX_AGE_SECONDS = 600
+DEFAULT_HALF_LIFE_SECONDS = 120
+DEFAULT_MIN_MENTIONS = 2
+MAX_NAME_WORDS = 4
+# A price heard with a name makes it more likely to be the product for sale.
+PRICE_BONUS = 1.5
+
+_WORD = re.compile(r"\$?\d[\d,.]*|[A-Za-z][A-Za-z0-9'&-]*|[.!?]")
+_PRICE = re.compile(r"\$\d+(?:,\d{3})*(?:\.\d{2})?")
+# Capitalized words that start pitches rather than name products.
+_NOT_NAMES = {
+    "a", "after", "all", "an", "and", "are", "as", "at", "because", "before", "best", "big", "but",
+    "buy", "call", "can", "check", "do", "don't", "each", "every", "for", "free", "from", "get",
+    "go", "good", "great", "he", "here", "hey", "how", "i", "i'm", "if", "imagine", "in", "is", "it",
+    "it's", "just", "let's", "like", "look", "more", "my", "new", "no", "not", "now", "oh", "ok",
+    "okay", "on", "only", "or", "order", "our", "plus", "right", "see", "she", "so", "that",
+    "that's", "the", "then", "there", "these", "they", "this", "those", "to", "today", "tonight",
+    "try", "we", "we're", "well", "what", "when", "where", "which", "who", "why", "with", "yes",
+    "you", "you'll", "you're", "your",
+}
+
+
+def extract_mentions(text):
+    """Return (names, prices) heard in one transcript segment."""
+    names = []
+    run = []
+    sentence_start = True
+    for word in _WORD.findall(text) + ["."]:
+        if word[0].isupper() and not (not run and word.lower() in _NOT_NAMES):
+            if not run:
+                run_at_sentence_start = sentence_start
+            run.append(word)
+        else:
+            if run and not (len(run) == 1 and run_at_sentence_start):
+                names.append(" ".join(run[:MAX_NAME_WORDS]))
+            run = []
+        sentence_start = word in ".!?"
+    return names, _PRICE.findall(text)
+
+
+class Product:
+    """A name the television has repeated, with when it was heard and the last price heard with it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.mentions = []
+        self.price = None
+
+    def score(self, now, half_life):
+        score = sum(0.5 ** ((now - heard_at) / half_life) for heard_at in self.mentions)
+        return score * PRICE_BONUS if self.price else score
+
+    def as_dict(self, now, half_life):
+        return {
+            "name": self.name,
+            "mentions": len(self.mentions),
+            "price": self.price,
+            "first_heard": self.mentions[0],
+            "last_heard": self.mentions[-1],
+            "score": round(self.score(now, half_life), 3),
+        }
+
+
+class ProductIndex:
+    """Ranked, thread-safe index of the products mentioned in recent transcript records."""
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE_SECONDS, half_life=DEFAULT_HALF_LIFE_SECONDS,
+                 min_mentions=DEFAULT_MIN_MENTIONS):
+        self.max_age = max_age
+        self.half_life = half_life
+        self.min_mentions = min_mentions
+        self.lock = threading.Lock()
+        self.products = {}
+
+    def add_record(self, record):
+        """Index the names and prices in a transcript record (see transcript_records)."""
+        names, prices = extract_mentions(record["text"])
+        with self.lock:
+            for name in names:
+                product = self.products.setdefault(name.lower(), Product(name))
+                # The most recent spelling wins, e.g. "Shamwow" then "ShamWow".
+                product.name = name
+                product.mentions.append(record["time"])
+                if prices:
+                    product.price = prices[-1]
+
+    def _forget_old(self, now):
+        for key, product in list(self.products.items()):
+            product.mentions = [heard_at for heard_at in product.mentions if now - heard_at <= self.max_age]
+            if not product.mentions:
+                del self.products[key]
+
+    def top(self, n=1, now=None):
+        """The `n` highest-ranked products mentioned at least min_mentions times, as dicts, best first."""
+        now = now if now is not None else time.time()
+        with self.lock:
+            self._forget_old(now)
+            ranked = sorted(
+                (p for p in self.products.values() if len(p.mentions) >= self.min_mentions),
+                key=lambda p: p.score(now, self.half_life),
+                reverse=True,
+            )
+            return [product.as_dict(now, self.half_life) for product in ranked[:n]]
@@ -0,0 +1,74 @@
+"""
+Fixed-size capture ring buffer for raw PCM.
+
+The storage is one bytearray allocated up front and twice the capacity long:
+every write lands in the first half and is mirrored into the second, so any
+span up to `capacity` bytes is contiguous and can be handed out as a
+memoryview without copying or reassembling chunks. Positions are absolute
+byte offsets in the capture stream, so a caller can remember "where the press
+happened" and ask for that span later.
+"""
+
+import threading
+
+
+class PcmRingBuffer:
+    """Holds the most recent `capacity` bytes of a PCM stream."""
+
+    def __init__(self, capacity, sample_width=2):
+        # Keep whole samples at the wrap point.
+        self.capacity = capacity - capacity % sample_width
+        self.sample_width = sample_width
+        self.storage = bytearray(self.capacity * 2)
+        self.view = memoryview(self.storage)
+        self.lock = threading.Lock()
+        self.end_position = 0
+
+    def position(self):
+        """Absolute byte offset of the newest sample written."""
+        return self.end_position
+
+    def start_position(self):
+        """Absolute byte offset of the oldest sample still held."""
+        return max(0, self.end_position - self.capacity)
+
+    def write_view(self, max_bytes):
+        """
+        Return a writable view into the ring for the next write, at most max_bytes long.
+        Fill it (e.g. with readinto) and then call commit() with the byte count.
+        """
+        offset = self.end_position % self.capacity
+        return self.view[offset:offset + min(max_bytes, self.capacity - offset)]
+
+    def commit(self, count):
+        """Publish `count` bytes written through write_view()."""
+        offset = self.end_position % self.capacity
+        self.view[self.capacity + offset:self.capacity + offset + count] = self.view[offset:offset + count]
+        with self.lock:
+            self.end_position += count
+
+    def write(self, data):
+        """Copy bytes into the ring."""
+        data = memoryview(data).cast("B")
+        while len(data):
+            target = self.write_view(len(data))
+            count = len(target)
+            target[:] = data[:count]
+            self.commit(count)
+            data = data[count:]
+
+    def span(self, start, end):
+        """
+        Return a zero-copy memoryview of the bytes between two absolute positions,
+        clamped to what is still held and trimmed to whole samples. The view is
+        only valid until the writer laps it, i.e. for `capacity` bytes of new audio.
+        """
+        with self.lock:
+            end = min(end, self.end_position)
+            start = max(start, self.end_position - self.capacity, 0)
+        start -= start % self.sample_width
+        if end <= start:
+            return self.view[0:0]
+        end -= (end - start) % self.sample_width
+        offset = start % self.capacity
+        return self.view[offset:offset + (end - start)]
@@ -1,10 +1,25 @@
 import os
+import queue
 import subprocess
 import argparse
+import threading
+import time
 try:
-    from audio_to_text.audio_device import resolve_capture_device
+    from audio_to_text.audio_device import resolve_capture_device, resolve_alsa_capture_device
+    from audio_to_text.voice_activity import VoiceActivitySegmenter
+    from audio_to_text.whisper_server import WhisperServer, SAMPLE_RATE, SAMPLE_WIDTH
+    from audio_to_text.transcript_service import TranscriptRing, start_transcript_server
+    from audio_to_text.transcript_archive import TranscriptLog
+    from audio_to_text.transcript_records import record_from_whisper_segment, strip_tags, is_usable
+    from audio_to_text.product_mentions import ProductIndex
 except ModuleNotFoundError:
-    from audio_device import resolve_capture_device
+    from audio_device import resolve_capture_device, resolve_alsa_capture_device
+    from voice_activity import VoiceActivitySegmenter
+    from whisper_server import WhisperServer, SAMPLE_RATE, SAMPLE_WIDTH
+    from transcript_service import TranscriptRing, start_transcript_server
+    from transcript_archive import TranscriptLog
+    from transcript_records import record_from_whisper_segment, strip_tags, is_usable
+    from product_mentions import ProductIndex
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Transcribe audio continuously.')
@@ -14,6 +29,16 @@ parser.add_argument('--threads', type=str, default="2", help='Number of threads
 parser.add_argument('--mic', type=str, default="0", help='Capture device ID for whisper-stream')
 parser.add_argument('--mic_name', type=str, default="", help='Optional mic name substring to match (preferred over --mic)')
 parser.add_argument('--mic_match_index', type=int, default=0, help='When mic_name matches multiple devices, choose this zero-based match index')
+parser.add_argument('--vad', action='store_true', help='Only send speech segments (found by voice activity detection) to whisper-server')
+parser.add_argument('--server_port', type=int, default=8911, help='Port for whisper-server in --vad mode')
+parser.add_argument('--socket_path', type=str, default="", help='Unix socket to serve recent transcript segments on (off when empty)')
+parser.add_argument('--archive_dir', type=str, default="", help='Where rotated, compressed transcript segments go (default: transcript_archive next to the log)')
+parser.add_argument('--rotate_bytes', type=int, default=1024 * 1024, help='Rotate the log into the archive once it reaches this size')
+parser.add_argument('--rotate_seconds', type=int, default=24 * 60 * 60, help='Rotate the log into the archive once it is this old')
+parser.add_argument('--min_avg_prob', type=float, default=0.4, help='Leave segments whisper was less sure of than this out of the log')
+parser.add_argument('--max_no_speech_prob', type=float, default=0.6, help='Flag segments whisper thinks are this likely to be non-speech')
+parser.add_argument('--product_seconds', type=int, default=600, help='How long product mentions count towards the products served on the socket')
+parser.add_argument('--ring_segments', type=int, default=500, help='How many recent segments to keep in memory for the socket')
 args = parser.parse_args()
 
 # Assign args to local variables
@@ -23,6 +48,9 @@ threads = args.threads
 mic = args.mic
 mic_name = args.mic_name
 mic_match_index = args.mic_match_index
+use_vad = args.vad
+server_port = args.server_port
+socket_path = args.socket_path
 resolved_mic = resolve_capture_device(mic, mic_name, mic_match_index)
 if mic_name:
     print(f"Using capture device {resolved_mic} for mic name match: '{mic_name}' at index {mic_match_index}.")
@@ -32,51 +60,178 @@ elif resolved_mic != str(mic):
 # Ensure the heard directory exists
 os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
 
-# Create the log file if it does not exist
-if not os.path.exists(log_file_path):
-    open(log_file_path, 'w').close()
-
-# Define the stream command
-command = [
-    'whisper-stream',
-    '-m', whisper_model,
-    '--step', '4500',
-    '--length', '5000',
-    '-c', resolved_mic,
-    '-t', threads,
-    '-ac', '512',
-    '--keep', '85'
-]
-
-# Start the stream process
-process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+# One handle on the log for the life of the process, rotated into a compressed archive
+archive_dir = args.archive_dir or os.path.join(os.path.dirname(log_file_path), "transcript_archive")
+transcript_log = TranscriptLog(log_file_path, archive_dir, args.rotate_bytes, args.rotate_seconds)
+
+# Recent segments with their capture times, and the products they mention, served to consumers over socket_path
+transcript_ring = TranscriptRing(args.ring_segments)
+product_index = ProductIndex(max_age=args.product_seconds)
+transcript_server = start_transcript_server(transcript_ring, socket_path, product_index) if socket_path else None
+
+# Fixed whisper-stream windows: 5 s of audio is recognized every 4.5 s.
+STREAM_STEP_MS = 4500
+STREAM_LENGTH_MS = 5000
+# How often (in seconds of audio heard) to report the recognition work VAD saved.
+VAD_REPORT_SECONDS = 300
+
+
+def keep_line(line):
+    """Drop whisper-stream's terminal control (line redraw) output."""
+    return "[2K" not in line
+
+
+def record_segment(record):
+    """
+    Publish a transcript record: every record with text goes to the in-memory ring, where
+    consumers see its confidence; only usable ones are written to the log file.
+    """
+    if not record["text"]:
+        return
+    transcript_ring.add_record(record)
+    if is_usable(record, args.min_avg_prob):
+        transcript_log.write(record["text"], record["time"])
+        product_index.add_record(record)
+
+
+def report_vad_savings(segmenter):
+    heard = segmenter.seconds_heard
+    sent = segmenter.seconds_sent
+    # whisper-stream recognizes STREAM_LENGTH_MS of audio every STREAM_STEP_MS, speech or not.
+    stream_seconds = heard * STREAM_LENGTH_MS / STREAM_STEP_MS
+    saved = 1 - sent / stream_seconds if stream_seconds else 0.0
+    print(f"VAD: heard {heard:.0f}s, sent {sent:.0f}s to whisper "
+          f"({segmenter.fraction_skipped():.0%} skipped, ~{saved:.0%} less recognition work than fixed windows).")
+
+
+def transcribe_with_vad():
+    """
+    arecord -> VoiceActivitySegmenter -> whisper-server, one request per speech segment.
+    Returns False without transcribing if whisper-server or arecord is unavailable.
+    """
+    server = WhisperServer(whisper_model, threads, server_port)
+    if not server.start():
+        return False
+    device = resolve_alsa_capture_device(mic, mic_name, mic_match_index)
+    try:
+        recorder = subprocess.Popen(
+            ['arecord', '-q', '-D', device, '-f', 'S16_LE', '-r', str(SAMPLE_RATE), '-c', '1', '-t', 'raw'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError as e:
+        print(f"arecord unavailable: {e}")
+        server.stop()
+        return False
+    stream_started = time.time()
+    print(f"Transcribing speech segments from {device} with voice activity detection.")
+
+    segmenter = VoiceActivitySegmenter(SAMPLE_RATE)
+    segments = queue.Queue()
+
+    # Recognize on a separate thread so the mic is always being read.
+    def recognize():
+        while True:
+            segment = segments.get()
+            if segment is None:
+                return
+            start, pcm = segment
+            whisper_segments = server.transcribe_segments(pcm)
+            if whisper_segments is None:
+                if not server.is_running():
+                    print("whisper-server stopped; ending transcription.")
+                    recorder.terminate()
+                    return
+                continue
+            for whisper_segment in whisper_segments:
+                record_segment(record_from_whisper_segment(
+                    whisper_segment, stream_started + start, args.max_no_speech_prob))
+
+    recognizer = threading.Thread(target=recognize, daemon=True)
+    recognizer.start()
+    next_report = VAD_REPORT_SECONDS
+    try:
+        while True:
+            data = recorder.stdout.read(SAMPLE_RATE * SAMPLE_WIDTH // 10)
+            if not data:
+                break
+            for segment in segmenter.feed(data):
+                segments.put(segment)
+            if segmenter.seconds_heard >= next_report:
+                report_vad_savings(segmenter)
+                next_report += VAD_REPORT_SECONDS
+    except KeyboardInterrupt:
+        print('Stopping...')
+    finally:
+        # Speech still going when the stream ended is recognized too.
+        last_segment = segmenter.flush()
+        if last_segment is not None:
+            segments.put(last_segment)
+        report_vad_savings(segmenter)
+        recorder.terminate()
+        try:
+            recorder.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            recorder.kill()
+        segments.put(None)
+        recognizer.join(timeout=10)
+        server.stop()
+    if recorder.returncode not in (0, None, -15):
+        raise SystemExit(f'Error: arecord exited with code {recorder.returncode}')
+    return True
+
+
+def transcribe_with_whisper_stream():
+    # Define the stream command
+    command = [
+        'whisper-stream',
+        '-m', whisper_model,
+        '--step', str(STREAM_STEP_MS),
+        '--length', str(STREAM_LENGTH_MS),
+        '-c', resolved_mic,
+        '-t', threads,
+        '-ac', '512',
+        '--keep', '85'
+    ]
+
+    # Start the stream process
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    try:
+        # Continuously read the output
+        while True:
+            line = process.stdout.readline()
+            if not line:
+                break  # If no output, break the loop
+
+            if keep_line(line):
+                # The line covers the window that just ended; whisper-stream gives no confidence.
+                now = time.time()
+                record_segment({"time": now - STREAM_LENGTH_MS / 1000, "end": now, "text": strip_tags(line),
+                                "avg_prob": None, "no_speech": False})
+                #print(f' {line.strip()}')
+    except KeyboardInterrupt:
+        # Handle Ctrl+C gracefully
+        print('Stopping...')
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait(timeout=5)
+
+        # Check if the process exited with an error
+        if process.returncode != 0:
+            print(f'Error: whisper-stream exited with code {process.returncode}')
+            # Optionally, read and print the stderr
+            stderr_output = process.stderr.read()
+            print(f'Error output: {stderr_output}')
+
 
 try:
-    # Continuously read the output
-    while True:
-        line = process.stdout.readline()
-        if not line:
-            break  # If no output, break the loop
-
-        if "[2K" not in line and "[" not in line and "(" not in line:
-            with open(log_file_path, 'a') as log_file:
-                log_file.write(line)
-                log_file.flush()  # Flush the file to ensure the content is written immediately
-            #print(f' {line.strip()}')
-except KeyboardInterrupt:
-    # Handle Ctrl+C gracefully
-    print('Stopping...')
+    if not (use_vad and transcribe_with_vad()):
+        transcribe_with_whisper_stream()
 finally:
-    process.terminate()
-    try:
-        process.wait(timeout=5)
-    except subprocess.TimeoutExpired:
-        process.kill()
-        process.wait(timeout=5)
-
-    # Check if the process exited with an error
-    if process.returncode != 0:
-        print(f'Error: whisper-stream exited with code {process.returncode}')
-        # Optionally, read and print the stderr
-        stderr_output = process.stderr.read()
-        print(f'Error output: {stderr_output}')
+    if transcript_server is not None:
+        transcript_server.close()
+    transcript_log.close()
@@ -0,0 +1,217 @@
+"""
+Transcript log with rotation into compressed, time-indexed archive segments.
+
+TranscriptLog keeps a single handle on the live transcript file open for the
+life of the transcriber. When the file passes a size or age limit it is
+compressed into the archive directory and a fresh live file is started. While
+writing, it notes a checkpoint (capture time, byte offset) about once a
+minute. Each checkpoint starts a new gzip member in the archived segment, so
+one stretch of time can be read back by seeking to its member and
+decompressing only that.
+
+The archive's index.jsonl has one line per segment:
+  {"file": "...txt.gz", "start": t0, "end": t1, "lines": n,
+   "members": [[time, compressed_offset], ...]}
+Checkpoints for the live file are kept in live_checkpoints.jsonl so they
+survive a restart of the transcriber.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+
+INDEX_FILE = "index.jsonl"
+LIVE_CHECKPOINTS_FILE = "live_checkpoints.jsonl"
+CHECKPOINT_SECONDS = 60
+DEFAULT_ROTATE_BYTES = 1024 * 1024
+DEFAULT_ROTATE_SECONDS = 24 * 60 * 60
+
+
+def _read_jsonl(path):
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # A torn last line from a power cut
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def _append_jsonl(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class TranscriptLog:
+    """The live transcript file, held open, rotated into the archive by size or age."""
+
+    def __init__(self, path, archive_dir, rotate_bytes=DEFAULT_ROTATE_BYTES,
+                 rotate_seconds=DEFAULT_ROTATE_SECONDS):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.checkpoints_path = os.path.join(archive_dir, LIVE_CHECKPOINTS_FILE)
+        self.lock = threading.Lock()
+        os.makedirs(archive_dir, exist_ok=True)
+        self.checkpoints = [(c["time"], c["offset"]) for c in _read_jsonl(self.checkpoints_path)]
+        rotating_path = path + ".rotating"
+        if os.path.exists(rotating_path):
+            # The last run stopped part way through a rotation; its checkpoints describe that file.
+            modified = os.path.getmtime(rotating_path)
+            self._archive(rotating_path, self.checkpoints or [(modified, 0)], modified)
+            self._clear_checkpoints()
+        self.handle = open(path, "a", encoding="utf-8")
+        self.size = self.handle.tell()
+        if self.size and not self.checkpoints:
+            # A file from before the archive existed; all we know is when it was last written.
+            self._add_checkpoint(os.path.getmtime(path), 0)
+
+    def _clear_checkpoints(self):
+        self.checkpoints = []
+        try:
+            os.remove(self.checkpoints_path)
+        except FileNotFoundError:
+            pass
+
+    def _add_checkpoint(self, captured_at, offset):
+        self.checkpoints.append((captured_at, offset))
+        _append_jsonl(self.checkpoints_path, {"time": captured_at, "offset": offset})
+
+    def write(self, text, captured_at=None):
+        """Append one line. The handle stays open; each line is flushed so readers see it."""
+        captured_at = captured_at if captured_at is not None else time.time()
+        data = text.rstrip("\n") + "\n"
+        with self.lock:
+            if self._should_rotate(captured_at):
+                self._rotate(captured_at)
+            if not self.checkpoints or captured_at - self.checkpoints[-1][0] >= CHECKPOINT_SECONDS:
+                self._add_checkpoint(captured_at, self.size)
+            self.handle.write(data)
+            self.handle.flush()
+            self.size += len(data.encode("utf-8"))
+
+    def _should_rotate(self, now):
+        if not self.size or not self.checkpoints:
+            return False
+        return self.size >= self.rotate_bytes or now - self.checkpoints[0][0] >= self.rotate_seconds
+
+    def _rotate(self, now):
+        self.handle.close()
+        rotating_path = self.path + ".rotating"
+        os.replace(self.path, rotating_path)
+        # Start the new live file straight away; readers notice the new inode.
+        self.handle = open(self.path, "a", encoding="utf-8")
+        self.size = 0
+        self._archive(rotating_path, self.checkpoints, now)
+        # Only now are the old checkpoints no longer needed to recover the rotation.
+        self._clear_checkpoints()
+
+    def _archive(self, source_path, checkpoints, end_time):
+        start_time = checkpoints[0][0]
+        stem = "transcription-" + time.strftime("%Y%m%dT%H%M%S", time.localtime(start_time))
+        name = stem + ".txt.gz"
+        # Two segments can start in the same second (e.g. a tiny rotate_bytes); never overwrite one.
+        counter = 1
+        while os.path.exists(os.path.join(self.archive_dir, name)):
+            name = f"{stem}-{counter}.txt.gz"
+            counter += 1
+        archive_path = os.path.join(self.archive_dir, name)
+        members = []
+        line_count = 0
+        with open(source_path, "rb") as source, open(archive_path + ".tmp", "wb") as out:
+            offsets = [offset for _, offset in checkpoints] + [None]
+            for (captured_at, offset), next_offset in zip(checkpoints, offsets[1:]):
+                source.seek(offset)
+                data = source.read() if next_offset is None else source.read(next_offset - offset)
+                if not data:
+                    continue
+                members.append([captured_at, out.tell()])
+                out.write(gzip.compress(data))
+                line_count += data.count(b"\n")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(archive_path + ".tmp", archive_path)
+        _append_jsonl(os.path.join(self.archive_dir, INDEX_FILE), {
+            "file": name, "start": start_time, "end": end_time, "lines": line_count, "members": members,
+        })
+        os.remove(source_path)
+
+    def close(self):
+        with self.lock:
+            self.handle.close()
+
+
+def _member_lines(path, offset, end_offset):
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read() if end_offset is None else f.read(end_offset - offset)
+    return gzip.decompress(data).decode("utf-8", errors="replace").splitlines()
+
+
+def last_archived_lines(archive_dir, n):
+    """The last `n` lines of the newest archived segment, oldest first; [] if there is none."""
+    segments = _read_jsonl(os.path.join(archive_dir, INDEX_FILE))
+    if not segments or n <= 0:
+        return []
+    segment = segments[-1]
+    path = os.path.join(archive_dir, segment["file"])
+    offsets = [offset for _, offset in segment["members"]]
+    lines = []
+    # Members are read newest first until there are enough lines.
+    for index in range(len(offsets) - 1, -1, -1):
+        end_offset = offsets[index + 1] if index + 1 < len(offsets) else None
+        try:
+            member = _member_lines(path, offsets[index], end_offset)
+        except (OSError, EOFError, gzip.BadGzipFile) as e:
+            print(f"Could not read transcript archive {path}: {e}")
+            break
+        lines = [line.strip() for line in member if line.strip()] + lines
+        if len(lines) >= n:
+            break
+    return lines[-n:]
+
+
+def lines_between(log_path, archive_dir, start_time, end_time):
+    """
+    Transcript lines from roughly start_time to end_time, oldest first, read from the archive
+    and the live file. Resolution is one checkpoint (about a minute): whole members are returned.
+    """
+    lines = []
+    for segment in _read_jsonl(os.path.join(archive_dir, INDEX_FILE)):
+        if segment["end"] < start_time or segment["start"] > end_time:
+            continue
+        path = os.path.join(archive_dir, segment["file"])
+        members = segment["members"]
+        for index, (member_time, offset) in enumerate(members):
+            following = members[index + 1] if index + 1 < len(members) else None
+            member_end = following[0] if following else segment["end"]
+            if member_end < start_time or member_time > end_time:
+                continue
+            try:
+                lines.extend(_member_lines(path, offset, following[1] if following else None))
+            except (OSError, EOFError, gzip.BadGzipFile) as e:
+                print(f"Could not read transcript archive {path}: {e}")
+
+    checkpoints = [(c["time"], c["offset"]) for c in _read_jsonl(os.path.join(archive_dir, LIVE_CHECKPOINTS_FILE))]
+    ranges = [(captured_at, offset, following[1] if following else None, following[0] if following else time.time())
+              for (captured_at, offset), following in zip(checkpoints, checkpoints[1:] + [None])]
+    try:
+        with open(log_path, "rb") as f:
+            for captured_at, offset, end_offset, range_end in ranges:
+                if range_end < start_time or captured_at > end_time:
+                    continue
+                f.seek(offset)
+                data = f.read() if end_offset is None else f.read(end_offset - offset)
+                lines.extend(data.decode("utf-8", errors="replace").splitlines())
+    except FileNotFoundError:
+        pass
+    return [line.strip() for line in lines if line.strip()]
@@ -0,0 +1,120 @@
+"""
+Read the end of the television transcript without reading the whole file.
+
+The transcript is append-only and grows for as long as the transcriber runs,
+but callers only ever want its last few lines. TranscriptTail keeps the start
+offsets of the last `max_lines` lines. The first call finds them by reading
+backwards from the end of the file; after that only the bytes appended since
+the previous call are scanned. last_lines(n) then does a single read of just
+those n lines, so its cost does not depend on how big the file has grown.
+"""
+
+import collections
+import os
+import threading
+
+BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_LINES = 200
+
+
+class TranscriptTail:
+    """Incrementally maintained index of the last line starts in an append-only text file."""
+
+    def __init__(self, path, max_lines=DEFAULT_MAX_LINES):
+        self.path = path
+        self.max_lines = max_lines
+        self.lock = threading.Lock()
+        self.starts = collections.deque(maxlen=max_lines + 1)
+        self.indexed_to = 0
+        self.file_id = None
+
+    def _reset(self):
+        self.starts.clear()
+        self.indexed_to = 0
+        self.file_id = None
+
+    def _index_backwards(self, f, size):
+        # Walk back a block at a time until enough line breaks have been seen.
+        starts = []
+        position = size
+        while position > 0 and len(starts) <= self.max_lines:
+            read_from = max(0, position - BLOCK_SIZE)
+            f.seek(read_from)
+            block = f.read(position - read_from)
+            index = len(block)
+            while len(starts) <= self.max_lines:
+                index = block.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                starts.append(read_from + index + 1)
+            position = read_from
+        if position == 0 and len(starts) <= self.max_lines:
+            starts.append(0)
+        self.starts.extend(sorted(starts))
+
+    def _index_appended(self, f, size):
+        f.seek(self.indexed_to)
+        position = self.indexed_to
+        while position < size:
+            block = f.read(min(BLOCK_SIZE, size - position))
+            if not block:
+                break
+            index = block.find(b"\n")
+            while index >= 0:
+                self.starts.append(position + index + 1)
+                index = block.find(b"\n", index + 1)
+            position += len(block)
+
+    def _refresh(self, f):
+        stat = os.fstat(f.fileno())
+        file_id = (stat.st_dev, stat.st_ino)
+        size = stat.st_size
+        # A new or truncated file (e.g. after rotation) is indexed from scratch.
+        if file_id != self.file_id or size < self.indexed_to:
+            self._reset()
+            self.file_id = file_id
+            self._index_backwards(f, size)
+        elif size > self.indexed_to:
+            self._index_appended(f, size)
+        self.indexed_to = size
+        return size
+
+    def last_lines(self, n):
+        """Return the last `n` lines, oldest first, stripped and with blank ones dropped. Missing file gives []."""
+        n = min(n, self.max_lines)
+        if n <= 0:
+            return []
+        with self.lock:
+            try:
+                with open(self.path, "rb") as f:
+                    size = self._refresh(f)
+                    # A start at the very end of the file belongs to a line not written yet.
+                    starts = [start for start in self.starts if start < size]
+                    if not starts:
+                        return []
+                    f.seek(starts[max(0, len(starts) - n)])
+                    data = f.read(size - f.tell())
+            except FileNotFoundError:
+                self._reset()
+                return []
+        lines = [line.strip() for line in data.decode("utf-8", errors="replace").splitlines()]
+        return [line for line in lines if line][-n:]
+
+
+_tails = {}
+_tails_lock = threading.Lock()
+
+
+def get_transcript_tail(path):
+    """Return the shared TranscriptTail for a transcript file."""
+    path = os.path.abspath(path)
+    with _tails_lock:
+        tail = _tails.get(path)
+        if tail is None:
+            tail = _tails[path] = TranscriptTail(path)
+        return tail
+
+
+def read_last_lines(path, n):
+    """Convenience wrapper: the last `n` lines of `path`, as last_lines() returns them."""
+    return get_transcript_tail(path).last_lines(n)
@@ -0,0 +1,90 @@
+"""
+Structured transcript records and the filter that decides which are worth keeping.
+
+A record is a dict:
+  {"time": start, "end": end, "text": "...", "avg_prob": 0.83, "no_speech": False}
+Times are wall-clock seconds. avg_prob is the mean token probability whisper
+gave the text (None when it is not known) and no_speech is whisper's own call
+that the audio held no speech. Text has whisper's non-speech tags such as
+"[BLANK_AUDIO]" or "(music)" removed, but ordinary parenthesized words are kept.
+"""
+
+import math
+import re
+
+DEFAULT_MIN_AVG_PROB = 0.4
+DEFAULT_MAX_NO_SPEECH_PROB = 0.6
+# Lines whisper is known to invent over silence, music and applause.
+DEFAULT_HALLUCINATIONS = [
+    "thank you for watching",
+    "thanks for watching",
+    "please subscribe",
+    "subtitles by the amara.org community",
+]
+# Also invented over silence, but real hosts say them too: dropped only when whisper was not confident.
+DEFAULT_MARGINAL_HALLUCINATIONS = [
+    "thank you",
+    "you",
+]
+CONFIDENT_AVG_PROB = 0.7
+
+_BRACKET_TAG = re.compile(r"\[[^\]]*\]")
+_SOUND_TAG = re.compile(
+    r"[\(\*]\s*(?:music|applause|laughter|laughs|silence|inaudible|static|noise|cheering|"
+    r"coughing|sighs|speaking [a-z ]+|upbeat music|dramatic music|indistinct [a-z ]+)\s*[\)\*]",
+    re.IGNORECASE,
+)
+_WHOLE_PARENTHESIZED = re.compile(r"^\s*\([^()]*\)\s*$")
+
+
+def strip_tags(text):
+    """Remove whisper's non-speech tags; keep the rest of the text as it was heard."""
+    text = _BRACKET_TAG.sub(" ", text)
+    text = _SOUND_TAG.sub(" ", text)
+    if _WHOLE_PARENTHESIZED.match(text):
+        return ""
+    return " ".join(text.split())
+
+
+def _normalized(text):
+    return re.sub(r"[^a-z0-9 ]+", "", text.lower()).strip()
+
+
+def _average_probability(segment):
+    if segment.get("avg_logprob") is not None:
+        return math.exp(segment["avg_logprob"])
+    probabilities = [word["probability"] for word in segment.get("words") or [] if "probability" in word]
+    if not probabilities:
+        probabilities = [token["p"] for token in segment.get("tokens") or []
+                         if isinstance(token, dict) and "p" in token]
+    if probabilities:
+        return sum(probabilities) / len(probabilities)
+    return None
+
+
+def record_from_whisper_segment(segment, offset, max_no_speech_prob=DEFAULT_MAX_NO_SPEECH_PROB):
+    """Build a record from one segment of whisper's verbose_json; `offset` is the clip's wall-clock start."""
+    avg_prob = _average_probability(segment)
+    no_speech_prob = segment.get("no_speech_prob")
+    return {
+        "time": offset + float(segment.get("start", 0.0)),
+        "end": offset + float(segment.get("end", 0.0)),
+        "text": strip_tags(segment.get("text", "")),
+        "avg_prob": round(avg_prob, 3) if avg_prob is not None else None,
+        "no_speech": no_speech_prob is not None and no_speech_prob > max_no_speech_prob,
+    }
+
+
+def is_usable(record, min_avg_prob=DEFAULT_MIN_AVG_PROB, hallucinations=DEFAULT_HALLUCINATIONS):
+    """True if a record is speech worth passing on to the LLM prompt."""
+    if not record.get("text") or record.get("no_speech"):
+        return False
+    avg_prob = record.get("avg_prob")
+    if avg_prob is not None and avg_prob < min_avg_prob:
+        return False
+    text = _normalized(record["text"])
+    if text in {_normalized(phrase) for phrase in hallucinations}:
+        return False
+    if avg_prob is None or avg_prob < CONFIDENT_AVG_PROB:
+        return text not in {_normalized(phrase) for phrase in DEFAULT_MARGINAL_HALLUCINATIONS}
+    return True
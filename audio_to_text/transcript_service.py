@@ -0,0 +1,185 @@
+"""
+Recent television transcript, kept in memory and served over a Unix socket.
+
+The transcriber adds every recognized segment, with the wall-clock time it was
+captured, to a bounded TranscriptRing and serves it from a local socket, so
+consumers get fresh text without touching the transcript file and can ask for
+a time window instead of a line count. The file is still written as before.
+
+Protocol: the client sends one JSON object per line and reads JSON lines back.
+  {"op": "last", "n": 5}            -> {"segments": [...]}   newest last
+  {"op": "since", "time": 1700.0}   -> {"segments": [...]}   captured at or after time
+  {"op": "subscribe", "since": T}   -> one {"time": ..., "text": ...} line per segment,
+                                       starting with any captured at or after T
+  {"op": "products", "n": 3}        -> {"products": [...]}   best first, from the
+                                       product_mentions.ProductIndex, if one is served
+Each segment is a transcript record: at least {"time": <epoch seconds>, "text": "<text>"},
+plus "end", "avg_prob" and "no_speech" when the transcriber knows them. Every
+record is served, including ones the transcriber judged unusable and left out
+of the log file; consumers filter with transcript_records.is_usable().
+"""
+
+import collections
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+DEFAULT_SOCKET_PATH = "/tmp/coyote_transcript.sock"
+DEFAULT_RING_SEGMENTS = 500
+
+
+class TranscriptRing:
+    """Bounded, thread-safe list of the most recent transcript segments."""
+
+    def __init__(self, max_segments=DEFAULT_RING_SEGMENTS):
+        self.segments = collections.deque(maxlen=max_segments)
+        self.condition = threading.Condition()
+        self.added = 0
+
+    def add(self, text, captured_at=None):
+        return self.add_record({"time": captured_at if captured_at is not None else time.time(), "text": text})
+
+    def add_record(self, record):
+        """Add a structured record (see transcript_records); it must have "time" and "text"."""
+        with self.condition:
+            self.segments.append(record)
+            self.added += 1
+            self.condition.notify_all()
+        return record
+
+    def last(self, n):
+        with self.condition:
+            return list(self.segments)[-n:] if n > 0 else []
+
+    def since(self, since_time):
+        with self.condition:
+            return [segment for segment in self.segments if segment["time"] >= since_time]
+
+    def wait_for_new(self, seen, timeout):
+        """Block until more than `seen` segments have been added; return (added, new segments)."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.added > seen, timeout)
+            new_count = min(self.added - seen, len(self.segments))
+            return self.added, list(self.segments)[len(self.segments) - new_count:] if new_count else []
+
+
+class _TranscriptRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        ring = self.server.ring
+        for raw in self.rfile:
+            try:
+                request = json.loads(raw)
+                op = request.get("op")
+            except (ValueError, AttributeError):
+                self._send({"error": "bad request"})
+                continue
+            if op == "last":
+                self._send({"segments": ring.last(int(request.get("n", 5)))})
+            elif op == "since":
+                self._send({"segments": ring.since(float(request.get("time", 0)))})
+            elif op == "products":
+                products = self.server.products
+                self._send({"products": products.top(int(request.get("n", 1))) if products is not None else []})
+            elif op == "subscribe":
+                self._subscribe(ring, request.get("since"))
+                return
+            else:
+                self._send({"error": f"unknown op {op!r}"})
+
+    def _subscribe(self, ring, since_time):
+        with ring.condition:
+            seen = ring.added
+            backlog = ring.since(float(since_time)) if since_time is not None else []
+        for segment in backlog:
+            if not self._send(segment):
+                return
+        while not self.server.closing.is_set():
+            seen, new_segments = ring.wait_for_new(seen, timeout=1.0)
+            for segment in new_segments:
+                if not self._send(segment):
+                    return
+
+    def _send(self, payload):
+        try:
+            self.wfile.write((json.dumps(payload) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except OSError:
+            return False
+
+
+class TranscriptServer(socketserver.ThreadingUnixStreamServer):
+    """Serves a TranscriptRing (and optionally a ProductIndex) on a Unix socket from a background thread."""
+
+    daemon_threads = True
+
+    def __init__(self, ring, socket_path=DEFAULT_SOCKET_PATH, products=None):
+        # A socket file left behind by a previous run would make bind() fail.
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _TranscriptRequestHandler)
+        self.ring = ring
+        self.products = products
+        self.socket_path = socket_path
+        self.closing = threading.Event()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.closing.set()
+        self.shutdown()
+        self.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def start_transcript_server(ring, socket_path=DEFAULT_SOCKET_PATH, products=None):
+    """Start serving `ring`; returns the server, or None if the socket could not be created."""
+    try:
+        return TranscriptServer(ring, socket_path, products).start()
+    except OSError as e:
+        print(f"Transcript socket unavailable at {socket_path}: {e}")
+        return None
+
+
+def _request(socket_path, request, timeout, key="segments"):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path)
+            client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with client.makefile("rb") as reply:
+                return json.loads(reply.readline()).get(key)
+    except (OSError, ValueError):
+        return None
+
+
+def last_segments(n, socket_path=DEFAULT_SOCKET_PATH, timeout=0.5):
+    """The last `n` segments from the running transcriber, or None if it cannot be reached."""
+    return _request(socket_path, {"op": "last", "n": n}, timeout)
+
+
+def segments_since(since_time, socket_path=DEFAULT_SOCKET_PATH, timeout=0.5):
+    """Segments captured at or after `since_time`, or None if the transcriber cannot be reached."""
+    return _request(socket_path, {"op": "since", "time": since_time}, timeout)
+
+
+def top_products(n=1, socket_path=DEFAULT_SOCKET_PATH, timeout=0.5):
+    """The `n` products advertised most lately, best first, or None if the transcriber cannot be reached."""
+    return _request(socket_path, {"op": "products", "n": n}, timeout, key="products")
+
+
+def subscribe(socket_path=DEFAULT_SOCKET_PATH, since_time=None):
+    """Yield segments as the transcriber produces them. Raises OSError if it cannot be reached."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps({"op": "subscribe", "since": since_time}) + "\n").encode("utf-8"))
+        with client.makefile("rb") as stream:
+            for line in stream:
+                yield json.loads(line)
@@ -0,0 +1,183 @@
+"""
+Energy and zero-crossing voice activity detection for the television mic.
+
+Splits a continuous 16 kHz mono PCM stream into speech segments that start a
+little before speech and end at a pause, so only speech reaches whisper and
+words are not cut across fixed windows. The segmenter also counts how much
+audio it heard versus how much it passed on, which is the recognition work
+saved.
+"""
+
+import array
+import collections
+import warnings
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+SAMPLE_WIDTH = 2
+
+
+def frame_features(frame):
+    """Return (rms, zero-crossing rate) for a frame of 16-bit mono PCM."""
+    samples = len(frame) // SAMPLE_WIDTH
+    if samples == 0:
+        return 0, 0.0
+    if audioop is not None:
+        return audioop.rms(frame, SAMPLE_WIDTH), audioop.cross(frame, SAMPLE_WIDTH) / samples
+    values = array.array("h")
+    values.frombytes(frame)
+    rms = int((sum(v * v for v in values) / samples) ** 0.5)
+    crossings = sum(1 for a, b in zip(values, values[1:]) if (a < 0) != (b < 0))
+    return rms, crossings / samples
+
+
+class VoiceActivitySegmenter:
+    """
+    Feed raw PCM in; get whole speech segments out.
+
+    A frame is speech when its energy is well above the tracked noise floor.
+    Between segments the floor follows the quiet frames; inside one it can
+    only rise, to a low percentile of the last `floor_window_seconds` of
+    frames, since even fast speech pauses between words. Steady noise (a fan,
+    hiss, music with no gaps) so stops counting as speech after that long
+    instead of holding segments open for good. Inside a segment, quieter
+    frames with a high zero-crossing rate (fricatives like "s" and "f") also
+    count, so word endings are not trimmed. A segment ends after
+    `min_silence_ms` of non-speech; one that runs past `max_segment_seconds`
+    is cut at its quietest recent frame instead of mid-word.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, energy_ratio=3.0, min_rms=300,
+                 unvoiced_zcr=0.25, start_ms=90, preroll_ms=300, min_silence_ms=400,
+                 max_segment_seconds=15, min_speech_ms=250, floor_window_seconds=6,
+                 floor_percentile=0.1):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.energy_ratio = energy_ratio
+        self.min_rms = min_rms
+        self.unvoiced_zcr = unvoiced_zcr
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.hangover_frames = self.min_silence_frames // 2
+        self.max_frames = int(max_segment_seconds * 1000 // frame_ms)
+        self.cut_search_frames = min(self.max_frames // 2, 3000 // frame_ms)
+        self.min_speech_frames = min_speech_ms // frame_ms
+        self.recent = collections.deque(maxlen=max(self.start_frames, preroll_ms // frame_ms))
+        self.levels = collections.deque(maxlen=max(1, int(floor_window_seconds * 1000 // frame_ms)))
+        self.floor_percentile = floor_percentile
+        self.pending = bytearray()
+        self.noise_floor = None
+        self.segment = None
+        self.speech_run = 0
+        self.silence_run = 0
+        self.segment_speech_frames = 0
+        self.segment_start_frame = 0
+        self.frames_heard = 0
+        self.frames_sent = 0
+
+    @property
+    def seconds_heard(self):
+        return self.frames_heard * self.frame_ms / 1000
+
+    @property
+    def seconds_sent(self):
+        return self.frames_sent * self.frame_ms / 1000
+
+    def fraction_skipped(self):
+        """Share of the audio heard that never reached the recognizer."""
+        if not self.frames_heard:
+            return 0.0
+        return 1 - self.frames_sent / self.frames_heard
+
+    def feed(self, pcm):
+        """
+        Add PCM and return any speech segments that completed, as
+        (start, pcm) pairs where start is seconds from the beginning of the stream.
+        """
+        self.pending += pcm
+        segments = []
+        offset = 0
+        while len(self.pending) - offset >= self.frame_bytes:
+            segment = self._process_frame(bytes(self.pending[offset:offset + self.frame_bytes]))
+            offset += self.frame_bytes
+            if segment:
+                segments.append(segment)
+        del self.pending[:offset]
+        return segments
+
+    def flush(self):
+        """Return the (start, pcm) segment in progress, if any, e.g. when the stream ends."""
+        if self.segment is None:
+            return None
+        return self._emit(len(self.segment), None)
+
+    def _is_speech(self, rms, zcr):
+        threshold = max(self.min_rms, self.noise_floor * self.energy_ratio)
+        if rms >= threshold:
+            return True
+        return self.segment is not None and rms >= threshold / 2 and zcr >= self.unvoiced_zcr
+
+    def _process_frame(self, frame):
+        rms, zcr = frame_features(frame)
+        self.frames_heard += 1
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        self.levels.append(rms)
+        if self.segment is not None and len(self.levels) == self.levels.maxlen:
+            # A whole window without a quiet gap is noise, not speech.
+            self.noise_floor = max(self.noise_floor, sorted(self.levels)[int(len(self.levels) * self.floor_percentile)])
+        speech = self._is_speech(rms, zcr)
+
+        if self.segment is None:
+            self.recent.append((frame, rms))
+            if not speech:
+                self.speech_run = 0
+                # Follow the room: drop straight to quieter levels, rise slowly.
+                self.noise_floor = min(rms, self.noise_floor * 0.95 + rms * 0.05)
+                return None
+            self.speech_run += 1
+            if self.speech_run >= self.start_frames:
+                self.segment = list(self.recent)
+                self.segment_start_frame = self.frames_heard - len(self.segment)
+                self.recent.clear()
+                self.silence_run = 0
+                self.segment_speech_frames = self.speech_run
+            return None
+
+        self.segment.append((frame, rms))
+        if speech:
+            self.silence_run = 0
+            self.segment_speech_frames += 1
+        else:
+            self.silence_run += 1
+        if self.silence_run >= self.min_silence_frames:
+            keep = len(self.segment) - self.silence_run + self.hangover_frames
+            return self._emit(keep, None)
+        if len(self.segment) >= self.max_frames:
+            window = self.segment[-self.cut_search_frames:]
+            quietest = min(range(len(window)), key=lambda index: window[index][1])
+            cut = len(self.segment) - len(window) + quietest + 1
+            return self._emit(cut, self.segment[cut:])
+        return None
+
+    def _emit(self, count, carry):
+        frames = self.segment[:count]
+        speech_frames = self.segment_speech_frames
+        start = self.segment_start_frame * self.frame_ms / 1000
+        self.segment_start_frame += count
+        self.segment = carry or None
+        self.speech_run = 0
+        self.silence_run = 0
+        # Whatever is carried over is mid-speech; count it as such.
+        self.segment_speech_frames = len(carry) if carry else 0
+        # Clicks and door slams: too little speech to be worth recognizing.
+        if speech_frames < self.min_speech_frames:
+            return None
+        self.frames_sent += len(frames)
+        return start, b"".join(frame for frame, _ in frames)
@@ -0,0 +1,115 @@
+"""
+A resident whisper.cpp `whisper-server` process.
+
+The model is loaded once when the server starts; after that each call to
+transcribe() is one local HTTP request carrying a WAV of 16 kHz mono PCM.
+"""
+
+import io
+import subprocess
+import time
+import wave
+
+import requests
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+def pcm_to_wav(pcm):
+    """Wrap 16 kHz mono 16-bit PCM (bytes or a memoryview) in a WAV container."""
+    wav_bytes = io.BytesIO()
+    with wave.open(wav_bytes, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(SAMPLE_WIDTH)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm)
+    return wav_bytes.getvalue()
+
+
+class WhisperServer:
+    """whisper-server with one model loaded, listening on localhost."""
+
+    def __init__(self, whisper_model, threads, port):
+        self.whisper_model = whisper_model
+        self.threads = str(threads)
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process = None
+        self.ready = False
+
+    def start(self):
+        """Start the server. Returns False if whisper-server is not installed."""
+        try:
+            self.process = subprocess.Popen(
+                ["whisper-server", "-m", self.whisper_model, "-t", self.threads,
+                 "--host", "127.0.0.1", "--port", str(self.port)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        except FileNotFoundError as e:
+            print(f"whisper-server unavailable: {e}")
+            self.process = None
+            return False
+        return True
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def wait_until_ready(self, timeout):
+        # The server only answers once the model has finished loading.
+        deadline = time.monotonic() + timeout
+        while not self.ready and time.monotonic() < deadline and self.is_running():
+            try:
+                requests.get(self.url, timeout=1)
+                self.ready = True
+            except requests.RequestException:
+                time.sleep(0.2)
+        return self.ready
+
+    def _inference(self, pcm, response_format):
+        if not self.wait_until_ready(timeout=30):
+            print("whisper-server did not become ready.")
+            return None
+        try:
+            response = requests.post(
+                f"{self.url}/inference",
+                files={"file": ("speech.wav", pcm_to_wav(pcm), "audio/wav")},
+                data={"response_format": response_format, "temperature": "0.0"},
+                timeout=60,
+            )
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"whisper-server transcription failed: {e}")
+            return None
+
+    def transcribe(self, pcm):
+        """Send PCM to the loaded model and return the text, or None on failure."""
+        result = self._inference(pcm, "json")
+        if result is None:
+            return None
+        return (result.get("text") or "").strip()
+
+    def transcribe_segments(self, pcm):
+        """
+        Send PCM to the loaded model and return whisper's verbose_json segments
+        (start/end in seconds from the start of the clip, text, probabilities), or None on failure.
+        """
+        result = self._inference(pcm, "verbose_json")
+        if result is None:
+            return None
+        segments = result.get("segments")
+        if segments is None and result.get("text"):
+            # Older servers answer verbose_json with the plain text only.
+            segments = [{"start": 0.0, "end": len(pcm) / (SAMPLE_RATE * SAMPLE_WIDTH), "text": result["text"]}]
+        return segments or []
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+        self.ready = False
@@ -1,72 +1,151 @@
 # Module to comment on television content.
 import os
-import json
 import config
 import re  # added re import
-from llm_chat_completion import llm_chat_completion
-from speak_text import speak_text
+import time
+from conversation_store import open_conversation
+from audio_to_text.transcript_reader import read_last_lines
+from audio_to_text.transcript_archive import last_archived_lines
+from audio_to_text.transcript_service import last_segments, segments_since, top_products
+from audio_to_text.transcript_records import DEFAULT_MIN_AVG_PROB, is_usable
+from response_cache import get_response_cache, response_key
+from transcript_dedupe import get_window_index
+from llm_chat_completion import llm_chat_completion, llm_chat_completion_stream
+from llm_dispatcher import is_fallback_reply
+from speak_text import SENTENCE_ENDINGS, speak_streamed, speak_text
 from leds.led_manager import start_led, stop_led  # new import
 
 # Global configuration variables
 led_dynamite = config.GPIO_LED_DYNAMITE
 led_intercom = config.GPIO_LED_INTERCOM
 transcript_file = config.TRANSCRIBE_LOG_FILE
+# Where the transcriber rotates the log to (its own default when not configured).
+transcript_archive_dir = (getattr(config, "TRANSCRIPT_ARCHIVE_DIR", "")
+                          or os.path.join(os.path.dirname(transcript_file), "transcript_archive"))
 number_of_transcript_lines = config.RECENT_TRANSCRIPT_LINES
 television_prompt_start = config.TELEVISION_PROMPT_START
 television_prompt_end = config.TELEVISION_PROMPT_END
 television_prompt_no_transcript = config.TELEVISION_PROMPT_NO_TRANSCRIPT
 conversation_file = os.path.join(config.CONVERSATION_DATA_PATH, config.CONVERSATION_FILE)
+transcript_socket_path = getattr(config, "TRANSCRIPT_SOCKET_PATH", "")
+recent_transcript_seconds = getattr(config, "RECENT_TRANSCRIPT_SECONDS", 0)
+transcript_min_avg_prob = getattr(config, "TRANSCRIPT_MIN_AVG_PROB", DEFAULT_MIN_AVG_PROB)
+response_cache_mode = getattr(config, "RESPONSE_CACHE_MODE", "reuse")
+television_prompt_variation = getattr(
+    config, "TELEVISION_PROMPT_VARIATION",
+    "You already said this about what you just heard on television: ```{reply}``` "
+    "Say it again in different words, in one or two sentences.",
+)
+television_product_hint = getattr(config, "TELEVISION_PRODUCT_HINT", False)
+television_prompt_end_product = getattr(
+    config, "TELEVISION_PROMPT_END_PRODUCT",
+    "```The product is {product}{price}. Tell how it will help you catch Roadrunner.",
+)
+transcript_dedupe_mode = getattr(config, "TRANSCRIPT_DEDUPE_MODE", "prompt")
+television_prompt_repeat = getattr(
+    config, "TELEVISION_PROMPT_REPEAT",
+    "The television is repeating the pitch you already told me about: ```{reply}``` "
+    "Say something short about hearing it again.",
+)
 
+NO_RESPONSE_TEXT = "No response received."
+LLM_ERROR_RESPONSE = "Sorry, I'm having trouble thinking right now."
 
-def build_prompt_and_update_conversation():
 
-    # Attempt to read transcript file
-    try:
-        with open(transcript_file, 'r') as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        lines = []
+def recent_transcript_lines():
+    """Recent TV transcript, from the transcriber's socket when it is up, else from the end of the log file."""
+    if transcript_socket_path:
+        if recent_transcript_seconds:
+            segments = segments_since(time.time() - recent_transcript_seconds, transcript_socket_path)
+        else:
+            # Ask for extra so there are still enough once the junk is dropped.
+            segments = last_segments(number_of_transcript_lines * 3, transcript_socket_path)
+        # A just-restarted transcriber has an empty ring; the file still has what came before.
+        if segments or (segments is not None and recent_transcript_seconds):
+            # Low-confidence and no-speech records never reach the prompt.
+            usable = [segment["text"] for segment in segments if is_usable(segment, transcript_min_avg_prob)]
+            return usable if recent_transcript_seconds else usable[-number_of_transcript_lines:]
+    lines = read_last_lines(transcript_file, number_of_transcript_lines)
+    if len(lines) < number_of_transcript_lines:
+        # Just after a rotation the live log is (nearly) empty; the rest is in the newest archive.
+        lines = last_archived_lines(transcript_archive_dir, number_of_transcript_lines - len(lines)) + lines
+    return lines
 
+
+def current_product():
+    """The product the transcriber has heard advertised most lately, as a dict, or None."""
+    if not (television_product_hint and transcript_socket_path):
+        return None
+    products = top_products(1, transcript_socket_path)
+    return products[0] if products else None
+
+
+def television_prompt(lines):
+    """Return (prompt, recent_transcript) for a window of transcript lines."""
     # Build recent transcript string
-    recent_transcript = " ".join(line.strip() for line in lines[-number_of_transcript_lines:] if line.strip())
+    recent_transcript = " ".join(lines)
 
     # Decide on the prompt content based on transcript availability
     if not recent_transcript:
         prompt = television_prompt_no_transcript
     else:
-        prompt = television_prompt_start + recent_transcript + television_prompt_end
+        product = current_product()
+        if product is not None:
+            # Named for the LLM, so it need not work out the product from the transcript.
+            price = f" ({product['price']})" if product.get("price") else ""
+            prompt = (television_prompt_start + recent_transcript
+                      + television_prompt_end_product.format(product=product["name"], price=price))
+        else:
+            prompt = television_prompt_start + recent_transcript + television_prompt_end
+    return prompt, recent_transcript
 
-    # Display the prompt
-    print("Prompt:", prompt)
 
-    # Load existing conversation from JSON file
-    try:
-        with open(conversation_file, "r") as f:
-            conversation = json.load(f)
-    except Exception:
-        conversation = []
+def build_prompt_and_update_conversation(conversation, lines=None, prompt=None, dedupe=False):
+    """
+    Add the TV prompt to the conversation. With `dedupe` and TRANSCRIPT_DEDUPE on, the earlier
+    transcript_dedupe.Window a window nearly repeats is returned (otherwise None), and in
+    "prompt" mode the LLM gets a short prompt about the repeat instead.
+    """
+    if lines is None:
+        lines = recent_transcript_lines()
+    television_prompt_text, recent_transcript = television_prompt(lines)
+    # A caller may ask something else about the same transcript (e.g. a variation on a cached reply).
+    prompt = prompt or television_prompt_text
 
-    # Append new user message to the conversation
-    conversation.append({"role": "user", "content": prompt})
+    repeat = None
+    window_index = get_window_index() if dedupe and recent_transcript else None
+    if window_index is not None:
+        similarity, repeat = window_index.match(recent_transcript)
+        if repeat is not None:
+            print(f"Transcript repeats one commented on before (similarity {similarity:.2f}, "
+                  f"{window_index.repeats} repeats so far).")
+            # In "reuse" mode the LLM is not asked, so the history keeps the transcript prompt.
+            if transcript_dedupe_mode == "prompt":
+                prompt = television_prompt_repeat.format(reply=repeat.reply)
 
-    # Write updated conversation back to file
-    with open(conversation_file, "w") as f:
-        json.dump(conversation, f, indent=4)
+    # Display the prompt
+    print("Prompt:", prompt)
+
+    # Append new user message to the in-memory conversation (journaled in the background)
+    conversation.append("user", prompt)
 
     # Write the recent transcript to last_heard_television.txt
     last_heard_file = os.path.join(config.CONVERSATION_DATA_PATH, "last_heard_television.txt")
-    with open(last_heard_file, "w", encoding='utf-8') as f:  # Specify encoding
-        f.write(recent_transcript)
+    conversation.write_text(last_heard_file, recent_transcript)
+
+    return repeat
 
-    return
+
+def is_real_answer(response):
+    """False for the stock lines spoken when no LLM answer came back; those are never cached."""
+    return response not in (NO_RESPONSE_TEXT, LLM_ERROR_RESPONSE) and not is_fallback_reply(response)
 
 
 def clean_response(response):
-    sentence_endings = [".", "!", "?", "\n"]
     if response is None:
-        return "No response received."
+        return NO_RESPONSE_TEXT
 
-    last_ending_index = max(response.rfind(ending) for ending in sentence_endings)
+    last_ending_index = max(response.rfind(ending) for ending in SENTENCE_ENDINGS)
     if last_ending_index != -1:
         response = response[:last_ending_index + 1]  # Added space around +
 
@@ -86,39 +165,93 @@ def clean_response(response):
     return cleaned
 
 
-def comment_on_television():
-    build_prompt_and_update_conversation()
+def comment_on_television(conversation=None, token=None, speculator=None):
+    """
+    Comment on what the TV has said lately. Cancelling `token` stops the reply where it is.
+    With a SpeculativeCommentary, a reply it has already prepared is spoken if it still fits.
+    With RESPONSE_CACHE on, a transcript already commented on reuses (or varies) that reply,
+    and with TRANSCRIPT_DEDUPE on a near repeat of one does too (or gets a short prompt).
+    """
+    if conversation is None:
+        conversation = open_conversation(conversation_file)
+    lines = recent_transcript_lines()
+    candidate = speculator.take(lines, conversation) if speculator is not None else None
+    if candidate is not None:
+        # The prepared reply answers the window it was drafted from.
+        print("Using the commentary prepared in advance.")
+        lines = candidate.lines
+
+    # The same transcript as a recent press: reuse that reply, or ask for a variation on it.
+    cache = get_response_cache() if lines else None
+    cache_key = response_key(" ".join(lines), config.SYSTEM_MESSAGE_TEXT) if cache is not None else None
+    cached = cache.get(cache_key) if cache is not None and candidate is None else None
+    if cached is not None:
+        print(f"Response cache hit ({response_cache_mode}); {cache.stats()}")
+    variation_prompt = None
+    if cached is not None and response_cache_mode == "variation":
+        variation_prompt = television_prompt_variation.format(reply=cached)
+    # A prepared or cached reply already answers this window; only a fresh one is checked for repeats.
+    repeat = build_prompt_and_update_conversation(
+        conversation, lines, variation_prompt, dedupe=candidate is None and cached is None
+    )
 
     # Start led_dynamite erratic flashing during llm processing
     led_thread = start_led(led_dynamite, "erratic")
-    try:
-        response = clean_response(llm_chat_completion(conversation_file))
-        # Retry once if response is null
-        if response == "No response received.":
-            response = clean_response(llm_chat_completion(conversation_file))
-    except Exception as e:
-        print(f"Error getting LLM response: {e}")
-        response = "Sorry, I'm having trouble thinking right now."
+
+    def on_first_sentence():
+        nonlocal led_thread
+        # THEN switch to led_intercom breathing as soon as the first sentence is spoken
+        stop_led(led_thread)
+        led_thread = start_led(led_intercom, "breathing")
+
+    # Speak each sentence as soon as it has been generated
+    if candidate is not None:
+        chunks = iter([candidate.reply])
+    elif cached is not None and variation_prompt is None:
+        chunks = iter([cached])
+    elif repeat is not None and transcript_dedupe_mode == "reuse":
+        chunks = iter([repeat.reply])
+    else:
+        chunks = llm_chat_completion_stream(conversation, token)
+    sentences = speak_streamed(
+        chunks, clean_response,
+        on_first_sentence=on_first_sentence, token=token
+    )
+    if token is not None and token.cancelled:
+        # Interrupted by something more important: keep only what was actually said.
+        stop_led(led_thread)
+        if sentences:
+            conversation.append("assistant", " ".join(sentences))
+        return
+    if sentences:
+        response = " ".join(sentences)
+    else:
+        # Nothing usable came back; retry once without streaming
+        try:
+            response = clean_response(llm_chat_completion(conversation))
+        except Exception as e:
+            print(f"Error getting LLM response: {e}")
+            response = LLM_ERROR_RESPONSE
     stop_led(led_thread)
 
-    # FIRST append assistant response to conversation JSON file
-    try:
-        with open(conversation_file, "r") as f:
-            conversation = json.load(f)
-    except Exception:
-        conversation = []
-    conversation.append({"role": "assistant", "content": response})
-    with open(conversation_file, "w") as f:
-        json.dump(conversation, f, indent=4)
-    
+    # Only a real answer is kept for later presses on the same transcript, never an error line.
+    if cache is not None and cached is None and is_real_answer(response):
+        cache.put(cache_key, response)
+    window_index = get_window_index() if lines else None
+    if window_index is not None and cached is None and repeat is None and is_real_answer(response):
+        window_index.add(" ".join(lines), response)
+
+    # Append assistant response to the conversation
+    conversation.append("assistant", response)
+
     # Save the cleaned response to last_coyote_commentary.txt instead of last_coyote_response.txt
     commentary_file = os.path.join(config.CONVERSATION_DATA_PATH, "last_coyote_commentary.txt")
-    with open(commentary_file, "w", encoding='utf-8') as f:  # Specify encoding
-        f.write(response)
+    conversation.write_text(commentary_file, response)
 
-    # THEN start led_intercom breathing pattern during speak_text
-    led_thread = start_led(led_intercom, "breathing")
-    speak_text(response)
-    stop_led(led_thread)
+    if not sentences:
+        # Start led_intercom breathing pattern during speak_text
+        led_thread = start_led(led_intercom, "breathing")
+        speak_text(response, token)
+        stop_led(led_thread)
 
     return
@@ -8,6 +8,8 @@ except ImportError:
 # Sound effects
 STARTUP_SOUND = "./sound_effects/meep-and-tongue.mp3"
 CONVERSATION_ARCHIVE_SOUND = "./sound_effects/falls_off_a_cliff_trim.mp3"
+# Decode every sound effect at startup and play them through the shared speaker stream.
+SOUND_EFFECTS_PRELOAD = True
 
 # Hardware definitions
 GPIO_BUTTON_INTERCOM = 27
@@ -23,6 +25,11 @@ GPIO_LED_INTERCOM = 15
 
 # Audio to text transcription settings
 TRANSCRIBE_LOG_FILE = "./audio_to_text/transcription.txt"
+# The log is rotated into gzip segments here, with a time index, once it reaches
+# TRANSCRIPT_ROTATE_BYTES or is TRANSCRIPT_ROTATE_SECONDS old.
+TRANSCRIPT_ARCHIVE_DIR = "./audio_to_text/transcript_archive"
+TRANSCRIPT_ROTATE_BYTES = 1024 * 1024
+TRANSCRIPT_ROTATE_SECONDS = 24 * 60 * 60
 TRANSCRIBE_WHISPER_MODEL = "/usr/share/whisper/models/ggml-base.en.bin"
 TRANSCRIBE_THREADS = "2"
 TRANSCRIBE_MIC_NUMBER = "1"
@@ -31,6 +38,23 @@ TRANSCRIBE_MIC_NUMBER = "1"
 TRANSCRIBE_MIC_NAME_MATCH = "Audio"
 # If TRANSCRIBE_MIC_NAME_MATCH matches multiple devices, use this zero-based match index.
 TRANSCRIBE_MIC_MATCH_INDEX = 0
+# Only send speech (found by voice activity detection) to a resident whisper-server,
+# cut at pauses, instead of recognizing fixed 5 s whisper-stream windows. The
+# transcriber prints how much recognition work this saves; if it is high,
+# TRANSCRIBE_THREADS can usually be lowered. Falls back to whisper-stream.
+TRANSCRIBE_VAD = True
+TRANSCRIBE_WHISPER_SERVER_PORT = 8911
+# The transcriber keeps its last TRANSCRIPT_RING_SEGMENTS segments in memory, with
+# capture times, and serves them on this Unix socket. Set to "" to turn it off.
+TRANSCRIPT_SOCKET_PATH = "/tmp/coyote_transcript.sock"
+TRANSCRIPT_RING_SEGMENTS = 500
+# Product mentions older than this no longer count towards the product served on the socket.
+TRANSCRIPT_PRODUCT_SECONDS = 600
+# Transcript segments whisper was less sure of than TRANSCRIPT_MIN_AVG_PROB (mean token
+# probability), or judged more likely than TRANSCRIPT_MAX_NO_SPEECH_PROB to be non-speech,
+# are kept out of the log and the TV prompt, as are known hallucinations like "Thanks for watching".
+TRANSCRIPT_MIN_AVG_PROB = 0.4
+TRANSCRIPT_MAX_NO_SPEECH_PROB = 0.6
 
 PERSON_WHISPER_MODEL = "/usr/share/whisper/models/ggml-base.en.bin"
 PERSON_MIC_NUMBER = "0"
@@ -40,11 +64,28 @@ PERSON_THREADS = "2"
 PERSON_MIC_NAME_MATCH = "Audio_1"
 # If PERSON_MIC_NAME_MATCH matches multiple devices, use this zero-based match index.
 PERSON_MIC_MATCH_INDEX = 0
+# Keep the intercom model loaded in whisper-server and the intercom mic open, so a
+# press only marks the start and end of the utterance. Falls back to whisper-stream.
+PERSON_SPEECH_SERVICE = True
+PERSON_WHISPER_SERVER_PORT = 8910
+# Seconds of intercom audio from before the press to include, so the first word is kept.
+PERSON_PREROLL_SECONDS = 0.5
 
 # Audio output settings
 # If playback fails, prefer named devices like "plughw:CARD=Audio,DEV=0" or
 # "plughw:CARD=Audio_1,DEV=0" over numeric indices (which can change after reboot).
 SPEAKER_DEVICE = "plughw:CARD=Audio_1,DEV=0"
+# Keep one piper process (voice loaded once) and one open output device for all speech.
+# When False, or if piper cannot be started, each utterance runs a piper | sox | aplay pipeline.
+SPEECH_ENGINE_PERSISTENT = True
+# Close the output device after this many seconds with nothing playing, so other players can use it.
+AUDIO_OUTPUT_IDLE_CLOSE_SECONDS = 2.0
+# Cache synthesized speech on disk so repeated lines skip piper entirely (least recently used evicted first).
+SPEECH_CACHE_ENABLED = True
+SPEECH_CACHE_DIR = "./speech_cache"
+SPEECH_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Extra lines to pre-render at startup, in addition to the built-in fallback responses.
+SPEECH_CACHE_PRERENDER_PHRASES = []
 
 # Conversation configuration
 CONVERSATION_DATA_PATH = "conversation_data"
@@ -56,14 +97,92 @@ SYSTEM_MESSAGE_TEXT_COMPACT = "You are Wile E. Coyote, and your defining trait i
 SYSTEM_MESSAGE_TEXT = SYSTEM_MESSAGE_MEDIUM
 
 RECENT_TRANSCRIPT_LINES = 5
+# When above 0, use the transcript captured in the last this-many seconds instead of
+# the last RECENT_TRANSCRIPT_LINES lines (needs TRANSCRIPT_SOCKET_PATH).
+RECENT_TRANSCRIPT_SECONDS = 0
 TELEVISION_PROMPT_START = "Here's the next thing you just heard about as you watch home shopping on television: ```"
 TELEVISION_PROMPT_END = "```Name the product you just heard about, and tell how it will help you catch Roadrunner. The product name is always a word or words that you heard on the commercial. (If you're not sure what the product is, just make a reasonable assumption and go with it.)"
+# With the transcript socket up, name the product the transcriber has heard advertised most
+# lately (repeated capitalized names, with any price) instead of asking the LLM to find it.
+TELEVISION_PRODUCT_HINT = False
+TELEVISION_PROMPT_END_PRODUCT = "```The product is {product}{price}. Tell how it will help you catch Roadrunner."
 TELEVISION_PROMPT_NO_TRANSCRIPT = "You're ready to watch television, but you haven't heard about any products yet. If you watch, you'll surely hear about something soon."
 
+# Speculative commentary: while awake and idle, draft (and render the speech for) the
+# commentary the next plunger press would get, and speak it at once if the transcript
+# still shares SPECULATIVE_MIN_SIMILARITY of its words and the draft is not too old.
+# Costs LLM time on drafts that are never used, so it is off by default.
+SPECULATIVE_COMMENTARY = False
+SPECULATIVE_INTERVAL_SECONDS = 5
+SPECULATIVE_MIN_SIMILARITY = 0.8
+SPECULATIVE_MAX_AGE_SECONDS = 120
+
+# Response cache: a press whose transcript matches one answered in the last
+# RESPONSE_CACHE_TTL_SECONDS reuses that commentary ("reuse", whose audio is also
+# cached) or asks the LLM for a short variation of it ("variation").
+RESPONSE_CACHE = False
+RESPONSE_CACHE_MODE = "reuse"
+RESPONSE_CACHE_TTL_SECONDS = 600
+RESPONSE_CACHE_MAX_ENTRIES = 32
+TELEVISION_PROMPT_VARIATION = "You already said this about what you just heard on television: ```{reply}``` Say it again in different words, in one or two sentences."
+
+# Transcript dedupe: a press whose transcript nearly repeats (MinHash similarity at or above
+# TRANSCRIPT_DEDUPE_THRESHOLD) one commented on in the last TRANSCRIPT_DEDUPE_MAX_AGE_SECONDS
+# gets the short TELEVISION_PROMPT_REPEAT ("prompt") or that earlier reply again ("reuse").
+TRANSCRIPT_DEDUPE = False
+TRANSCRIPT_DEDUPE_MODE = "prompt"
+TRANSCRIPT_DEDUPE_THRESHOLD = 0.6
+TRANSCRIPT_DEDUPE_WINDOWS = 16
+TRANSCRIPT_DEDUPE_MAX_AGE_SECONDS = 900
+TELEVISION_PROMPT_REPEAT = "The television is repeating the pitch you already told me about: ```{reply}``` Say something short about hearing it again."
+
 PERSON_PROMPT_START = "Here's what your friend just said to you as you watch home shopping on television: ```"
 PERSON_PROMPT_END = "``` Please respond to your friend. Be brief and succinct, and speak using the first person \"I...\""
 PERSON_PROMPT_NO_TRANSCRIPT = "Ask a question of your friend who is watching television with you. You can ask about the product they just heard about, or anything else you'd like to know."
 
+# Context window for azure/ollama: keep the system message and the most recent turns,
+# fold older turns into a summary so prompt size stays flat over a long session.
+# Set LLM_CONTEXT_TOKEN_BUDGET to 0 to always send the whole conversation.
+LLM_CONTEXT_TOKEN_BUDGET = 800
+LLM_CONTEXT_RECENT_TURNS = 3
+LLM_CONTEXT_SUMMARY_MAX_TOKENS = 120
+# For Ollama: grow the window by appending turns and only rebuild it when the budget is
+# reached, so the server can reuse the prompt it evaluated last turn instead of
+# re-evaluating the whole history. Per-turn prompt evaluation is printed.
+OLLAMA_INCREMENTAL_CONTEXT = True
+
+# HTTP to the LLM servers: connections are kept alive and reused across turns.
+# The read timeout is the longest wait for the next bytes of a reply; failed
+# connection attempts are retried LLM_CONNECT_RETRIES times.
+LLM_CONNECT_TIMEOUT_SECONDS = 5
+LLM_READ_TIMEOUT_SECONDS = 120
+LLM_CONNECT_RETRIES = 2
+
+# Load the Ollama model and warm the system prompt at startup and whenever the lamp
+# switch wakes the coyote, restart its keep-alive timer every OLLAMA_KEEP_WARM_SECONDS
+# while awake, and unload it when the switch goes to sleep.
+OLLAMA_KEEP_WARM = True
+OLLAMA_KEEP_WARM_SECONDS = 120
+
+# Fallback chain: after LLM, try these backends in order when the one before fails or
+# misses its deadline ("azure", "ollama", "ax650", or "canned" for a stock line). If
+# LLM_HEDGE_AFTER_SECONDS is above 0, the next backend is also started when the current
+# one is that slow, and the first answer wins. Past LLM_ANSWER_DEADLINE_SECONDS a
+# canned line is spoken. An empty chain uses LLM alone, with no deadlines. A streamed
+# Ollama reply that sends nothing for LLM_STREAM_CHUNK_DEADLINE_SECONDS is ended there.
+LLM_FALLBACK_CHAIN = []
+LLM_BACKEND_DEADLINE_SECONDS = {"ax650": 20, "ollama": 25, "azure": 15}
+LLM_HEDGE_AFTER_SECONDS = 0
+LLM_ANSWER_DEADLINE_SECONDS = 40
+LLM_STREAM_CHUNK_DEADLINE_SECONDS = 10
+LLM_CANNED_RESPONSES = [
+    "Hold that thought, my genius brain is still warming up.",
+    "Sorry, I'm having trouble thinking right now.",
+]
+
+# Stream Ollama replies and start speaking each sentence as soon as it is complete.
+OLLAMA_STREAM = True
+
 # LLM configuration
 # azure, ollama, or ax650
 # February 2026: we are using ollama! Agents should NOT change this.
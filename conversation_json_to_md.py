@@ -1,5 +1,5 @@
-import json
 import sys
+from conversation_store import read_messages
 
 
 def escape_backticks(content):
@@ -21,8 +21,8 @@ def convert_conversation_to_md(conversation):
 
 
 def main(input_file, output_file):
-    with open(input_file, 'r') as f:
-        conversation = json.load(f)
+    # Picks up journaled messages too when pointed at the live conversation file
+    conversation = read_messages(input_file)
 
     md_content = convert_conversation_to_md(conversation)
 
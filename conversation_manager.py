@@ -3,6 +3,7 @@ __all__ = ['conversation_setup', 'archive_conversation']
 import os
 import json
 import datetime
+from conversation_store import compact_conversation, reset_conversation
 
 
 def conversation_setup(config):
@@ -33,12 +34,16 @@ def conversation_setup(config):
 def archive_conversation(config):
     """
     Archives the current conversation file by renaming it with a timestamp.
+    Any journaled messages are compacted into the file first.
     """
     conversation_directory = config.CONVERSATION_DATA_PATH
     conversation_file_name = config.CONVERSATION_FILE
     
     # Full path to the current conversation file
     conversation_file = os.path.join(conversation_directory, conversation_file_name)
+
+    # Fold the append-only journal back into the JSON file so the archive is complete
+    compact_conversation(conversation_file)
     
     # Check if the conversation file exists before attempting to archive
     if os.path.exists(conversation_file):
@@ -55,5 +60,6 @@ def archive_conversation(config):
         
         # Rename the file
         os.rename(conversation_file, archived_file)
+        reset_conversation(conversation_file)
         return archived_file
     return None
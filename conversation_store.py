@@ -0,0 +1,283 @@
+__all__ = ['Conversation', 'ConversationStore', 'open_conversation', 'open_store', 'read_messages', 'compact_conversation', 'reset_conversation', 'journal_path']
+
+import os
+import json
+import time
+import queue
+import threading
+
+
+# Journal writes are flushed to the OS on every append, but only fsync'd in
+# batches so a long TV session does not pay an fsync per turn.
+DEFAULT_FSYNC_EVERY = 8
+DEFAULT_FSYNC_SECONDS = 2.0
+
+_stores = {}
+_conversations = {}
+_stores_lock = threading.Lock()
+_conversations_lock = threading.Lock()
+
+
+def journal_path(conversation_file):
+    """Return the append-only journal that sits next to a conversation JSON file."""
+    base_name = os.path.splitext(conversation_file)[0]
+    return f"{base_name}.journal.jsonl"
+
+
+def _read_json_messages(conversation_file):
+    try:
+        with open(conversation_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def _read_journal_messages(path):
+    messages = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final record from a power cut; everything before it is intact.
+                    break
+    except FileNotFoundError:
+        pass
+    return messages
+
+
+def read_messages(conversation_file):
+    """Read the compacted conversation plus any journaled messages not yet compacted."""
+    return _read_json_messages(conversation_file) + _read_journal_messages(journal_path(conversation_file))
+
+
+def _write_json_atomically(conversation_file, messages):
+    tmp_file = conversation_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(messages, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, conversation_file)
+
+
+class ConversationStore:
+    """
+    In-memory conversation backed by an append-only JSONL journal.
+
+    Each appended message is written as one journal record. The journal is
+    folded back into the regular conversation JSON file only by compact(),
+    which keeps that file in the layout the rest of the tools expect.
+    """
+
+    def __init__(self, conversation_file, fsync_every=DEFAULT_FSYNC_EVERY, fsync_seconds=DEFAULT_FSYNC_SECONDS):
+        self.conversation_file = conversation_file
+        self.journal_file = journal_path(conversation_file)
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.lock = threading.RLock()
+        self._messages = None
+        self._journal = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._messages is None:
+            self._messages = read_messages(self.conversation_file)
+
+    def _open_journal(self):
+        if self._journal is None:
+            directory = os.path.dirname(self.journal_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._journal = open(self.journal_file, "a", encoding="utf-8")
+        return self._journal
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    @property
+    def messages(self):
+        """Return a snapshot of the conversation messages."""
+        with self.lock:
+            self._ensure_loaded()
+            return list(self._messages)
+
+    def append(self, role, content):
+        self.append_message({"role": role, "content": content})
+
+    def append_message(self, message):
+        with self.lock:
+            self._ensure_loaded()
+            self._messages.append(message)
+            journal = self._open_journal()
+            journal.write(json.dumps(message) + "\n")
+            journal.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_seconds):
+                self.sync()
+
+    def sync(self):
+        """Force any journaled messages onto disk."""
+        with self.lock:
+            if self._journal is not None and self._unsynced:
+                os.fsync(self._journal.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Rewrite the conversation JSON file with every message and empty the journal."""
+        with self.lock:
+            if not os.path.exists(self.journal_file):
+                # Nothing journaled since the last compaction.
+                return
+            self._ensure_loaded()
+            _write_json_atomically(self.conversation_file, self._messages)
+            self._close_journal()
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def reset(self):
+        """Forget the in-memory messages so they are reloaded from disk on next use."""
+        with self.lock:
+            self._close_journal()
+            self._messages = None
+            self._unsynced = 0
+
+    def close(self):
+        with self.lock:
+            self.sync()
+            self._close_journal()
+
+
+def open_store(conversation_file):
+    """Return the shared store for a conversation file, creating it on first use."""
+    key = os.path.abspath(conversation_file)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ConversationStore(conversation_file)
+            _stores[key] = store
+        return store
+
+
+def compact_conversation(conversation_file):
+    """
+    Fold the journal for a conversation file into its JSON file.
+    Uses the live store when this process has one open, so in-memory state stays consistent.
+    """
+    key = os.path.abspath(conversation_file)
+    with _stores_lock:
+        store = _stores.get(key)
+    if store is not None:
+        store.compact()
+        return
+    journal_file = journal_path(conversation_file)
+    if os.path.exists(journal_file):
+        _write_json_atomically(conversation_file, read_messages(conversation_file))
+        os.remove(journal_file)
+
+
+def reset_conversation(conversation_file):
+    """Drop the live store's in-memory copy, e.g. after the file has been archived."""
+    key = os.path.abspath(conversation_file)
+    with _stores_lock:
+        store = _stores.get(key)
+    if store is not None:
+        store.reset()
+
+
+class Conversation:
+    """
+    Long-lived conversation shared by the TV and person handlers.
+
+    Messages are held in memory and handed straight to the LLM dispatcher.
+    Journal appends and the last_*.txt side files are written by a background
+    thread, so the disk is never between a button press and the LLM request.
+    """
+
+    def __init__(self, conversation_file):
+        self.conversation_file = conversation_file
+        self.store = open_store(conversation_file)
+        self.lock = threading.Lock()
+        self._messages = self.store.messages
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_worker, daemon=True)
+        self._writer.start()
+
+    def _write_worker(self):
+        while True:
+            item = self._writes.get()
+            try:
+                if item is None:
+                    return
+                kind, target, payload = item
+                if kind == "message":
+                    self.store.append_message(payload)
+                elif kind == "text":
+                    with open(target, "w", encoding="utf-8") as f:
+                        f.write(payload)
+            except Exception as e:
+                print(f"Conversation write failed: {e}")
+            finally:
+                self._writes.task_done()
+
+    @property
+    def messages(self):
+        """Return a snapshot of the conversation messages."""
+        with self.lock:
+            return list(self._messages)
+
+    def append(self, role, content):
+        message = {"role": role, "content": content}
+        with self.lock:
+            self._messages.append(message)
+        self._writes.put(("message", None, message))
+
+    def write_text(self, path, text):
+        """Write a small side file (e.g. last_heard_television.txt) in the background."""
+        self._writes.put(("text", path, text))
+
+    def flush(self):
+        """Block until every queued write has reached the journal, then fsync it."""
+        self._writes.join()
+        self.store.sync()
+
+    def compact(self):
+        self.flush()
+        self.store.compact()
+
+    def reload(self):
+        """Reload from disk, e.g. after the conversation file has been archived and recreated."""
+        self.flush()
+        self.store.reset()
+        with self.lock:
+            self._messages = self.store.messages
+
+    def close(self):
+        self.compact()
+        self._writes.put(None)
+        self._writer.join(timeout=5)
+        self.store.close()
+        with _conversations_lock:
+            if _conversations.get(os.path.abspath(self.conversation_file)) is self:
+                del _conversations[os.path.abspath(self.conversation_file)]
+
+
+def open_conversation(conversation_file):
+    """Return the shared Conversation for a conversation file, creating it on first use."""
+    key = os.path.abspath(conversation_file)
+    with _conversations_lock:
+        conversation = _conversations.get(key)
+        if conversation is None:
+            conversation = Conversation(conversation_file)
+            _conversations[key] = conversation
+        return conversation
@@ -1,15 +1,54 @@
 import config
+import llm_client
 from conversation_manager import conversation_setup, archive_conversation
-from llm_chat_completion import ax650_soft_reset_and_reassert_prompt
+from conversation_store import open_conversation
+from llm_chat_completion import AX650_FALLBACK_RESPONSE, ax650_soft_reset_and_reassert_prompt
+from speak_text import prerender_phrases_async
+from interaction_scheduler import InteractionScheduler, PRIORITY_BOOM, PRIORITY_INTERCOM, PRIORITY_TELEVISION
+from speculative_commentary import start_speculative_commentary
+from ollama_lifecycle import start_ollama_lifecycle
+from audio_to_text.person_speech import get_person_speech_service
 from buttons.button_manager import ButtonManager
 from leds.led_manager import start_led, stop_led  # Import LED control functions
-from sound_effects.sound_effects import play_sound_effect  # Import sound effect function
+from sound_effects.sound_effects import play_sound_effect, preload_sound_effects  # Import sound effect functions
+import os
+import queue
 import threading
 import subprocess
 import time
 import sys
 
 
+def boom(conversation):
+    """Archive the conversation, start a fresh one, and play the BOOM effects."""
+    # Archive the current conversation before BOOM
+    conversation.flush()
+    archived_file = archive_conversation(config)
+    if archived_file:
+        print(f"Conversation archived to: {archived_file}")
+    # Start the fresh conversation with the system message
+    conversation_setup(config)
+    conversation.reload()
+
+    if config.LLM == "ax650":
+        if not ax650_soft_reset_and_reassert_prompt():
+            print("AX650 BOOM reset completed with errors.")
+
+    # Start erratic pattern on both LEDs
+    led_thread1 = start_led(config.GPIO_LED_DYNAMITE, "erratic")
+    led_thread2 = start_led(config.GPIO_LED_INTERCOM, "erratic")
+    # Play conversation archive sound
+    play_sound_effect(config.CONVERSATION_ARCHIVE_SOUND)
+    print("BOOM!")
+
+    # Run erratic pattern for a few seconds
+    time.sleep(1)
+
+    # Stop both LED patterns
+    stop_led(led_thread1)
+    stop_led(led_thread2)
+
+
 def coyote_alive(stop_event):
     """Run the coyote alive operations until a stop signal is received."""
     button_listen_to_person = config.BUTTON_LISTEN_TO_PERSON
@@ -21,48 +60,89 @@ def coyote_alive(stop_event):
     bm_television = ButtonManager(button_listen_to_television)
     bm_wake_sleep = ButtonManager(switch_wake_sleep)
 
-    # Loop until the stop event is triggered, checking every second.
-    while not stop_event.is_set():
+    # Load the Ollama model while the lamp is on and let it unload while it is off.
+    ollama = start_ollama_lifecycle(config, bm_wake_sleep.get_initial_state())
+    if ollama is not None:
+        bm_wake_sleep.register_press_callback(ollama.wake)
+        bm_wake_sleep.register_release_callback(ollama.sleep)
+
+    # One long-lived in-memory conversation shared by the TV and person handlers
+    conversation_setup(config)
+    conversation = open_conversation(os.path.join(config.CONVERSATION_DATA_PATH, config.CONVERSATION_FILE))
+
+    # Button presses arrive from the GPIO callbacks on this queue, with the time of the press.
+    # The loop below blocks on it, so a press is handled as soon as it happens and nothing
+    # wakes up while nobody touches a button.
+    events = queue.Queue()
+    on_television_press = lambda: events.put(("television", time.monotonic()))
+    on_person_press = lambda: events.put(("person", time.monotonic()))
+    bm_television.register_press_callback(on_television_press)
+    bm_person.register_press_callback(on_person_press)
+    held_buttons = (("television", bm_television), ("person", bm_person))
+
+    # Interactions run on the scheduler's thread, so this loop keeps listening while the
+    # coyote talks: the intercom interrupts TV commentary and BOOM interrupts both.
+    scheduler = InteractionScheduler(on_idle=lambda: events.put(("idle", None)))
+    # Draft the next TV commentary while nothing is happening, if configured.
+    speculator = start_speculative_commentary(
+        config, conversation, paused=lambda: scheduler.busy() or not bm_wake_sleep.get_initial_state())
+
+    # Wake the loop when asked to stop.
+    def wait_for_stop():
+        stop_event.wait()
+        events.put((None, None))
+    threading.Thread(target=wait_for_stop, daemon=True).start()
+
+    while True:
+        event, pressed_at = events.get()
+        if event is None or stop_event.is_set():
+            break
+
+        if event == "idle":
+            # Only sent after a handler ran. A button still held when the coyote finishes goes
+            # again, as it always has, but not while asleep, where a held plunger would just
+            # repeat BOOM (or, held alone, wake this loop for nothing).
+            if not bm_wake_sleep.get_initial_state():
+                continue
+            for name, bm in held_buttons:
+                if bm.get_initial_state():
+                    events.put((name, time.monotonic()))
+            continue
+
+        if speculator is not None:
+            # Real requests go first; a draft in progress would only slow them down.
+            speculator.interrupt()
+
         if bm_wake_sleep.get_initial_state():
             # Wake mode logic
-            if bm_television.get_initial_state():
-                # Ensure conversation directory exists before TV interaction
-                conversation_setup(config)
+            if event == "television":
                 import comment_on_television
-                comment_on_television.comment_on_television()
-            if bm_person.get_initial_state():
-                # Ensure conversation directory exists before person interaction
-                conversation_setup(config)
+                scheduler.submit("television commentary", PRIORITY_TELEVISION,
+                                 lambda token: comment_on_television.comment_on_television(
+                                     conversation, token, speculator))
+            elif event == "person":
                 import talk_with_person
-                talk_with_person.talk_with_person(bm_person)
+                # Pressing the intercom while the coyote is still answering cuts it off and listens again.
+                scheduler.submit("intercom", PRIORITY_INTERCOM,
+                                 lambda token, pressed_at=pressed_at: talk_with_person.talk_with_person(
+                                     bm_person, conversation, token, pressed_at),
+                                 barge_in=True)
         else:
-            # Sleep mode logic - check for both buttons pressed simultaneously
+            # Sleep mode logic - both buttons pressed simultaneously
             if bm_television.get_initial_state() and bm_person.get_initial_state():
-                # Archive the current conversation before BOOM
-                archived_file = archive_conversation(config)
-                if archived_file:
-                    print(f"Conversation archived to: {archived_file}")
-
-                if config.LLM == "ax650":
-                    if not ax650_soft_reset_and_reassert_prompt():
-                        print("AX650 BOOM reset completed with errors.")
-
-                
-                # Start erratic pattern on both LEDs
-                led_thread1 = start_led(config.GPIO_LED_DYNAMITE, "erratic")
-                led_thread2 = start_led(config.GPIO_LED_INTERCOM, "erratic")
-                # Play conversation archive sound
-                play_sound_effect(config.CONVERSATION_ARCHIVE_SOUND)                
-                print("BOOM!")
-                
-                # Run erratic pattern for a few seconds
-                time.sleep(1)
-                
-                # Stop both LED patterns
-                stop_led(led_thread1)
-                stop_led(led_thread2)
-        if stop_event.wait(0.1):
-            break
+                scheduler.submit("BOOM", PRIORITY_BOOM, lambda token: boom(conversation))
+
+    if speculator is not None:
+        speculator.stop()
+    scheduler.close()
+    if ollama is not None:
+        bm_wake_sleep.unregister_press_callback(ollama.wake)
+        bm_wake_sleep.unregister_release_callback(ollama.sleep)
+        ollama.stop()
+    bm_television.unregister_press_callback(on_television_press)
+    bm_person.unregister_press_callback(on_person_press)
+    # Fold the turn journal back into conversation.json before exiting
+    conversation.close()
     print("Coyote alive operations stopped.")
 
 
@@ -78,29 +158,85 @@ def start_transcriber():
     mic_match_index = getattr(config, "TRANSCRIBE_MIC_MATCH_INDEX", 0)
     if mic_name:
         command.extend(["--mic_name", mic_name, "--mic_match_index", str(mic_match_index)])
+    archive_dir = getattr(config, "TRANSCRIPT_ARCHIVE_DIR", "")
+    if archive_dir:
+        command.extend(["--archive_dir", archive_dir])
+    command.extend([
+        "--rotate_bytes", str(getattr(config, "TRANSCRIPT_ROTATE_BYTES", 1024 * 1024)),
+        "--rotate_seconds", str(getattr(config, "TRANSCRIPT_ROTATE_SECONDS", 24 * 60 * 60)),
+    ])
+    command.extend([
+        "--min_avg_prob", str(getattr(config, "TRANSCRIPT_MIN_AVG_PROB", 0.4)),
+        "--max_no_speech_prob", str(getattr(config, "TRANSCRIPT_MAX_NO_SPEECH_PROB", 0.6)),
+    ])
+    socket_path = getattr(config, "TRANSCRIPT_SOCKET_PATH", "")
+    if socket_path:
+        command.extend(["--socket_path", socket_path,
+                        "--ring_segments", str(getattr(config, "TRANSCRIPT_RING_SEGMENTS", 500)),
+                        "--product_seconds", str(getattr(config, "TRANSCRIPT_PRODUCT_SECONDS", 600))])
+    if getattr(config, "TRANSCRIBE_VAD", False):
+        command.extend(["--vad", "--server_port", str(getattr(config, "TRANSCRIBE_WHISPER_SERVER_PORT", 8911))])
     return subprocess.Popen(command)
 
 
 def main():
     """Start the transcriber process and coyote alive thread, and manage graceful shutdown."""
+    # Decode every sound effect once so later plays start instantly
+    if getattr(config, "SOUND_EFFECTS_PRELOAD", False):
+        preload_sound_effects()
+
     # Play startup sound when coyote.py first starts
     play_sound_effect(config.STARTUP_SOUND)
 
+    # Pre-render the fixed fallback lines into the speech cache in the background
+    from comment_on_television import LLM_ERROR_RESPONSE, NO_RESPONSE_TEXT
+    prerender_phrases_async(
+        [AX650_FALLBACK_RESPONSE, LLM_ERROR_RESPONSE, NO_RESPONSE_TEXT]
+        + list(getattr(config, "LLM_CANNED_RESPONSES", []) if getattr(config, "LLM_FALLBACK_CHAIN", []) else [])
+        + list(getattr(config, "SPEECH_CACHE_PRERENDER_PHRASES", []))
+    )
+
+    # Load the intercom whisper model and open the intercom mic now, not on the first press
+    person_speech = get_person_speech_service(config)
+
     if config.LLM == "ax650":
         if not ax650_soft_reset_and_reassert_prompt():
             print("AX650 startup reset completed with errors.")
     
     stop_event = threading.Event()
-    business_thread = threading.Thread(target=coyote_alive, args=(stop_event,))
+    # Set whenever the business thread or the transcriber ends, so the supervisor
+    # below sleeps until something actually happens instead of checking every second.
+    child_ended = threading.Event()
+    business_done = threading.Event()
+
+    def run_coyote_alive():
+        try:
+            coyote_alive(stop_event)
+        finally:
+            business_done.set()
+            child_ended.set()
+
+    def watch_transcriber(process):
+        process.wait()
+        child_ended.set()
+
+    def start_watched_transcriber():
+        process = start_transcriber()
+        threading.Thread(target=watch_transcriber, args=(process,), daemon=True).start()
+        return process
+
+    business_thread = threading.Thread(target=run_coyote_alive)
     business_thread.daemon = True
     business_thread.start()
 
     max_restarts = 20
     restart_count = 0
-    transcriber = start_transcriber()
+    transcriber = start_watched_transcriber()
 
     try:
-        while business_thread.is_alive():
+        while not business_done.is_set():
+            child_ended.wait()
+            child_ended.clear()
             retcode = transcriber.poll()
             if retcode is not None:
                 restart_count += 1
@@ -109,8 +245,7 @@ def main():
                     business_thread.join(timeout=5)
                     sys.exit("Transcriber crashed too many times, stopping coyote.py")
                 print(f"Transcriber ended with code {retcode}, restarting...")
-                transcriber = start_transcriber()
-            time.sleep(1)
+                transcriber = start_watched_transcriber()
     except KeyboardInterrupt:
         print("KeyboardInterrupt received, shutting down...")
         stop_event.set()
@@ -119,6 +254,9 @@ def main():
     finally:
         transcriber.terminate()
         print("Transcriber process terminated.")
+        if person_speech is not None:
+            person_speech.stop()
+        llm_client.close()
 
     print("Doing more stuff...")
 
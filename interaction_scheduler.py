@@ -0,0 +1,172 @@
+"""
+Runs the coyote's interactions (TV commentary, intercom replies, BOOM) one at
+a time on a worker thread, by priority.
+
+A new interaction that matters more than the one running cancels it: the
+running one's CancelToken fires, which closes its LLM stream and stops its
+speech, and the new one starts as soon as the old handler has unwound.
+Requests that matter the same or less while something is running are dropped,
+just as presses were while the old main loop was busy.
+"""
+
+import threading
+
+# Lower numbers win.
+PRIORITY_BOOM = 0
+PRIORITY_INTERCOM = 1
+PRIORITY_TELEVISION = 2
+
+
+class InteractionCancelled(Exception):
+    """Raised inside an interaction once its token has been cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag for one interaction, with callbacks to abort blocking work."""
+
+    def __init__(self, name=""):
+        self.name = name
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error while cancelling {self.name}: {e}")
+
+    def on_cancel(self, callback):
+        """Call `callback` when cancelled (straight away if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self):
+        if self.cancelled:
+            raise InteractionCancelled(self.name)
+
+    def wait(self, timeout=None):
+        """Sleep for up to `timeout` seconds; returns True if cancelled meanwhile."""
+        return self._event.wait(timeout)
+
+
+def call_cancellable(token, function, *args):
+    """
+    Run a blocking call that cannot itself be interrupted (e.g. a non-streaming HTTP
+    request) so that cancelling `token` abandons it at once. Raises InteractionCancelled.
+    """
+    if token is None:
+        return function(*args)
+    result = {}
+    finished = threading.Event()
+
+    def run():
+        try:
+            result["value"] = function(*args)
+        except Exception as e:
+            result["error"] = e
+        finished.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    token.on_cancel(finished.set)
+    finished.wait()
+    token.remove_callback(finished.set)
+    token.check()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class _Interaction:
+    def __init__(self, name, priority, handler):
+        self.name = name
+        self.priority = priority
+        self.handler = handler
+        self.token = CancelToken(name)
+
+
+class InteractionScheduler:
+    """One worker thread running the highest-priority interaction asked for."""
+
+    def __init__(self, on_idle=None):
+        self.on_idle = on_idle
+        self.condition = threading.Condition()
+        self.current = None
+        self.pending = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, name, priority, handler, barge_in=False):
+        """
+        Ask for `handler(token)` to run. Returns False if it was dropped because
+        something at least as important is already running or waiting. With
+        `barge_in`, it also interrupts an interaction of the same priority.
+        """
+        with self.condition:
+            if self.closed:
+                return False
+            busy_with = self.pending or self.current
+            if busy_with is not None and (priority > busy_with.priority or
+                                          (priority == busy_with.priority and not barge_in)):
+                print(f"Ignoring {name}: {busy_with.name} is in progress.")
+                return False
+            if self.current is not None and not self.current.token.cancelled:
+                print(f"Interrupting {self.current.name} for {name}.")
+                self.current.token.cancel()
+            self.pending = _Interaction(name, priority, handler)
+            self.condition.notify()
+            return True
+
+    def busy(self):
+        with self.condition:
+            return self.current is not None or self.pending is not None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                self.current, self.pending = self.pending, None
+                interaction = self.current
+            try:
+                interaction.handler(interaction.token)
+            except InteractionCancelled:
+                print(f"{interaction.name} cancelled.")
+            except Exception as e:
+                print(f"Error during {interaction.name}: {e}")
+            with self.condition:
+                self.current = None
+                idle = self.pending is None
+            if idle and self.on_idle is not None and not self.closed:
+                self.on_idle()
+
+    def close(self, timeout=5):
+        """Cancel whatever is running and stop the worker."""
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            if self.current is not None:
+                self.current.token.cancel()
+            self.condition.notify()
+        self.thread.join(timeout)
@@ -1,17 +1,33 @@
 import sys
 import config
 import json
-import requests
+import hashlib
+import threading
+import llm_client
+from conversation_store import read_messages
+from interaction_scheduler import InteractionCancelled, call_cancellable
 
 sys.stdout.reconfigure(encoding='utf-8')
 
 
 AX650_FALLBACK_RESPONSE = "Sorry, I had trouble generating a response."
 
+CONTEXT_SUMMARY_PREFIX = "Here is what happened earlier in this conversation: "
+# In stable-prefix mode, start summarizing once the window is this full.
+CONTEXT_SUMMARY_AHEAD = 0.85
+CONTEXT_SUMMARY_PROMPT = (
+    "Summarize the conversation below in at most four sentences, written as notes to yourself. "
+    "Keep the product names you heard about and anything your friend told you. "
+    "Reply with the summary only.\n\n"
+)
 
-def _load_messages(conversation_file):
-    with open(conversation_file, "r", encoding="utf-8") as f:
-        return json.load(f)
+
+def _load_messages(conversation):
+    # A live Conversation already holds its messages in memory; a path is read from disk,
+    # including messages still sitting in the append-only journal.
+    if hasattr(conversation, "messages"):
+        return conversation.messages
+    return read_messages(conversation)
 
 
 def _latest_user_prompt(messages):
@@ -24,19 +40,295 @@ def _latest_user_prompt(messages):
     return None
 
 
-def chat_completion_azure(conversation_file):
-    # Load conversation messages from file
-    messages = _load_messages(conversation_file)
+def _estimate_tokens(message):
+    # Roughly four characters per token plus a few tokens of per-message overhead.
+    return len(message.get("content") or "") // 4 + 4
+
+
+def _messages_digest(messages):
+    return hashlib.sha1(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _format_for_summary(messages):
+    lines = []
+    for message in messages:
+        content = (message.get("content") or "").strip()
+        if message.get("role") == "system" and content.startswith(CONTEXT_SUMMARY_PREFIX):
+            lines.append(f"Earlier: {content[len(CONTEXT_SUMMARY_PREFIX):]}")
+        elif message.get("role") == "user":
+            lines.append(f"Prompt: {content}")
+        elif message.get("role") == "assistant":
+            lines.append(f"You said: {content}")
+    return "\n".join(lines)
+
+
+class ContextWindow:
+    """
+    Keeps the messages sent to a chat backend within a token budget.
+
+    The system message and the most recent turns are always sent. Older turns
+    are folded into a cached summary message; the summary is regenerated on a
+    background thread after a reply, never while a request is waiting.
+
+    With `stable_prefix`, the window does not slide every turn. The same head
+    and older turns are sent again with the new turns appended, so the server
+    can reuse the prompt it has already evaluated. Only when that no longer
+    fits is the window rebuilt, down to `rebase_fraction` of the budget so it
+    can grow again for several turns.
+    """
+
+    def __init__(self, summarize, token_budget, recent_turns, stable_prefix=False, rebase_fraction=0.6):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.stable_prefix = stable_prefix
+        self.rebase_fraction = rebase_fraction
+        self.lock = threading.Lock()
+        self._summary = None
+        self._summary_count = 0
+        self._summary_digest = None
+        self._stale = None
+        self._worker = None
+        # (head, start, digest of messages[:start]) of the window being grown in stable_prefix mode.
+        self._anchor = None
+
+    def _split(self, messages):
+        system = [m for m in messages[:1] if m.get("role") == "system"]
+        rest = messages[len(system):]
+        recent_start = len(rest)
+        turns = 0
+        for index in range(len(rest) - 1, -1, -1):
+            if rest[index].get("role") == "user":
+                turns += 1
+                recent_start = index
+                if turns >= self.recent_turns:
+                    break
+        return system, rest[:recent_start], rest[recent_start:]
+
+    def _summary_for(self, older):
+        """The cached summary message covering the start of `older` (or None) and the turns it does not cover."""
+        with self.lock:
+            summary = None
+            unsummarized = older
+            if (self._summary and self._summary_count <= len(older)
+                    and _messages_digest(older[:self._summary_count]) == self._summary_digest):
+                summary = {"role": "system", "content": CONTEXT_SUMMARY_PREFIX + self._summary}
+                unsummarized = older[self._summary_count:]
+            self._stale = older if unsummarized else None
+        return summary, unsummarized
+
+    def _window(self, messages, budget):
+        """Return (head, start): send head + messages[start:], fitting `budget` where the recent turns allow."""
+        system, older, recent = self._split(messages)
+        summary, unsummarized = self._summary_for(older)
+
+        head = system + ([summary] if summary else [])
+        used = sum(_estimate_tokens(m) for m in head + recent)
+        kept = []
+        # Fill whatever budget is left with the newest turns the summary does not cover yet.
+        for message in reversed(unsummarized):
+            used += _estimate_tokens(message)
+            if used > budget:
+                break
+            kept.insert(0, message)
+        # Never start the window on a dangling assistant reply.
+        while kept and kept[0].get("role") != "user":
+            kept.pop(0)
+        return head, len(messages) - len(kept) - len(recent)
+
+    def build(self, messages):
+        """Return the messages to send for this turn."""
+        if not self.token_budget or sum(_estimate_tokens(m) for m in messages) <= self.token_budget:
+            return messages
+        if self.stable_prefix:
+            return self._build_stable(messages)
+        head, start = self._window(messages, self.token_budget)
+        return head + messages[start:]
+
+    def _build_stable(self, messages):
+        with self.lock:
+            anchor = self._anchor
+        if anchor is not None:
+            head, start, digest = anchor
+            if start <= len(messages) and _messages_digest(messages[:start]) == digest:
+                window = head + messages[start:]
+                used = sum(_estimate_tokens(m) for m in window)
+                if used <= self.token_budget:
+                    if used > self.token_budget * CONTEXT_SUMMARY_AHEAD:
+                        # A rebase is coming: have the summary ready for it.
+                        self._summary_for(self._split(messages)[1])
+                    else:
+                        # A summary request displaces the server's cached prompt, so
+                        # summarize only when the next rebase needs it.
+                        with self.lock:
+                            self._stale = None
+                    return window
+        head, start = self._window(messages, int(self.token_budget * self.rebase_fraction))
+        with self.lock:
+            self._anchor = (head, start, _messages_digest(messages[:start]))
+            self._stale = None
+        return head + messages[start:]
+
+    def refresh_summary_async(self):
+        """Fold any turns that fell out of the window into the summary, off the critical path."""
+        with self.lock:
+            older = self._stale
+            if not older or (self._worker is not None and self._worker.is_alive()):
+                return
+            self._stale = None
+            previous = self._summary
+            previous_count = self._summary_count
+            previous_digest = self._summary_digest
+
+        def worker():
+            if previous and _messages_digest(older[:previous_count]) == previous_digest:
+                to_fold = [{"role": "system", "content": CONTEXT_SUMMARY_PREFIX + previous}] + older[previous_count:]
+            else:
+                to_fold = older
+            try:
+                summary = (self.summarize(_format_for_summary(to_fold)) or "").strip()
+            except Exception as e:
+                print(f"Context summary failed: {e}")
+                return
+            if not summary:
+                return
+            with self.lock:
+                self._summary = summary
+                self._summary_count = len(older)
+                self._summary_digest = _messages_digest(older)
+
+        self._worker = threading.Thread(target=worker, daemon=True)
+        self._worker.start()
+
+
+class PromptStats:
+    """
+    How much of each Ollama prompt the server had to evaluate. Ollama reports
+    prompt_eval_count/prompt_eval_duration for the tokens it actually
+    evaluated; tokens reused from the prompt it already held are not counted.
+    The previous request and its reply are kept to show how many leading
+    messages the new request shares with what the server has evaluated.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+        self.eval_seconds = 0.0
+        self._evaluated = None
+
+    def _unchanged(self, messages):
+        evaluated = self._evaluated or []
+        count = 0
+        for sent, held in zip(messages, evaluated):
+            if sent != held:
+                break
+            count += 1
+        return count
+
+    def record(self, messages, reply, result):
+        evaluated = result.get("prompt_eval_count")
+        if evaluated is None:
+            return
+        seconds = (result.get("prompt_eval_duration") or 0) / 1e9
+        estimated = sum(_estimate_tokens(m) for m in messages)
+        with self.lock:
+            unchanged = self._unchanged(messages)
+            self.turns += 1
+            self.prompt_tokens += estimated
+            self.evaluated_tokens += evaluated
+            self.eval_seconds += seconds
+            self._evaluated = messages + [{"role": "assistant", "content": reply}]
+        print(f"Ollama prompt: evaluated {evaluated} of ~{estimated} tokens in {seconds:.2f} s; "
+              f"{unchanged} of {len(messages)} messages already held by the server.")
+
+    def forget(self):
+        """The server now holds some other prompt (e.g. a summary request)."""
+        with self.lock:
+            self._evaluated = None
+
+    def totals(self):
+        with self.lock:
+            return {
+                "turns": self.turns,
+                "prompt_tokens": self.prompt_tokens,
+                "evaluated_tokens": self.evaluated_tokens,
+                "eval_seconds": round(self.eval_seconds, 3),
+            }
+
+
+ollama_prompt_stats = PromptStats()
+
+_context_windows = {}
+
+
+def _context_window(backend):
+    window = _context_windows.get(backend)
+    if window is None:
+        summarizers = {"azure": _summarize_azure, "ollama": _summarize_ollama}
+        window = ContextWindow(
+            summarizers[backend],
+            getattr(config, "LLM_CONTEXT_TOKEN_BUDGET", 0),
+            getattr(config, "LLM_CONTEXT_RECENT_TURNS", 3),
+            stable_prefix=backend == "ollama" and getattr(config, "OLLAMA_INCREMENTAL_CONTEXT", False),
+        )
+        _context_windows[backend] = window
+    return window
+
+
+def _summary_request_messages(transcript):
+    return [
+        {"role": "system", "content": config.SYSTEM_MESSAGE_TEXT},
+        {"role": "user", "content": CONTEXT_SUMMARY_PROMPT + transcript},
+    ]
+
+
+def _summarize_azure(transcript):
+    completion = llm_client.get_azure_client().chat.completions.create(
+        model=config.AZURE_MODEL,
+        messages=_summary_request_messages(transcript),
+        temperature=0.3,
+        max_tokens=getattr(config, "LLM_CONTEXT_SUMMARY_MAX_TOKENS", 120),
+    )
+    return completion.choices[0].message.content
 
-    from openai import AzureOpenAI
 
-    client = AzureOpenAI(
-        azure_endpoint=config.AZURE_OPENAI_GPT4_ENDPOINT,
-        api_key=config.AZURE_OPENAI_GPT4_KEY,
-        api_version="2024-02-15-preview"
-    )
+def _summarize_ollama(transcript):
+    options = _ollama_options()
+    options["temperature"] = 0.3
+    options["num_predict"] = getattr(config, "LLM_CONTEXT_SUMMARY_MAX_TOKENS", 120)
+    payload = {
+        "model": config.OLLAMA_MODEL,
+        "think": False,
+        "keep_alive": config.OLLAMA_KEEP_ALIVE,
+        "stream": False,
+        "options": options,
+        "messages": _summary_request_messages(transcript),
+    }
+    llm_response = llm_client.post(config.OLLAMA_ENDPOINT, json=payload)
+    ollama_prompt_stats.forget()
+    return json.loads(llm_response.content.decode())['message']['content']
+
+
+def _ollama_options():
+    return {
+        "temperature": config.OLLAMA_TEMPERATURE,
+        "top_k": config.OLLAMA_TOP_K,
+        "top_p": config.OLLAMA_TOP_P,
+        "repeat_last_n": config.OLLAMA_REPEAT_LAST_N,
+        "repeat_penalty": config.OLLAMA_REPEAT_PENALTY,
+        "num_predict": config.OLLAMA_NUM_PREDICT,
+        "stop": ["#", "["]
+    }
+
 
-    completion = client.chat.completions.create(
+def chat_completion_azure(conversation):
+    # Load conversation messages, trimmed to the context budget
+    window = _context_window("azure")
+    messages = window.build(_load_messages(conversation))
+
+    completion = llm_client.get_azure_client().chat.completions.create(
         model=config.AZURE_MODEL,
         messages=messages,
         temperature=0.9,
@@ -52,31 +344,26 @@ def chat_completion_azure(conversation_file):
     print(response)
     print("\n")
 
+    window.refresh_summary_async()
+
     return response
 
 
-def chat_completion_ollama(conversation_file):
-    # Load conversation messages from file
-    messages = _load_messages(conversation_file)
+def chat_completion_ollama(conversation):
+    # Load conversation messages, trimmed to the context budget
+    window = _context_window("ollama")
+    messages = window.build(_load_messages(conversation))
 
     payload = {
         "model": config.OLLAMA_MODEL,
         "think": False,
         "keep_alive": config.OLLAMA_KEEP_ALIVE,
         "stream": False,
-        "options": {
-            "temperature": config.OLLAMA_TEMPERATURE,
-            "top_k": config.OLLAMA_TOP_K,
-            "top_p": config.OLLAMA_TOP_P,
-            "repeat_last_n": config.OLLAMA_REPEAT_LAST_N,
-            "repeat_penalty": config.OLLAMA_REPEAT_PENALTY,
-            "num_predict": config.OLLAMA_NUM_PREDICT,
-            "stop": ["#", "["]
-        },
+        "options": _ollama_options(),
         "messages": messages
     }
 
-    llm_response = requests.post(config.OLLAMA_ENDPOINT, json=payload)
+    llm_response = llm_client.post(config.OLLAMA_ENDPOINT, json=payload)
     llm_response_decoded = llm_response.content.decode()
     llm_response_json = json.loads(llm_response_decoded)
 
@@ -84,17 +371,70 @@ def chat_completion_ollama(conversation_file):
     print("\n")
     print(response)
     print("\n")
+    ollama_prompt_stats.record(messages, response, llm_response_json)
+
+    window.refresh_summary_async()
 
     return response
 
 
-def chat_completion_ax650(conversation_file):
+def chat_completion_ollama_stream(conversation, token=None):
+    """
+    Yield the reply as Ollama generates it, one NDJSON chunk at a time.
+    Cancelling `token` shuts down the connection, even before the reply has started,
+    which makes Ollama stop generating.
+    """
+    # Load conversation messages, trimmed to the context budget
+    window = _context_window("ollama")
+    messages = window.build(_load_messages(conversation))
+
+    payload = {
+        "model": config.OLLAMA_MODEL,
+        "think": False,
+        "keep_alive": config.OLLAMA_KEEP_ALIVE,
+        "stream": True,
+        "options": _ollama_options(),
+        "messages": messages
+    }
+
+    parts = []
+    final = {}
+    try:
+        with llm_client.post(config.OLLAMA_ENDPOINT, json=payload, stream=True, token=token) as llm_response:
+            for line in llm_response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                content = (chunk.get("message") or {}).get("content") or ""
+                if content:
+                    parts.append(content)
+                    yield content
+                if chunk.get("done"):
+                    final = chunk
+                    break
+    except InteractionCancelled:
+        return
+    except Exception:
+        if token is not None and token.cancelled:
+            # The shut-down socket ends the read with an error; the reply was abandoned anyway.
+            return
+        raise
+
+    print("\n")
+    print("".join(parts))
+    print("\n")
+    ollama_prompt_stats.record(messages, "".join(parts), final)
+
+    window.refresh_summary_async()
+
+
+def chat_completion_ax650(conversation):
     timeout = getattr(config, "AX650_TIMEOUT_SECONDS", 30)
     endpoint = getattr(config, "AX650_GENERATE_ENDPOINT", "http://localhost:11434/api/generate")
     model = getattr(config, "AX650_MODEL", "qwen3-ax650")
 
     try:
-        messages = _load_messages(conversation_file)
+        messages = _load_messages(conversation)
         prompt = _latest_user_prompt(messages)
         if not prompt:
             print("AX650 error: no latest user prompt found in conversation.")
@@ -105,7 +445,7 @@ def chat_completion_ax650(conversation_file):
             "prompt": prompt,
             "stream": False,
         }
-        llm_response = requests.post(endpoint, json=payload, timeout=timeout)
+        llm_response = llm_client.post(endpoint, json=payload, timeout=timeout)
         llm_response.raise_for_status()
         llm_response_json = llm_response.json()
 
@@ -132,14 +472,14 @@ def ax650_soft_reset_and_reassert_prompt():
     ok = True
 
     try:
-        requests.get(stop_endpoint, timeout=timeout).raise_for_status()
+        llm_client.get(stop_endpoint, timeout=timeout).raise_for_status()
         print(f"AX650 runtime stop OK: {stop_endpoint}")
     except Exception as e:
         ok = False
         print(f"AX650 runtime stop failed at {stop_endpoint}: {e}")
 
     try:
-        requests.post(reset_endpoint, json=reset_payload, timeout=timeout).raise_for_status()
+        llm_client.post(reset_endpoint, json=reset_payload, timeout=timeout).raise_for_status()
         print(f"AX650 runtime reset OK: {reset_endpoint}")
     except Exception as e:
         ok = False
@@ -148,14 +488,94 @@ def ax650_soft_reset_and_reassert_prompt():
     return ok
 
 
-def llm_chat_completion(conversation_file):
+def _ollama_model_request(messages, keep_alive, options=None):
+    payload = {
+        "model": config.OLLAMA_MODEL,
+        "think": False,
+        "keep_alive": keep_alive,
+        "stream": False,
+        "messages": messages,
+    }
+    if options is not None:
+        payload["options"] = options
+    llm_response = llm_client.post(config.OLLAMA_ENDPOINT, json=payload)
+    llm_response.raise_for_status()
+    return llm_response
+
+
+def ollama_preload_and_warm_prompt():
+    """
+    Load OLLAMA_MODEL and have it evaluate the system prompt, so the next turn pays for
+    neither the model load nor the persona prefix. The options match a real turn's,
+    since different ones (e.g. num_ctx) would make Ollama reload the model.
+    """
+    options = _ollama_options()
+    options["num_predict"] = 1
+    try:
+        _ollama_model_request([{"role": "system", "content": config.SYSTEM_MESSAGE_TEXT}],
+                              config.OLLAMA_KEEP_ALIVE, options)
+        print(f"Ollama model {config.OLLAMA_MODEL} loaded and system prompt warmed.")
+        return True
+    except Exception as e:
+        print(f"Ollama preload failed at {config.OLLAMA_ENDPOINT}: {e}")
+        return False
+
+
+def ollama_keep_warm():
+    """Restart the model's keep-alive timer without generating anything."""
+    try:
+        _ollama_model_request([], config.OLLAMA_KEEP_ALIVE)
+        return True
+    except Exception as e:
+        print(f"Ollama keep-alive failed at {config.OLLAMA_ENDPOINT}: {e}")
+        return False
+
+
+def ollama_unload():
+    """Ask Ollama to unload the model now, freeing its memory."""
+    try:
+        _ollama_model_request([], 0)
+        print(f"Ollama model {config.OLLAMA_MODEL} unloaded.")
+        return True
+    except Exception as e:
+        print(f"Ollama unload failed at {config.OLLAMA_ENDPOINT}: {e}")
+        return False
+
+
+def llm_chat_completion(conversation):
+    """
+    Dispatch to the configured backend. `conversation` is a Conversation or a conversation file path.
+    With LLM_FALLBACK_CHAIN set, the backends are tried in turn with deadlines (see llm_dispatcher).
+    """
+    if getattr(config, "LLM_FALLBACK_CHAIN", []):
+        import llm_dispatcher
+        return llm_dispatcher.dispatch(conversation)
     if config.LLM == "azure":
-        return chat_completion_azure(conversation_file)
+        return chat_completion_azure(conversation)
     elif config.LLM == "ollama":
-        return chat_completion_ollama(conversation_file)
+        return chat_completion_ollama(conversation)
     elif config.LLM == "ax650":
-        return chat_completion_ax650(conversation_file)
+        return chat_completion_ax650(conversation)
     # Fallback behavior
-    return f"Default LLM response using conversation file: {conversation_file}"
-
-
+    return f"Default LLM response using conversation: {conversation}"
+
+
+def llm_chat_completion_stream(conversation, token=None):
+    """
+    Yield the reply in pieces as it is generated. Backends without streaming
+    support (or with OLLAMA_STREAM off) yield the whole reply as one piece.
+    Cancelling `token` abandons the request; nothing more is yielded.
+    """
+    if config.LLM == "ollama" and getattr(config, "OLLAMA_STREAM", False):
+        if getattr(config, "LLM_FALLBACK_CHAIN", []):
+            import llm_dispatcher
+            yield from llm_dispatcher.stream_with_fallback(conversation, token)
+        else:
+            yield from chat_completion_ollama_stream(conversation, token)
+        return
+    try:
+        response = call_cancellable(token, llm_chat_completion, conversation)
+    except InteractionCancelled:
+        return
+    if response:
+        yield response
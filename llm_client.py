@@ -0,0 +1,203 @@
+"""
+Shared HTTP clients for the LLM backends.
+
+Each server (scheme, host and port) gets one long-lived requests.Session with
+a small keep-alive connection pool, so a turn reuses the connection opened by
+the previous one instead of paying TCP (and, over the VPN, TLS) setup again.
+Every request gets a connect and read timeout; failures to connect are retried
+a couple of times with a short backoff, but a request the server may already
+be working on is never sent twice. A request given a CancelToken runs on a
+helper thread, and cancelling the token shuts down its socket, so the server
+stops even while the reply headers are still awaited. The Azure OpenAI client
+is likewise built once and reused.
+"""
+
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5
+# Between bytes of the reply; a non-streaming request gets nothing until generation is done.
+DEFAULT_READ_TIMEOUT_SECONDS = 120
+DEFAULT_CONNECT_RETRIES = 2
+# The reply stream, a background summary and a speculative draft can overlap.
+POOL_SIZE = 4
+
+_sessions = {}
+_azure_client = None
+_lock = threading.Lock()
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def default_timeout():
+    """(connect, read) timeout in seconds for LLM requests, from config."""
+    return (
+        getattr(config, "LLM_CONNECT_TIMEOUT_SECONDS", DEFAULT_CONNECT_TIMEOUT_SECONDS),
+        getattr(config, "LLM_READ_TIMEOUT_SECONDS", DEFAULT_READ_TIMEOUT_SECONDS),
+    )
+
+
+class _AbortableAdapter(HTTPAdapter):
+    """Keeps track of which request holds each pooled connection, so one request can be aborted."""
+
+    def __init__(self, **kwargs):
+        self.owners = {}
+        self.local = threading.local()
+        self.owners_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: self._tracking_pool(pool_class)
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def _tracking_pool(self, pool_class):
+        adapter = self
+
+        class TrackingPool(pool_class):
+            def _get_conn(self, timeout=None):
+                conn = super()._get_conn(timeout)
+                owner = getattr(adapter.local, "owner", None)
+                if owner is not None:
+                    with adapter.owners_lock:
+                        adapter.owners[conn] = owner
+                return conn
+
+            def _put_conn(self, conn):
+                with adapter.owners_lock:
+                    adapter.owners.pop(conn, None)
+                super()._put_conn(conn)
+
+        return TrackingPool
+
+    def abort(self, owner):
+        """Shut down the sockets held by the request `owner`, waking it with an error."""
+        with self.owners_lock:
+            conns = [conn for conn, held_by in self.owners.items() if held_by is owner]
+        for conn in conns:
+            sock = getattr(conn, "sock", None)
+            if sock is None:
+                continue
+            try:
+                # Unlike close(), this also wakes a recv() blocked in another thread.
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _new_session():
+    retries = getattr(config, "LLM_CONNECT_RETRIES", DEFAULT_CONNECT_RETRIES)
+    retry = Retry(total=retries, connect=retries, read=0, status=0,
+                  backoff_factor=0.2, raise_on_status=False)
+    adapter = _AbortableAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url):
+    """The shared keep-alive Session for the server `url` is on."""
+    origin = _origin(url)
+    with _lock:
+        session = _sessions.get(origin)
+        if session is None:
+            session = _sessions[origin] = _new_session()
+        return session
+
+
+def request(method, url, timeout=None, token=None, **kwargs):
+    """
+    Send a request on the shared session for `url`, with the configured timeouts unless given.
+    With a `token`, cancelling it aborts the request (a streamed reply included) and raises
+    InteractionCancelled.
+    """
+    session = get_session(url)
+    timeout = timeout or default_timeout()
+    if token is None:
+        return session.request(method, url, timeout=timeout, **kwargs)
+    token.check()
+    adapter = session.get_adapter(url)
+    owner = object()
+    result = {}
+    finished = threading.Event()
+
+    def run():
+        adapter.local.owner = owner
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+            if token.cancelled:
+                # Nobody is waiting for it any more.
+                response.close()
+            result["value"] = response
+        except Exception as e:
+            result["error"] = e
+        finally:
+            adapter.local.owner = None
+        finished.set()
+
+    def abort():
+        adapter.abort(owner)
+        finished.set()
+
+    # Registered before sending, so a cancel while the server is still thinking is not missed.
+    token.on_cancel(abort)
+    threading.Thread(target=run, daemon=True).start()
+    finished.wait()
+    if token.cancelled or "error" in result:
+        token.remove_callback(abort)
+        token.check()
+        raise result["error"]
+    # Left registered: a streamed body is still read over the same socket.
+    return result["value"]
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def get_azure_client():
+    """The shared AzureOpenAI client (it keeps its own connection pool)."""
+    global _azure_client
+    with _lock:
+        if _azure_client is None:
+            import httpx
+            from openai import AzureOpenAI
+
+            connect_timeout, read_timeout = default_timeout()
+            _azure_client = AzureOpenAI(
+                azure_endpoint=config.AZURE_OPENAI_GPT4_ENDPOINT,
+                api_key=config.AZURE_OPENAI_GPT4_KEY,
+                api_version="2024-02-15-preview",
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                max_retries=getattr(config, "LLM_CONNECT_RETRIES", DEFAULT_CONNECT_RETRIES),
+            )
+        return _azure_client
+
+
+def close():
+    """Close every pooled connection, e.g. at shutdown."""
+    global _azure_client
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        if _azure_client is not None:
+            _azure_client.close()
+            _azure_client = None
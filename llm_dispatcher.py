@@ -0,0 +1,205 @@
+"""
+LLM fallback chain with per-backend deadlines and optional hedging.
+
+The backends are tried in LLM_FALLBACK_CHAIN order, starting with config.LLM.
+A backend that raises, returns nothing (or its own error line), or misses
+its deadline hands over to the next one. With LLM_HEDGE_AFTER_SECONDS set,
+the next backend is also started if the current one has not answered by
+then, and whichever answers first wins. If nothing has answered by
+LLM_ANSWER_DEADLINE_SECONDS, a canned line is returned, so the coyote always
+says something within a bounded time. A streamed Ollama reply that stalls for
+LLM_STREAM_CHUNK_DEADLINE_SECONDS between pieces is ended where it is.
+
+Each attempt runs on its own daemon thread. The backends are blocking HTTP
+calls, so an attempt that loses or times out is abandoned rather than
+interrupted; its result is ignored.
+"""
+
+import queue
+import random
+import threading
+import time
+
+import config
+import llm_chat_completion
+from interaction_scheduler import CancelToken, InteractionCancelled, call_cancellable
+
+DEFAULT_BACKEND_DEADLINE_SECONDS = 30
+DEFAULT_ANSWER_DEADLINE_SECONDS = 45
+DEFAULT_STREAM_CHUNK_DEADLINE_SECONDS = 10
+DEFAULT_CANNED_RESPONSES = [
+    "Hold that thought, my genius brain is still warming up.",
+    "Sorry, I'm having trouble thinking right now.",
+]
+
+
+def chat_completion_canned(conversation):
+    """A stock line, for the end of the chain."""
+    return random.choice(getattr(config, "LLM_CANNED_RESPONSES", None) or DEFAULT_CANNED_RESPONSES)
+
+
+def _backends():
+    # Looked up on each call so the backends can be patched in tests.
+    return {
+        "azure": llm_chat_completion.chat_completion_azure,
+        "ollama": llm_chat_completion.chat_completion_ollama,
+        "ax650": llm_chat_completion.chat_completion_ax650,
+        "canned": chat_completion_canned,
+    }
+
+
+def backend_chain():
+    """config.LLM followed by the rest of LLM_FALLBACK_CHAIN, without repeats."""
+    chain = [config.LLM]
+    for backend in getattr(config, "LLM_FALLBACK_CHAIN", []):
+        if backend not in chain:
+            chain.append(backend)
+    return chain
+
+
+def backend_deadline(backend):
+    deadlines = getattr(config, "LLM_BACKEND_DEADLINE_SECONDS", {})
+    return deadlines.get(backend, DEFAULT_BACKEND_DEADLINE_SECONDS)
+
+
+def is_fallback_reply(reply):
+    """True unless `reply` is a real LLM answer: empty replies, a backend's own error line and canned lines are not."""
+    if not isinstance(reply, str) or not reply.strip():
+        return True
+    reply = " ".join(reply.split())
+    canned = getattr(config, "LLM_CANNED_RESPONSES", None) or DEFAULT_CANNED_RESPONSES
+    # chat_completion_ax650 reports its own failures with this line instead of raising.
+    return reply == llm_chat_completion.AX650_FALLBACK_RESPONSE or reply in canned or reply in DEFAULT_CANNED_RESPONSES
+
+
+def _usable(backend, reply):
+    # The canned backend answers with fallback lines by design.
+    return (backend == "canned" and isinstance(reply, str)) or not is_fallback_reply(reply)
+
+
+def answer_deadline_from_now():
+    """The time.monotonic() by which a reply is due, LLM_ANSWER_DEADLINE_SECONDS from now."""
+    return time.monotonic() + getattr(config, "LLM_ANSWER_DEADLINE_SECONDS", DEFAULT_ANSWER_DEADLINE_SECONDS)
+
+
+def dispatch(conversation, chain=None, answer_deadline=None):
+    """
+    Return the first usable reply from the chain, or a canned line once the answer deadline
+    (a time.monotonic(), by default LLM_ANSWER_DEADLINE_SECONDS from now) passes.
+    """
+    chain = list(chain or backend_chain())
+    backends = _backends()
+    hedge_after = getattr(config, "LLM_HEDGE_AFTER_SECONDS", 0)
+    answer_deadline = answer_deadline or answer_deadline_from_now()
+    results = queue.Queue()
+    pending = {}
+
+    def attempt(backend):
+        try:
+            results.put((backend, backends[backend](conversation)))
+        except Exception as e:
+            results.put((backend, e))
+
+    def launch():
+        backend = chain.pop(0)
+        if backend not in backends:
+            print(f"Unknown LLM backend {backend!r} in the fallback chain.")
+            return
+        started = time.monotonic()
+        pending[backend] = (started, started + backend_deadline(backend))
+        threading.Thread(target=attempt, args=(backend,), daemon=True).start()
+
+    while True:
+        now = time.monotonic()
+        for backend, (_, deadline) in list(pending.items()):
+            if now >= deadline:
+                print(f"LLM backend {backend} missed its {backend_deadline(backend)} s deadline.")
+                del pending[backend]
+        if not pending and chain:
+            launch()
+            continue
+        if hedge_after and chain and len(pending) == 1:
+            started = next(iter(pending.values()))[0]
+            if now - started >= hedge_after:
+                print(f"LLM backend {next(iter(pending))} is slow; also asking {chain[0]}.")
+                launch()
+                continue
+        if not pending or now >= answer_deadline:
+            print("No LLM backend answered in time; using a canned reply.")
+            return chat_completion_canned(conversation)
+
+        wake_at = min([deadline for _, deadline in pending.values()] + [answer_deadline])
+        if hedge_after and chain and len(pending) == 1:
+            wake_at = min(wake_at, next(iter(pending.values()))[0] + hedge_after)
+        try:
+            backend, reply = results.get(timeout=max(0.0, wake_at - now))
+        except queue.Empty:
+            continue
+        if backend not in pending:
+            continue
+        del pending[backend]
+        if _usable(backend, reply):
+            return reply
+        print(f"LLM backend {backend} failed: {reply if isinstance(reply, Exception) else 'no usable reply'}")
+
+
+def stream_with_fallback(conversation, token=None):
+    """
+    Stream the reply from Ollama, but if its first piece has not arrived within
+    Ollama's deadline, drop the stream and answer from the rest of the chain by
+    the same answer deadline. A stream that stalls later on is ended there.
+    """
+    answer_deadline = answer_deadline_from_now()
+    chunk_deadline = getattr(config, "LLM_STREAM_CHUNK_DEADLINE_SECONDS", DEFAULT_STREAM_CHUNK_DEADLINE_SECONDS)
+    stream_token = CancelToken("ollama stream")
+    if token is not None:
+        token.on_cancel(stream_token.cancel)
+    chunks = llm_chat_completion.chat_completion_ollama_stream(conversation, stream_token)
+    pieces = queue.Queue()
+    # Wakes the wait below as soon as the interaction is cancelled.
+    stream_token.on_cancel(lambda: pieces.put(("cancelled", None)))
+
+    def read():
+        try:
+            for chunk in chunks:
+                pieces.put(("chunk", chunk))
+            pieces.put(("done", None))
+        except Exception as e:
+            pieces.put(("error", e))
+
+    threading.Thread(target=read, daemon=True).start()
+    first_deadline = min(time.monotonic() + backend_deadline("ollama"), answer_deadline)
+    started = False
+    try:
+        while True:
+            timeout = chunk_deadline if started else first_deadline - time.monotonic()
+            try:
+                kind, value = pieces.get(timeout=max(0.0, timeout))
+            except queue.Empty:
+                kind, value = "late", None
+            if token is not None and token.cancelled:
+                return
+            if kind == "chunk":
+                if value:
+                    started = True
+                    yield value
+                continue
+            if started:
+                if kind != "done":
+                    print(f"Ollama stream stopped mid-reply: {value or f'nothing for {chunk_deadline} s'}")
+                return
+            break
+    finally:
+        stream_token.cancel()
+        if token is not None:
+            token.remove_callback(stream_token.cancel)
+
+    if kind == "late":
+        print(f"Ollama sent nothing within its {backend_deadline('ollama')} s deadline.")
+    else:
+        print(f"Ollama stream failed: {value or 'empty reply'}")
+    chain = [b for b in backend_chain() if b != "ollama"] or ["canned"]
+    try:
+        yield call_cancellable(token, dispatch, conversation, chain, answer_deadline)
+    except InteractionCancelled:
+        return
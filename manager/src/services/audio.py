@@ -17,6 +17,46 @@ FEEDBACK_SOUND_NAME = "volume-feedback-tone"
 # Flag to track if the sample has been uploaded
 feedback_sample_uploaded = False
 
+# The feedback tone is decoded once and written to a long-lived pacat stream per sink,
+# so each volume step plays without starting a player or decoding the MP3 again.
+FEEDBACK_SAMPLE_RATE = 22050
+feedback_pcm = None
+feedback_streams: Dict[int, subprocess.Popen] = {}
+
+
+def _decoded_feedback_tone():
+    """Decode the feedback tone to mono 16-bit PCM once and keep it in memory."""
+    global feedback_pcm
+    if feedback_pcm is None:
+        try:
+            result = subprocess.run(
+                ["mpg123", "-q", "-s", "-m", "-r", str(FEEDBACK_SAMPLE_RATE), "-e", "s16", FEEDBACK_SOUND_PATH],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False,
+            )
+        except FileNotFoundError:
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        feedback_pcm = result.stdout
+    return feedback_pcm
+
+
+def _feedback_stream(index: int):
+    """Return a running pacat playback stream for a sink, starting one if needed."""
+    process = feedback_streams.get(index)
+    if process is not None and process.poll() is None:
+        return process
+    try:
+        process = subprocess.Popen(
+            ["pacat", "--playback", f"--device={index}", f"--rate={FEEDBACK_SAMPLE_RATE}",
+             "--channels=1", "--format=s16le", "--latency-msec=20"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return None
+    feedback_streams[index] = process
+    return process
+
 class AudioDevice:
     def __init__(self, name: str, index: int, volume: float):
         self.name = name
@@ -277,6 +317,19 @@ class AudioManager:
             print(f">>> ERROR: Sound file not found at {FEEDBACK_SOUND_PATH}")
             return
         
+        # First try: write the pre-decoded tone to a persistent stream on the sink
+        pcm = _decoded_feedback_tone()
+        stream = _feedback_stream(index) if pcm else None
+        if stream is not None:
+            try:
+                stream.stdin.write(pcm)
+                stream.stdin.flush()
+                print(">>> Success (persistent stream)!")
+                return
+            except (BrokenPipeError, OSError) as e:
+                feedback_streams.pop(index, None)
+                print(f">>> Persistent stream failed: {e}")
+
         # Try: Use paplay and specify device (this worked)
         try:
             cmd = f"paplay --device={index} {FEEDBACK_SOUND_PATH}"
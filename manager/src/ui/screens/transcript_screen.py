@@ -1,11 +1,58 @@
 import os
 import select
 import sys
+import time
 from ...utils.terminal import clear_screen
 
+# The transcript reader lives in the coyote project that this manager sits inside
+COYOTE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+try:
+    from audio_to_text.transcript_reader import get_transcript_tail
+    from audio_to_text.transcript_service import last_segments
+    from audio_to_text.transcript_archive import lines_between
+    from audio_to_text.transcript_records import DEFAULT_MIN_AVG_PROB, is_usable
+except ImportError:
+    sys.path.insert(0, COYOTE_ROOT)
+    from audio_to_text.transcript_reader import get_transcript_tail
+    from audio_to_text.transcript_service import last_segments
+    from audio_to_text.transcript_archive import lines_between
+    from audio_to_text.transcript_records import DEFAULT_MIN_AVG_PROB, is_usable
+
+# The transcriber's socket as the coyote config sets it; "" means it is turned off.
+try:
+    import config as coyote_config
+    transcript_socket_path = getattr(coyote_config, "TRANSCRIPT_SOCKET_PATH", "")
+    transcript_min_avg_prob = getattr(coyote_config, "TRANSCRIPT_MIN_AVG_PROB", DEFAULT_MIN_AVG_PROB)
+except ImportError:
+    from audio_to_text.transcript_service import DEFAULT_SOCKET_PATH as transcript_socket_path
+    transcript_min_avg_prob = DEFAULT_MIN_AVG_PROB
+
+
+def show_transcript_history(transcript_path, archive_dir):
+    """Show five minutes of transcript from a chosen time in the past, using the archive's time index."""
+    try:
+        minutes_ago = float(input("Show transcript from how many minutes ago? "))
+    except ValueError:
+        return
+    start_time = time.time() - minutes_ago * 60
+    lines = lines_between(transcript_path, archive_dir, start_time, start_time + 5 * 60)
+    clear_screen()
+    print("=" * 13 + " Transcript History " + "=" * 16)
+    print(f"From around {time.strftime('%Y-%m-%d %H:%M', time.localtime(start_time))}")
+    print("=" * 49)
+    if not lines:
+        print("Nothing was transcribed around then.")
+    for line in lines[:50]:
+        print(f"* {line}")
+    if len(lines) > 50:
+        print(f"... and {len(lines) - 50} more lines")
+    input("Press Enter to continue...")
+
 def show_television_transcript():
     """Display television transcript with auto-refresh functionality."""
     transcript_path = os.path.expanduser("~/coyote_interactive/audio_to_text/transcription.txt")
+    transcript = get_transcript_tail(transcript_path)
+    archive_dir = os.path.expanduser("~/coyote_interactive/audio_to_text/transcript_archive")
     last_lines = []
     lines_to_show = 3
     refresh_rate = 1
@@ -29,22 +76,29 @@ def show_television_transcript():
                     return
                 continue
             
-            # Read the latest content from the file
-            with open(transcript_path, "r") as file:
-                all_lines = file.readlines()
-                if not all_lines:
-                    print("Transcript file is empty.")
-                else:
-                    last_lines = all_lines[-lines_to_show:]
-                    # Add simple ASCII character at the start of each line
-                    for line in last_lines:
-                        print(f"* {line.strip()}")
+            # Ask the running transcriber first (no file I/O, and segments carry capture times);
+            # otherwise read only the end of the file, which grows for as long as the transcriber runs
+            # Extra are asked for so there are still enough once low-confidence and no-speech records are dropped
+            segments = last_segments(lines_to_show * 3, transcript_socket_path) if transcript_socket_path else None
+            usable = [segment for segment in segments or [] if is_usable(segment, transcript_min_avg_prob)]
+            if usable:
+                last_lines = [f"{time.strftime('%H:%M:%S', time.localtime(segment['time']))} {segment['text']}"
+                              for segment in usable[-lines_to_show:]]
+            else:
+                last_lines = transcript.last_lines(lines_to_show)
+            if not last_lines:
+                print("Transcript file is empty.")
+            else:
+                # Add simple ASCII character at the start of each line
+                for line in last_lines:
+                    print(f"* {line}")
             
             # Show current status and options
             print("_" * 49)
-            print(f"Showing last {len(last_lines)} of {len(all_lines)} lines")
+            print(f"Showing last {len(last_lines)} lines")
             print("m: More lines (+3) / f: Fewer lines (-3)")
             print("a: Auto-refresh on/off")
+            print("h: History (from the transcript archive)")
             print("b: Back to Main Menu")
             
             # Wait for a keystroke with a timeout
@@ -88,6 +142,9 @@ def show_television_transcript():
                     print("Auto-refresh enabled (1s).")
                 input("Press Enter to continue...")
                 continue
+            elif choice.lower() == 'h':
+                show_transcript_history(transcript_path, archive_dir)
+                continue
             elif choice.lower() == 'b':
                 # Return to main menu
                 return
@@ -0,0 +1,67 @@
+"""
+Keeps the Ollama model warm while the coyote is awake and lets it go while it sleeps.
+
+On waking (and at startup if the lamp switch is on) the model is loaded and
+the system prompt evaluated, so the first plunger press does not pay for the
+load. While awake the model's keep-alive timer is restarted every
+OLLAMA_KEEP_WARM_SECONDS; on sleep the model is unloaded to free memory.
+All requests are made from a background thread; wake() and sleep() only
+record the switch position, so they are safe to call from GPIO callbacks.
+"""
+
+import threading
+
+from llm_chat_completion import ollama_keep_warm, ollama_preload_and_warm_prompt, ollama_unload
+
+DEFAULT_KEEP_WARM_SECONDS = 120
+
+
+class OllamaLifecycle:
+    """Loads, keeps warm and unloads OLLAMA_MODEL following the wake/sleep switch."""
+
+    def __init__(self, awake, interval=DEFAULT_KEEP_WARM_SECONDS):
+        self.awake = awake
+        self.interval = interval
+        self.changed = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def wake(self):
+        self.awake = True
+        self.changed.set()
+
+    def sleep(self):
+        self.awake = False
+        self.changed.set()
+
+    def _run(self):
+        # None: whatever a previous run left loaded is unknown, so sleeping at startup unloads it too.
+        loaded = None
+        timed_out = False
+        while not self.stopping.is_set():
+            awake = self.awake
+            if awake and not loaded:
+                # Retried every interval until the server answers.
+                loaded = ollama_preload_and_warm_prompt()
+            elif not awake and loaded is not False:
+                ollama_unload()
+                loaded = False
+            elif awake and timed_out:
+                ollama_keep_warm()
+            timed_out = not self.changed.wait(self.interval)
+            self.changed.clear()
+
+    def stop(self):
+        self.stopping.set()
+        self.changed.set()
+
+
+def start_ollama_lifecycle(config, awake):
+    """Start managing the Ollama model if it is the configured LLM and OLLAMA_KEEP_WARM is on; returns it or None."""
+    if config.LLM != "ollama" or not getattr(config, "OLLAMA_KEEP_WARM", False):
+        return None
+    return OllamaLifecycle(awake, getattr(config, "OLLAMA_KEEP_WARM_SECONDS", DEFAULT_KEEP_WARM_SECONDS)).start()
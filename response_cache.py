@@ -0,0 +1,90 @@
+"""
+Cache of TV commentary keyed on the transcript it answered.
+
+When the transcript has not changed between two plunger presses (a paused
+show, an ad on repeat), the commentary for it is looked up here instead of
+asking the LLM again. The key is a hash of the normalized transcript window
+and the system prompt, so rewording the persona starts afresh. Entries live
+for a fixed time and the least recently used are evicted past a count. The
+reply's audio is already in the speech cache, keyed by its text, so a reused
+reply skips piper as well.
+"""
+
+import collections
+import hashlib
+import re
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_TTL_SECONDS = 600
+
+
+def normalize_transcript(text):
+    """Lowercase words only, so punctuation and spacing differences between two hearings do not matter."""
+    return " ".join(re.findall(r"[a-z0-9$]+", text.lower()))
+
+
+def response_key(transcript, system_prompt):
+    return hashlib.sha256(f"{system_prompt}\n{normalize_transcript(transcript)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU of replies with a time-to-live, counting hits and misses."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, reply):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), reply)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the shared ResponseCache, or None when RESPONSE_CACHE is off in config."""
+    global _cache
+    import config
+    if not getattr(config, "RESPONSE_CACHE", False):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                getattr(config, "RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+                getattr(config, "RESPONSE_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+            )
+        return _cache
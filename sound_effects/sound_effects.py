@@ -2,11 +2,29 @@
 """
 Sound effects module for the coyote interactive project.
 Provides functions to play various sound effects.
+
+Effects can be decoded once into PCM with preload_sound_effects(); after that
+play_sound_effect() hands the buffer to the shared audio output instead of
+starting a player process and decoding the file again.
 """
 
 import os
 import subprocess
+import sys
+import threading
 import time
+import wave
+
+try:
+    import audio_output
+except ModuleNotFoundError:
+    # Running this file directly; the shared output lives in the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import audio_output
+
+# Decoded effects, keyed by absolute path.
+_decoded_effects = {}
+_decoded_lock = threading.Lock()
 
 def _get_sound_file_path(sound_file):
     """
@@ -27,6 +45,63 @@ def _get_sound_file_path(sound_file):
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(project_root, sound_file)
 
+def _decode_sound_file(sound_file_path):
+    """
+    Decode a sound file into PCM in the shared output format.
+
+    Args:
+        sound_file_path: Absolute path to an .mp3 or .wav file
+
+    Returns:
+        bytes: The decoded PCM, or None if the file could not be decoded
+    """
+    _, ext = os.path.splitext(sound_file_path)
+    ext = ext.lower()
+    try:
+        if ext in ['.wav', '.wave']:
+            with wave.open(sound_file_path, "rb") as wav_file:
+                if wav_file.getsampwidth() != audio_output.SAMPLE_WIDTH or wav_file.getnchannels() != 1:
+                    return None
+                pcm = wav_file.readframes(wav_file.getnframes())
+                return audio_output.resample_pcm(pcm, wav_file.getframerate(), audio_output.SAMPLE_RATE)
+        # mpg123 downmixes and resamples to the output format while decoding
+        result = subprocess.run(
+            ["mpg123", "-q", "-s", "-m", "-r", str(audio_output.SAMPLE_RATE), "-e", "s16", sound_file_path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False,
+        )
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout
+    except Exception as e:
+        print(f"Failed to decode sound {os.path.basename(sound_file_path)}: {e}")
+        return None
+
+
+def preload_sound_effects(directory=None):
+    """
+    Decode every sound file in a directory once, so later plays start instantly.
+
+    Args:
+        directory: Directory to scan; defaults to this sound_effects directory
+
+    Returns:
+        int: The number of effects decoded
+    """
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    count = 0
+    for file in sorted(os.listdir(directory)):
+        if not file.lower().endswith(('.mp3', '.wav', '.wave')):
+            continue
+        path = os.path.join(directory, file)
+        pcm = _decode_sound_file(path)
+        if pcm is None:
+            continue
+        with _decoded_lock:
+            _decoded_effects[os.path.abspath(path)] = pcm
+        count += 1
+    return count
+
+
 def play_sound_effect(sound_file, block=True):
     """
     Play a sound effect file.
@@ -45,6 +120,15 @@ def play_sound_effect(sound_file, block=True):
         return False
     
     print(f"Playing sound: {os.path.basename(sound_file_path)}")
+
+    # Preloaded effects go straight to the shared output stream
+    with _decoded_lock:
+        pcm = _decoded_effects.get(os.path.abspath(sound_file_path))
+    if pcm is not None:
+        playback = audio_output.get_output().play(pcm)
+        if block:
+            playback.wait()
+        return True
     
     # Determine file extension
     _, ext = os.path.splitext(sound_file_path)
@@ -59,6 +143,8 @@ def play_sound_effect(sound_file, block=True):
         # Default to mpg123 for other formats
         player = "mpg123"
     
+    # The shared output may still hold the device from the last sound.
+    audio_output.release_output()
     try:
         # Run the appropriate command with or without blocking
         if block:
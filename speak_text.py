@@ -4,7 +4,17 @@ import tempfile
 import os
 import json
 import shlex
+import queue
+import signal
+import threading
+import config
+from audio_output import release_output
 from config import SPEAKER_DEVICE
+from speech_engine import PIPER_SPEAKER, PIPER_LENGTH_SCALE, PITCH_CENTS, VOLUME, get_engine
+from speech_cache import get_cache
+
+# Characters that end a sentence, shared with the response cleaners.
+SENTENCE_ENDINGS = [".", "!", "?", "\n"]
 
 
 def _resolve_piper_model_path():
@@ -21,7 +31,8 @@ def _resolve_piper_model_path():
     return ""
 
 
-def speak_text(text):
+def prepare_text(text):
+    """Turn a reply into the plain text piper is given."""
     # First, decode the JSON string if it's enclosed in quotes and has escaped characters
     if text.startswith('"') and text.endswith('"'):
         try:
@@ -52,11 +63,96 @@ def speak_text(text):
     # Convert dollar amounts to spoken form (e.g., "$3" to "3 dollars", "$3.50" to "3 dollars 50 cents")
     safe_text = re.sub(r'\$(\d+)\.(\d+)', r'\1 dollars \2 cents', safe_text)
     safe_text = re.sub(r'\$(\d+)', r'\1 dollars', safe_text)
+    return safe_text
+
+
+def render_speech(safe_text, model_path):
+    """Return playable PCM for prepared text, from the speech cache when possible."""
+    cache = get_cache()
+    if cache is not None:
+        pcm = cache.get(safe_text, model_path)
+        if pcm is not None:
+            return pcm
+    pcm = get_engine(model_path).synthesize(safe_text)
+    if pcm is not None and cache is not None:
+        cache.put(safe_text, model_path, pcm)
+    return pcm
+
+
+def _can_prerender():
+    return getattr(config, "SPEECH_ENGINE_PERSISTENT", False) and get_cache() is not None
+
+
+def prerender_phrases(phrases, token=None):
+    """
+    Put the speech for `phrases` in the speech cache now. Returns False if there is no cache to fill.
+    Cancelling `token` stops after the phrase being rendered, so the engine is free for real speech.
+    """
+    model_path = _resolve_piper_model_path()
+    if not _can_prerender() or not model_path:
+        return False
+    cache = get_cache()
+    for phrase in phrases:
+        if token is not None and token.cancelled:
+            break
+        safe_text = prepare_text(phrase)
+        if safe_text.strip() and cache.get(safe_text, model_path) is None:
+            render_speech(safe_text, model_path)
+    return True
+
+
+def prerender_phrases_async(phrases):
+    """Fill the speech cache with fixed phrases on a background thread."""
+    if not _can_prerender() or not _resolve_piper_model_path():
+        return None
+    thread = threading.Thread(target=prerender_phrases, args=(phrases,), daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_pipeline(command, token=None):
+    """Run a shell pipeline to completion, killing the whole pipeline if `token` is cancelled."""
+    process = subprocess.Popen(command, shell=True, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def kill():
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    if token is not None:
+        token.on_cancel(kill)
+    try:
+        return process.wait()
+    finally:
+        if token is not None:
+            token.remove_callback(kill)
+
+
+def speak_text(text, token=None):
+    """
+    Speak `text`. If `token` (a CancelToken) is cancelled, speech stops straight away.
+    Returns the fraction of the speech that was played, from 0.0 to 1.0.
+    """
+    safe_text = prepare_text(text)
 
     print("Speaking:", safe_text)
+    if token is not None and token.cancelled:
+        return 0.0
     if not safe_text.strip():
         print("Finished speaking:", safe_text)
-        return
+        return 1.0
+
+    # Prefer the long-lived piper engine; fall back to a one-shot pipeline if it is unavailable
+    if getattr(config, "SPEECH_ENGINE_PERSISTENT", False):
+        model_path = _resolve_piper_model_path()
+        pcm = render_speech(safe_text, model_path) if model_path else None
+        if pcm is not None:
+            playback = get_engine(model_path).play(pcm, token)
+            playback.wait()
+            print("Finished speaking:", safe_text)
+            return playback.fraction_played
     
     # Use a temporary file to avoid shell escaping issues with apostrophes
     # Add encoding='utf-8' to handle Unicode characters correctly
@@ -68,30 +164,179 @@ def speak_text(text):
         model_path = _resolve_piper_model_path()
         if not model_path:
             print("Piper model not found. Set PIPER_MODEL_COYOTE or install voice models in /usr/share/piper/voices/en_GB/.")
-            return
+            return 0.0
 
         base_pipeline = (
             f"cat {shlex.quote(tmp_path)} | "
-            f"piper --model {shlex.quote(model_path)} -s 71 --length_scale 1.75 --output-raw | "
-            "sox -t raw -r 22050 -e signed -b 16 -c 1 - -t raw - pitch -200 vol 0.98"
+            f"piper --model {shlex.quote(model_path)} -s {PIPER_SPEAKER} --length_scale {PIPER_LENGTH_SCALE} --output-raw | "
+            f"sox -t raw -r 22050 -e signed -b 16 -c 1 - -t raw - pitch {PITCH_CENTS} vol {VOLUME}"
         )
 
+        # The shared output may still hold the device from the last sound.
+        release_output()
         if SPEAKER_DEVICE and SPEAKER_DEVICE.strip():
             command = (
                 base_pipeline +
                 f" | aplay -D {shlex.quote(SPEAKER_DEVICE)} -r 22050 -f S16_LE -t raw"
             )
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
-            if result.returncode != 0:
+            returncode = _run_pipeline(command, token)
+            if returncode != 0 and not (token is not None and token.cancelled):
                 print(f"Configured speaker device '{SPEAKER_DEVICE}' failed; retrying default output.")
                 fallback_command = base_pipeline + " | aplay -r 22050 -f S16_LE -t raw"
-                subprocess.run(fallback_command, shell=True, check=False)
+                _run_pipeline(fallback_command, token)
         else:
             command = base_pipeline + " | aplay -r 22050 -f S16_LE -t raw"
-            subprocess.run(command, shell=True, check=False)
+            _run_pipeline(command, token)
 
         print("Finished speaking:", safe_text)
+        # The pipeline gives no progress, so speech cut off part way counts as unsaid.
+        return 0.0 if token is not None and token.cancelled else 1.0
     finally:
         # Clean up the temporary file
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
+
+
+def spoken_part(sentence, fraction):
+    """
+    The words of `sentence` said before playback stopped `fraction` of the way
+    through, marked as cut off, or "" if none were. JSON-quoted sentences (as the
+    intercom uses) stay JSON-quoted.
+    """
+    quoted = sentence.startswith('"') and sentence.endswith('"')
+    text = sentence
+    if quoted:
+        try:
+            text = json.loads(sentence)
+        except json.JSONDecodeError:
+            quoted = False
+    words = text.split()
+    said = words[:int(len(words) * fraction)]
+    if not said:
+        return ""
+    part = " ".join(said) + "..."
+    return json.dumps(part) if quoted else part
+
+
+def split_sentences(text, endings=SENTENCE_ENDINGS):
+    """
+    Split every complete sentence off the front of `text`.
+    Returns (sentences, remainder). A sentence ending only counts once it is
+    followed by whitespace, so "$19." is not cut before the "99" arrives.
+    """
+    sentences = []
+    start = 0
+    for index, char in enumerate(text):
+        if char not in endings:
+            continue
+        if char != "\n" and (index + 1 >= len(text) or not text[index + 1].isspace()):
+            continue
+        sentence = text[start:index + 1].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = index + 1
+    return sentences, text[start:]
+
+
+def reply_sentences(text, clean, endings=SENTENCE_ENDINGS):
+    """The cleaned sentences speak_streamed() would speak for the complete reply `text`."""
+    sentences, remainder = split_sentences(text + " ", endings)
+    if not sentences and remainder.strip():
+        sentences = [remainder]
+    return [sentence for sentence in map(clean, sentences) if sentence]
+
+
+class SpeechQueue:
+    """
+    Speak queued sentences in order on a background thread. Once `token` is
+    cancelled the sentence being spoken is cut off and the rest are dropped.
+    """
+
+    def __init__(self, token=None):
+        self._queue = queue.Queue()
+        self.token = token
+        # What was actually said: whole sentences, and the start of one that was cut off.
+        self.finished = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                return
+            if self.token is not None and self.token.cancelled:
+                continue
+            try:
+                fraction = speak_text(text, self.token)
+            except Exception as e:
+                print(f"Failed to speak: {e}")
+                fraction = 0.0
+            if self.token is None or not self.token.cancelled or fraction >= 1.0:
+                self.finished.append(text)
+            else:
+                # Barged in on: remember how far the coyote got.
+                part = spoken_part(text, fraction)
+                if part:
+                    self.finished.append(part)
+
+    def put(self, text):
+        self._queue.put(text)
+
+    def finish(self):
+        """Wait until everything queued so far has been spoken."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def speak_streamed(chunks, clean, endings=SENTENCE_ENDINGS, on_first_sentence=None, token=None):
+    """
+    Speak a reply while it is still being generated.
+
+    Text from `chunks` is cut at sentence boundaries and each cleaned sentence
+    is handed to a SpeechQueue straight away. Returns the cleaned sentences
+    that were spoken; an empty list means nothing usable arrived. If `token`
+    is cancelled, generation and speech stop and only what was actually said
+    is returned, ending with the cut-off part of the sentence being spoken.
+    """
+    speech = None
+    spoken = []
+    buffer = ""
+
+    def emit(sentence):
+        nonlocal speech
+        sentence = clean(sentence)
+        if not sentence:
+            return
+        if speech is None:
+            if on_first_sentence:
+                on_first_sentence()
+            speech = SpeechQueue(token)
+        speech.put(sentence)
+        spoken.append(sentence)
+
+    try:
+        for chunk in chunks:
+            if token is not None and token.cancelled:
+                break
+            buffer += chunk
+            sentences, buffer = split_sentences(buffer, endings)
+            for sentence in sentences:
+                emit(sentence)
+        if not (token is not None and token.cancelled):
+            # The reply is over, so a final sentence ending no longer needs whitespace after it.
+            sentences, buffer = split_sentences(buffer + " ", endings)
+            for sentence in sentences:
+                emit(sentence)
+            # A reply with no sentence ending at all is kept whole, as the cleaners do.
+            if not spoken and buffer.strip():
+                emit(buffer)
+    except Exception as e:
+        if token is None or not token.cancelled:
+            print(f"Error while streaming LLM response: {e}")
+    finally:
+        if speech is not None:
+            speech.finish()
+    if token is not None and token.cancelled:
+        return speech.finished if speech is not None else []
+    return spoken
@@ -0,0 +1,153 @@
+"""
+Speculative TV commentary.
+
+While the coyote is awake and idle, a background thread watches the recent
+transcript. When it has changed, the thread asks the LLM for the commentary a
+plunger press would get right now and renders its speech into the speech
+cache. A press then speaks that prepared reply at once, as long as the
+transcript still says much the same thing and the conversation has not moved
+on; otherwise comment_on_television generates a fresh one as usual.
+"""
+
+import re
+import threading
+import time
+
+from interaction_scheduler import CancelToken
+from llm_chat_completion import llm_chat_completion_stream
+from speak_text import prerender_phrases, reply_sentences
+
+DEFAULT_INTERVAL_SECONDS = 5
+DEFAULT_MIN_SIMILARITY = 0.8
+DEFAULT_MAX_AGE_SECONDS = 120
+
+
+def _words(lines):
+    return set(re.findall(r"[a-z0-9$.']+", " ".join(lines).lower()))
+
+
+def transcript_similarity(lines, other_lines):
+    """Share of distinct words two transcript windows have in common (Jaccard), from 0.0 to 1.0."""
+    words, other_words = _words(lines), _words(other_lines)
+    if not words and not other_words:
+        return 1.0
+    return len(words & other_words) / len(words | other_words)
+
+
+class _Draft:
+    """Stands in for the conversation when drafting: its messages plus the prompt not yet asked."""
+
+    def __init__(self, messages):
+        self.messages = messages
+
+
+class Candidate:
+    """A commentary drafted ahead of a press."""
+
+    def __init__(self, lines, reply, history_length):
+        self.lines = lines
+        self.reply = reply
+        self.history_length = history_length
+        self.created_at = time.monotonic()
+
+
+class SpeculativeCommentary:
+    """Drafts the next TV commentary in the background so a press can speak it straight away."""
+
+    def __init__(self, conversation, television, paused=None, interval=DEFAULT_INTERVAL_SECONDS,
+                 min_similarity=DEFAULT_MIN_SIMILARITY, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.conversation = conversation
+        # The comment_on_television module: transcript window, prompt and reply cleaning.
+        self.television = television
+        # Returns True while drafting should wait, e.g. while an interaction runs or the coyote sleeps.
+        self.paused = paused or (lambda: False)
+        self.interval = interval
+        self.min_similarity = min_similarity
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.candidate = None
+        self.drafting = None
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            if self.paused():
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Speculative commentary failed: {e}")
+
+    def _usable(self, candidate, lines, history_length):
+        return (candidate is not None
+                and candidate.history_length == history_length
+                and time.monotonic() - candidate.created_at <= self.max_age
+                and transcript_similarity(lines, candidate.lines) >= self.min_similarity)
+
+    def refresh(self):
+        """Draft a new candidate if the transcript has moved on from the current one."""
+        lines = self.television.recent_transcript_lines()
+        if not lines:
+            return
+        messages = self.conversation.messages
+        with self.lock:
+            if self._usable(self.candidate, lines, len(messages)):
+                return
+            token = self.drafting = CancelToken("speculative commentary")
+
+        prompt, _ = self.television.television_prompt(lines)
+        reply = "".join(llm_chat_completion_stream(_Draft(messages + [{"role": "user", "content": prompt}]), token))
+        if token.cancelled or not reply.strip():
+            return
+        # Render the speech now so the press only has to play it, unless a press has already come.
+        prerender_phrases(reply_sentences(reply, self.television.clean_response), token)
+        with self.lock:
+            if self.drafting is token and not token.cancelled:
+                self.candidate = Candidate(lines, reply, len(messages))
+                self.drafting = None
+                print("Speculative commentary ready.")
+
+    def interrupt(self):
+        """Abandon any draft in progress so it does not compete with a real request."""
+        with self.lock:
+            if self.drafting is not None:
+                self.drafting.cancel()
+                self.drafting = None
+
+    def take(self, lines, conversation):
+        """
+        Return the prepared Candidate if it still fits `lines` and the conversation,
+        else None. Either way the candidate is used up.
+        """
+        self.interrupt()
+        with self.lock:
+            candidate, self.candidate = self.candidate, None
+        if self._usable(candidate, lines, len(conversation.messages)):
+            return candidate
+        return None
+
+    def stop(self):
+        self.stopping.set()
+        self.interrupt()
+
+
+def start_speculative_commentary(config, conversation, paused=None):
+    """Start drafting commentary in the background if SPECULATIVE_COMMENTARY is on; returns it or None."""
+    if not getattr(config, "SPECULATIVE_COMMENTARY", False):
+        return None
+    if config.LLM == "ax650":
+        # The AX650 runtime keeps its own conversation state; a draft would add turns nobody asked for.
+        print("Speculative commentary is not available with the ax650 backend.")
+        return None
+    import comment_on_television
+    return SpeculativeCommentary(
+        conversation, comment_on_television, paused,
+        interval=getattr(config, "SPECULATIVE_INTERVAL_SECONDS", DEFAULT_INTERVAL_SECONDS),
+        min_similarity=getattr(config, "SPECULATIVE_MIN_SIMILARITY", DEFAULT_MIN_SIMILARITY),
+        max_age=getattr(config, "SPECULATIVE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS),
+    ).start()
@@ -0,0 +1,137 @@
+"""
+Content-addressed cache of synthesized speech.
+
+Each entry is the final, effect-processed PCM for one utterance, stored under
+a hash of the normalized text and every voice setting that affects the sound.
+A hit skips piper entirely and goes straight to the audio output. The cache is
+capped in bytes on disk; the least recently used entries are evicted first.
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import audio_output
+from speech_engine import PIPER_SPEAKER, PIPER_LENGTH_SCALE, PITCH_CENTS, VOLUME
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+PCM_SUFFIX = ".pcm"
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def _model_version(model_path):
+    # A voice replaced or retrained under the same file name must not hit the old audio.
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def cache_key(text, model_path):
+    settings = {
+        "text": normalize_text(text),
+        "model": os.path.basename(model_path),
+        "model_version": _model_version(model_path),
+        "speaker": PIPER_SPEAKER,
+        "length_scale": PIPER_LENGTH_SCALE,
+        "pitch": PITCH_CENTS,
+        "volume": VOLUME,
+        "rate": audio_output.SAMPLE_RATE,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SpeechCache:
+    """LRU-capped directory of PCM files keyed by cache_key()."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + PCM_SUFFIX)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(PCM_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def get(self, text, model_path):
+        """Return cached PCM for `text`, or None."""
+        path = self._path(cache_key(text, model_path))
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+        # Touch the entry so eviction treats it as recently used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return pcm
+
+    def put(self, text, model_path, pcm):
+        path = self._path(cache_key(text, model_path))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pcm)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(pcm) - previous_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        self.total_bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the shared SpeechCache, or None when caching is turned off in config."""
+    global _cache
+    import config
+    if not getattr(config, "SPEECH_CACHE_ENABLED", False):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SpeechCache(
+                getattr(config, "SPEECH_CACHE_DIR", "./speech_cache"),
+                getattr(config, "SPEECH_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES),
+            )
+        return _cache
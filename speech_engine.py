@@ -0,0 +1,166 @@
+"""
+Long-lived Piper speech engine.
+
+Starts piper once, so the ONNX voice is loaded a single time, and feeds it one
+line of text per utterance over its stdin pipe. Piper writes each utterance to
+a WAV file in a scratch directory and prints the path, which gives clean
+utterance boundaries. The coyote's pitch and volume effects are applied in
+process and the audio goes to the persistent output in audio_output.
+"""
+
+import os
+import array
+import shutil
+import tempfile
+import threading
+import wave
+import warnings
+import subprocess
+
+import audio_output
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+# Voice settings, also used by the one-shot shell pipeline in speak_text.
+PIPER_SPEAKER = 71
+PIPER_LENGTH_SCALE = 1.75
+PITCH_CENTS = -200
+VOLUME = 0.98
+
+# The pitch drop is done by resampling, which also stretches the audio by the
+# same factor, so piper is asked for proportionally faster speech to keep the
+# original pacing.
+PITCH_FACTOR = 2 ** (PITCH_CENTS / 1200)
+ENGINE_LENGTH_SCALE = round(PIPER_LENGTH_SCALE * PITCH_FACTOR, 3)
+
+
+def _scale_volume(pcm, volume):
+    if audioop is not None:
+        return audioop.mul(pcm, audio_output.SAMPLE_WIDTH, volume)
+    samples = array.array("h")
+    samples.frombytes(pcm)
+    return array.array("h", (int(sample * volume) for sample in samples)).tobytes()
+
+
+def apply_effects(pcm, rate):
+    """Lower the pitch by PITCH_CENTS and scale by VOLUME, returning PCM at the output rate."""
+    pitched = audio_output.resample_pcm(pcm, int(round(audio_output.SAMPLE_RATE * PITCH_FACTOR)), audio_output.SAMPLE_RATE)
+    if rate != audio_output.SAMPLE_RATE:
+        pitched = audio_output.resample_pcm(pitched, rate, audio_output.SAMPLE_RATE)
+    return _scale_volume(pitched, VOLUME)
+
+
+class SpeechEngine:
+    """Keeps one piper process running and turns text into effect-processed PCM."""
+
+    def __init__(self, model_path, output=None):
+        self.model_path = model_path
+        self.output = output
+        self.lock = threading.Lock()
+        self.process = None
+        self.scratch_dir = None
+
+    def _start(self):
+        if self.process is not None and self.process.poll() is None:
+            return True
+        scratch_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.scratch_dir = tempfile.mkdtemp(prefix="coyote_piper_", dir=scratch_root)
+        command = [
+            "piper", "--model", self.model_path,
+            "-s", str(PIPER_SPEAKER),
+            "--length_scale", str(ENGINE_LENGTH_SCALE),
+            "--output_dir", self.scratch_dir,
+        ]
+        try:
+            self.process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, text=True, bufsize=1,
+            )
+        except FileNotFoundError:
+            print("piper not found; persistent speech engine unavailable.")
+            self.process = None
+            return False
+        return True
+
+    def synthesize(self, text):
+        """Return effect-processed PCM for `text`, or None if piper is unavailable."""
+        line = " ".join(text.split())
+        if not line:
+            return None
+        with self.lock:
+            if not self._start():
+                return None
+            try:
+                self.process.stdin.write(line + "\n")
+                self.process.stdin.flush()
+                wav_path = self.process.stdout.readline().strip()
+            except (BrokenPipeError, OSError):
+                wav_path = ""
+            if not wav_path:
+                print("Persistent piper process stopped; it will be restarted on the next utterance.")
+                self.close()
+                return None
+        try:
+            with wave.open(wav_path, "rb") as wav_file:
+                rate = wav_file.getframerate()
+                pcm = wav_file.readframes(wav_file.getnframes())
+        except (wave.Error, OSError) as e:
+            print(f"Could not read piper output {wav_path}: {e}")
+            return None
+        finally:
+            if os.path.exists(wav_path):
+                os.remove(wav_path)
+        return apply_effects(pcm, rate)
+
+    def play(self, pcm, token=None):
+        """
+        Play PCM on the persistent output and return the Playback handle.
+        With a CancelToken the audio arbiter stops it when the interaction is cancelled.
+        """
+        if self.output is not None:
+            return self.output.play(pcm)
+        return audio_output.get_arbiter().play(pcm, token)
+
+    def speak(self, text):
+        """Synthesize and play `text`, blocking until it has been spoken. Returns False if unavailable."""
+        pcm = self.synthesize(text)
+        if pcm is None:
+            return False
+        self.play(pcm).wait()
+        return True
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.scratch_dir:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            self.scratch_dir = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(model_path):
+    """Return the shared SpeechEngine for a voice model, starting piper on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None or _engine.model_path != model_path:
+            if _engine is not None:
+                _engine.close()
+            _engine = SpeechEngine(model_path)
+        return _engine
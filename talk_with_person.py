@@ -1,10 +1,12 @@
 import config
 import json
 import os
-from llm_chat_completion import llm_chat_completion
-from speak_text import speak_text
+from conversation_store import open_conversation
+from llm_chat_completion import llm_chat_completion, llm_chat_completion_stream
+from speak_text import speak_streamed, speak_text
 from leds.led_manager import start_led, stop_led
 from audio_to_text.audio_device import resolve_capture_device
+from audio_to_text.person_speech import get_person_speech_service
 
 # Global configuration variables
 led_intercom = config.GPIO_LED_INTERCOM
@@ -22,8 +24,10 @@ mic = config.PERSON_MIC_NUMBER
 person_mic_name_match = getattr(config, "PERSON_MIC_NAME_MATCH", "")
 person_mic_match_index = getattr(config, "PERSON_MIC_MATCH_INDEX", 0)
 
+LLM_ERROR_RESPONSE = "Sorry, I'm having trouble thinking right now."
 
-def build_prompt_and_update_conversation(person_comment):
+
+def build_prompt_and_update_conversation(conversation, person_comment):
     # Use person prompt lines instead of television prompt lines
     # If person_comment contains any occurrences of "[ Silence ]" then remove them
     if "[ Silence ]" in person_comment:
@@ -39,46 +43,34 @@ def build_prompt_and_update_conversation(person_comment):
 
     # Display the prompt
     print("Prompt:", prompt)
-    # Load existing conversation from JSON file
-    try:
-        with open(conversation_file, "r") as f:
-            conversation = json.load(f)
-    except Exception:
-        conversation = []
+    # Append new user message to the in-memory conversation (journaled in the background)
+    conversation.append("user", prompt)
 
-    # Append new user message to the conversation
-    conversation.append({"role": "user", "content": prompt})
+    return
 
-    # Write updated conversation back to file
-    with open(conversation_file, "w", encoding='utf-8') as f:  # Specify encoding
-        json.dump(conversation, f, indent=4)
 
-    return
+# Person replies are not cut at newlines, unlike TV commentary.
+SENTENCE_ENDINGS = [".", "!", "?"]
 
 
 def clean_response(response):
-    sentence_endings = [".", "!", "?"]
-    last_ending_index = max(response.rfind(ending) for ending in sentence_endings)
+    last_ending_index = max(response.rfind(ending) for ending in SENTENCE_ENDINGS)
     if (last_ending_index != -1):
         response = response[:last_ending_index + 1]
 
     response = response.strip()
     response = response.replace("*", "")
     response = response.replace('"', "")
+    if not response:
+        # Nothing to say; json.dumps("") would be the non-empty '""'.
+        return ""
     # Escape the string for JSON
     cleaned = json.dumps(response)
     return cleaned
 
 
-def capture_intercom_speech(bm=None):
+def _capture_with_whisper_stream(bm):
     import subprocess, time
-    from buttons.button_manager import ButtonManager
-    # Use the provided ButtonManager or instantiate a new one
-    if bm is None:
-        bm = ButtonManager(config.BUTTON_LISTEN_TO_PERSON)
-        local_bm = True
-    else:
-        local_bm = False
 
     recording = True
     start_time = time.time()
@@ -126,9 +118,24 @@ def capture_intercom_speech(bm=None):
     bm.unregister_press_callback(on_press)
     bm.unregister_release_callback(on_release)
 
-    # If bm was created locally, there's no extra cleanup needed.
     with open("person_questions.txt", "r") as f:
-        captured_speech = f.read()
+        return f.read()
+
+
+def capture_intercom_speech(bm=None, pressed_at=None):
+    # Use the provided ButtonManager or instantiate a new one
+    if bm is None:
+        from buttons.button_manager import ButtonManager
+        bm = ButtonManager(config.BUTTON_LISTEN_TO_PERSON)
+
+    # Prefer the resident recognizer: model already loaded, mic already open
+    service = get_person_speech_service(config)
+    if service is not None:
+        # If it failed, the button is usually released by now and its arecord may still hold
+        # the mic, so whisper-stream would only record silence: use the "no transcript" prompt.
+        captured_speech = service.capture_utterance(bm, pressed_at=pressed_at) or ""
+    else:
+        captured_speech = _capture_with_whisper_stream(bm)
     
     # Save the captured speech to a file in the conversation_data directory
     last_captured_speech_file = os.path.join(config.CONVERSATION_DATA_PATH, "last_captured_speech.txt")
@@ -139,42 +146,66 @@ def capture_intercom_speech(bm=None):
     return captured_speech
 
 
-def talk_with_person(bm=None):
+def talk_with_person(bm=None, conversation=None, token=None, pressed_at=None):
+    """
+    Listen while the intercom button is held and answer. `pressed_at` is the
+    time.monotonic() of the press; cancelling `token` stops the reply where it is.
+    """
+    if conversation is None:
+        conversation = open_conversation(conversation_file)
 
     led_thread = start_led(led_intercom, "constant")
-    person_comment = capture_intercom_speech(bm)
+    person_comment = capture_intercom_speech(bm, pressed_at)
     stop_led(led_thread)
+    if token is not None and token.cancelled:
+        return
 
-    build_prompt_and_update_conversation(person_comment)
+    build_prompt_and_update_conversation(conversation, person_comment)
 
     # Start led_dynamite steady flashing during llm processing
     led_thread = start_led(led_intercom, "flashing")
-    response = clean_response(llm_chat_completion(conversation_file))
-    stop_led(led_thread)
 
-    # FIRST append assistant response to conversation JSON file
-    try:
-        with open(conversation_file, "r", encoding='utf-8') as f:  # Specify encoding for reading too
-            conversation = json.load(f)
-    except Exception:
-        conversation = []
-    conversation.append({"role": "assistant", "content": response})
-    with open(conversation_file, "w", encoding='utf-8') as f:  # Specify encoding
-        json.dump(conversation, f, indent=4)
-        
-    # Save the cleaned response to last_coyote_reply.txt instead of last_coyote_response.txt
-    reply_file = os.path.join(config.CONVERSATION_DATA_PATH, "last_coyote_reply.txt")
-    with open(reply_file, "w", encoding='utf-8') as f:  # Specify encoding
-        # Remove the JSON formatting (quotes) from the response for cleaner text
-        clean_text = json.loads(response) if response.startswith('"') and response.endswith('"') else response
-        f.write(clean_text)
-
-    # THEN start led_intercom breathing pattern during speak_text
-    led_thread = start_led(led_intercom, "breathing")
-    speak_text(response)
+    def on_first_sentence():
+        nonlocal led_thread
+        # THEN switch to led_intercom breathing as soon as the first sentence is spoken
+        stop_led(led_thread)
+        led_thread = start_led(led_intercom, "breathing")
+
+    # Speak each sentence as soon as it has been generated
+    sentences = speak_streamed(
+        llm_chat_completion_stream(conversation, token), clean_response,
+        endings=SENTENCE_ENDINGS, on_first_sentence=on_first_sentence, token=token
+    )
+    if token is not None and token.cancelled and not sentences:
+        # Interrupted before anything was said.
+        stop_led(led_thread)
+        return
+    if sentences:
+        # Each cleaned sentence is JSON-escaped; join the plain text and escape it once
+        response = json.dumps(" ".join(json.loads(sentence) for sentence in sentences))
+    else:
+        # Nothing usable came back; retry once without streaming
+        try:
+            response = clean_response(llm_chat_completion(conversation) or "")
+        except Exception as e:
+            print(f"Error getting LLM response: {e}")
+            response = ""
+        response = response or json.dumps(LLM_ERROR_RESPONSE)
     stop_led(led_thread)
 
-    return
+    # Append assistant response to the conversation
+    conversation.append("assistant", response)
 
+    # Save the cleaned response to last_coyote_reply.txt instead of last_coyote_response.txt
+    reply_file = os.path.join(config.CONVERSATION_DATA_PATH, "last_coyote_reply.txt")
+    # Remove the JSON formatting (quotes) from the response for cleaner text
+    clean_text = json.loads(response) if response.startswith('"') and response.endswith('"') else response
+    conversation.write_text(reply_file, clean_text)
 
+    if not sentences:
+        # Start led_intercom breathing pattern during speak_text
+        led_thread = start_led(led_intercom, "breathing")
+        speak_text(response, token)
+        stop_led(led_thread)
 
+    return
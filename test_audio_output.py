@@ -0,0 +1,70 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import audio_output
+
+
+class FakeStdin:
+    def __init__(self):
+        self.closed = False
+        self.written = 0
+
+    def write(self, chunk):
+        self.written += len(chunk)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAplay:
+    def __init__(self, *args, **kwargs):
+        self.stdin = FakeStdin()
+
+    def poll(self):
+        return 0 if self.stdin.closed else None
+
+    def wait(self, timeout=None):
+        return 0
+
+    def kill(self):
+        pass
+
+
+class TestPcmOutput(unittest.TestCase):
+    def setUp(self):
+        self.processes = []
+
+        def popen(*args, **kwargs):
+            self.processes.append(FakeAplay())
+            return self.processes[-1]
+
+        p = patch.object(audio_output.subprocess, "Popen", side_effect=popen)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_device_is_released_when_idle_and_reopened_for_the_next_sound(self):
+        output = audio_output.PcmOutput(idle_close=0.1)
+        self.assertTrue(output.play(bytes(800)).wait(1))
+        self.assertEqual(len(self.processes), 1)
+        self.assertFalse(self.processes[0].stdin.closed)
+
+        time.sleep(0.3)
+        self.assertTrue(self.processes[0].stdin.closed)
+        self.assertIsNone(output.process)
+
+        self.assertTrue(output.play(bytes(800)).wait(1))
+        self.assertEqual(len(self.processes), 2)
+
+    def test_release_closes_an_idle_device_at_once(self):
+        output = audio_output.PcmOutput(idle_close=60)
+        output.play(bytes(800)).wait(1)
+        output.release()
+        self.assertTrue(self.processes[0].stdin.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import types
+import unittest
+from unittest.mock import patch
+
+import config
+import llm_dispatcher
+import response_cache
+import transcript_dedupe
+from llm_chat_completion import AX650_FALLBACK_RESPONSE
+
+# The LEDs need gpiozero and a Raspberry Pi; they are not what is under test here.
+_leds = types.SimpleNamespace(start_led=lambda gpio, pattern: None, stop_led=lambda thread: None)
+with patch.dict(sys.modules, {"leds.led_manager": _leds}):
+    import comment_on_television
+
+WINDOW = ["The Acme rocket skates are only $19.99.", "Call now and get a second pair free."]
+
+
+class FakeConversation:
+    def __init__(self):
+        self.messages = []
+
+    def append(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+    def write_text(self, path, text):
+        pass
+
+
+class TestCommentOnTelevision(unittest.TestCase):
+    def setUp(self):
+        self.replies = []
+        self.spoken = []
+
+        def fake_stream(conversation, token=None):
+            yield self.replies.pop(0)
+
+        def fake_speak_streamed(chunks, clean, on_first_sentence=None, token=None):
+            sentence = clean("".join(chunks))
+            self.spoken.append(sentence)
+            return [sentence]
+
+        patches = [
+            patch.object(config, "RESPONSE_CACHE", True),
+            patch.object(response_cache, "_cache", None),
+            patch.object(transcript_dedupe, "_index", None),
+            patch.object(comment_on_television, "recent_transcript_lines", return_value=WINDOW),
+            patch.object(comment_on_television, "llm_chat_completion_stream", side_effect=fake_stream),
+            patch.object(comment_on_television, "speak_streamed", side_effect=fake_speak_streamed),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_real_answer_is_reused_on_the_same_transcript(self):
+        self.replies = ["Rocket skates! Roadrunner is doomed."]
+        comment_on_television.comment_on_television(FakeConversation())
+        comment_on_television.comment_on_television(FakeConversation())
+
+        self.assertEqual(self.spoken, ["Rocket skates! Roadrunner is doomed."] * 2)
+        self.assertEqual(response_cache.get_response_cache().stats()["hits"], 1)
+
+    def test_fallback_lines_are_not_cached(self):
+        self.replies = [AX650_FALLBACK_RESPONSE, llm_dispatcher.DEFAULT_CANNED_RESPONSES[0], "Rocket skates!"]
+        for _ in range(3):
+            comment_on_television.comment_on_television(FakeConversation())
+
+        self.assertEqual(self.spoken[-1], "Rocket skates!")
+        self.assertEqual(response_cache.get_response_cache().stats()["entries"], 1)
+
+    def test_near_repeat_reuses_only_a_real_answer_under_the_transcript_prompt(self):
+        self.replies = [AX650_FALLBACK_RESPONSE, "Rocket skates!"]
+        with patch.object(config, "RESPONSE_CACHE", False), patch.object(config, "TRANSCRIPT_DEDUPE", True), \
+                patch.object(comment_on_television, "transcript_dedupe_mode", "reuse"):
+            comment_on_television.comment_on_television(FakeConversation())
+            comment_on_television.comment_on_television(FakeConversation())
+            conversation = FakeConversation()
+            with patch.object(comment_on_television, "recent_transcript_lines", return_value=WINDOW[:1] + WINDOW):
+                comment_on_television.comment_on_television(conversation)
+
+        self.assertEqual(self.spoken, [AX650_FALLBACK_RESPONSE, "Rocket skates!", "Rocket skates!"])
+        self.assertIn(WINDOW[0], conversation.messages[0]["content"])
+        self.assertEqual(transcript_dedupe._index.repeats, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
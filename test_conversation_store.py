@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import conversation_store
+from conversation_manager import archive_conversation, conversation_setup
+
+
+class TestConversationStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conversation_file = os.path.join(self.directory, "conversation.json")
+        with open(self.conversation_file, "w", encoding="utf-8") as f:
+            json.dump([{"role": "system", "content": "persona"}], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _read_json(self):
+        with open(self.conversation_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_append_goes_to_journal_not_json(self):
+        store = conversation_store.ConversationStore(self.conversation_file)
+        store.append("user", "hello")
+        store.close()
+
+        self.assertEqual(len(self._read_json()), 1)
+        with open(conversation_store.journal_path(self.conversation_file), "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [{"role": "user", "content": "hello"}])
+
+    def test_read_messages_merges_json_and_journal(self):
+        store = conversation_store.ConversationStore(self.conversation_file)
+        store.append("user", "hello")
+        store.append("assistant", "meep")
+        store.close()
+
+        messages = conversation_store.read_messages(self.conversation_file)
+        self.assertEqual([m["role"] for m in messages], ["system", "user", "assistant"])
+
+    def test_torn_journal_record_is_ignored(self):
+        with open(conversation_store.journal_path(self.conversation_file), "w", encoding="utf-8") as f:
+            f.write(json.dumps({"role": "user", "content": "kept"}) + "\n")
+            f.write('{"role": "assist')
+
+        messages = conversation_store.read_messages(self.conversation_file)
+        self.assertEqual(messages[-1]["content"], "kept")
+
+    def test_compact_rewrites_json_and_removes_journal(self):
+        store = conversation_store.ConversationStore(self.conversation_file)
+        store.append("user", "hello")
+        store.compact()
+
+        self.assertEqual([m["role"] for m in self._read_json()], ["system", "user"])
+        self.assertFalse(os.path.exists(conversation_store.journal_path(self.conversation_file)))
+        self.assertEqual(len(store.messages), 2)
+
+    def test_archive_includes_journaled_messages(self):
+        config = SimpleNamespace(
+            CONVERSATION_DATA_PATH=self.directory,
+            CONVERSATION_FILE="conversation.json",
+            SYSTEM_MESSAGE_TEXT="persona",
+        )
+        store = conversation_store.open_store(self.conversation_file)
+        store.append("user", "hello")
+
+        archived_file = archive_conversation(config)
+        with open(archived_file, "r", encoding="utf-8") as f:
+            archived = json.load(f)
+        self.assertEqual([m["content"] for m in archived], ["persona", "hello"])
+
+        conversation_setup(config)
+        self.assertEqual([m["content"] for m in store.messages], ["persona"])
+
+
+class TestConversation(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.conversation_file = os.path.join(self.directory, "conversation.json")
+        with open(self.conversation_file, "w", encoding="utf-8") as f:
+            json.dump([{"role": "system", "content": "persona"}], f)
+        self.conversation = conversation_store.Conversation(self.conversation_file)
+
+    def tearDown(self):
+        self.conversation.close()
+        shutil.rmtree(self.directory)
+
+    def test_messages_are_available_before_the_write_lands(self):
+        self.conversation.append("user", "hello")
+        self.assertEqual(self.conversation.messages[-1], {"role": "user", "content": "hello"})
+
+    def test_flush_persists_messages_and_side_files(self):
+        side_file = os.path.join(self.directory, "last_heard_television.txt")
+        self.conversation.append("user", "hello")
+        self.conversation.write_text(side_file, "heard")
+        self.conversation.flush()
+
+        self.assertEqual(conversation_store.read_messages(self.conversation_file)[-1]["content"], "hello")
+        with open(side_file, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "heard")
+
+    def test_archive_then_reload_starts_fresh(self):
+        config = SimpleNamespace(
+            CONVERSATION_DATA_PATH=self.directory,
+            CONVERSATION_FILE="conversation.json",
+            SYSTEM_MESSAGE_TEXT="persona",
+        )
+        self.conversation.append("user", "hello")
+        self.conversation.flush()
+        archive_conversation(config)
+        conversation_setup(config)
+        self.conversation.reload()
+
+        self.assertEqual([m["content"] for m in self.conversation.messages], ["persona"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import threading
+import unittest
+
+from audio_output import AudioArbiter, Playback
+from interaction_scheduler import (
+    CancelToken,
+    InteractionCancelled,
+    InteractionScheduler,
+    PRIORITY_INTERCOM,
+    PRIORITY_TELEVISION,
+    call_cancellable,
+)
+
+
+class FakeOutput:
+    def __init__(self):
+        self.playbacks = []
+
+    def play(self, pcm):
+        playback = Playback(pcm)
+        self.playbacks.append(playback)
+        return playback
+
+
+class TestInteractionScheduler(unittest.TestCase):
+    def setUp(self):
+        self.idle = threading.Event()
+        self.scheduler = InteractionScheduler(on_idle=self.idle.set)
+
+    def tearDown(self):
+        self.scheduler.close()
+
+    def test_intercom_interrupts_television(self):
+        order = []
+        television_started = threading.Event()
+
+        def television(token):
+            order.append("television")
+            television_started.set()
+            token.wait(5)
+            order.append("television cancelled" if token.cancelled else "television finished")
+
+        self.assertTrue(self.scheduler.submit("television", PRIORITY_TELEVISION, television))
+        self.assertTrue(television_started.wait(1))
+        self.assertTrue(self.scheduler.submit("intercom", PRIORITY_INTERCOM, lambda token: order.append("intercom")))
+        self.assertTrue(self.idle.wait(1))
+
+        self.assertEqual(order, ["television", "television cancelled", "intercom"])
+
+    def test_television_is_dropped_while_intercom_runs(self):
+        release = threading.Event()
+        ran = []
+        self.scheduler.submit("intercom", PRIORITY_INTERCOM, lambda token: release.wait(5))
+
+        self.assertFalse(self.scheduler.submit("television", PRIORITY_TELEVISION, ran.append))
+        release.set()
+        self.assertTrue(self.idle.wait(1))
+        self.assertEqual(ran, [])
+
+    def test_barge_in_interrupts_the_same_priority(self):
+        order = []
+        first_started = threading.Event()
+
+        def first(token):
+            first_started.set()
+            token.wait(5)
+            order.append("first cancelled" if token.cancelled else "first finished")
+
+        self.scheduler.submit("intercom", PRIORITY_INTERCOM, first)
+        self.assertTrue(first_started.wait(1))
+        self.assertFalse(self.scheduler.submit("intercom", PRIORITY_INTERCOM, order.append))
+        self.assertTrue(self.scheduler.submit("intercom", PRIORITY_INTERCOM,
+                                              lambda token: order.append("second"), barge_in=True))
+        self.assertTrue(self.idle.wait(1))
+        self.assertEqual(order, ["first cancelled", "second"])
+
+    def test_handler_errors_do_not_stop_the_worker(self):
+        def broken(token):
+            raise RuntimeError("boom")
+
+        self.scheduler.submit("broken", PRIORITY_TELEVISION, broken)
+        self.assertTrue(self.idle.wait(1))
+        self.idle.clear()
+        self.assertTrue(self.scheduler.submit("again", PRIORITY_TELEVISION, lambda token: None))
+        self.assertTrue(self.idle.wait(1))
+
+
+class TestCancellation(unittest.TestCase):
+    def test_on_cancel_runs_immediately_once_cancelled(self):
+        token = CancelToken()
+        calls = []
+        token.on_cancel(lambda: calls.append("before"))
+        token.cancel()
+        token.on_cancel(lambda: calls.append("after"))
+        self.assertEqual(calls, ["before", "after"])
+
+    def test_call_cancellable_abandons_a_blocked_call(self):
+        token = CancelToken()
+        blocked = threading.Event()
+        threading.Timer(0.05, token.cancel).start()
+        with self.assertRaises(InteractionCancelled):
+            call_cancellable(token, blocked.wait, 5)
+
+    def test_arbiter_stops_previous_speaker_and_cancelled_speech(self):
+        arbiter = AudioArbiter(FakeOutput())
+        television, intercom = CancelToken(), CancelToken()
+
+        first = arbiter.play(b"\x00" * 100, television)
+        second = arbiter.play(b"\x00" * 100, intercom)
+        self.assertTrue(first.stopped)
+        self.assertFalse(second.stopped)
+
+        intercom.cancel()
+        self.assertTrue(second.stopped)
+        self.assertTrue(arbiter.play(b"\x00" * 100, intercom).wait(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,16 @@
 import json
 import os
+import socket
 import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
 import config
 import llm_chat_completion
+import llm_client
+from interaction_scheduler import CancelToken
 
 
 class TestAx650ChatCompletion(unittest.TestCase):
@@ -31,6 +36,16 @@ class TestAx650ChatCompletion(unittest.TestCase):
             config.LLM = original_llm
             os.unlink(conversation_file)
 
+    def test_in_memory_conversation_is_not_read_from_disk(self):
+        conversation = MagicMock()
+        conversation.messages = [{"role": "user", "content": "from memory"}]
+
+        with patch("llm_chat_completion.read_messages") as mocked_read:
+            messages = llm_chat_completion._load_messages(conversation)
+
+        self.assertEqual(messages, conversation.messages)
+        mocked_read.assert_not_called()
+
     def test_ax650_request_uses_latest_user_prompt_only(self):
         conversation_file = self._write_conversation([
             {"role": "system", "content": "persona"},
@@ -43,7 +58,7 @@ class TestAx650ChatCompletion(unittest.TestCase):
         response_mock.json.return_value = {"response": "latest answer"}
         response_mock.raise_for_status.return_value = None
 
-        with patch("llm_chat_completion.requests.post", return_value=response_mock) as mocked_post:
+        with patch("llm_chat_completion.llm_client.post", return_value=response_mock) as mocked_post:
             result = llm_chat_completion.chat_completion_ax650(conversation_file)
 
         self.assertEqual(result, "latest answer")
@@ -65,7 +80,7 @@ class TestAx650ChatCompletion(unittest.TestCase):
         }
         response_mock.raise_for_status.return_value = None
 
-        with patch("llm_chat_completion.requests.post", return_value=response_mock):
+        with patch("llm_chat_completion.llm_client.post", return_value=response_mock):
             result = llm_chat_completion.chat_completion_ax650(conversation_file)
 
         self.assertEqual(result, "from response field")
@@ -76,7 +91,7 @@ class TestAx650ChatCompletion(unittest.TestCase):
             {"role": "user", "content": "hello"},
         ])
 
-        with patch("llm_chat_completion.requests.post", side_effect=Exception("network down")):
+        with patch("llm_chat_completion.llm_client.post", side_effect=Exception("network down")):
             result = llm_chat_completion.chat_completion_ax650(conversation_file)
 
         self.assertEqual(result, llm_chat_completion.AX650_FALLBACK_RESPONSE)
@@ -91,7 +106,7 @@ class TestAx650ChatCompletion(unittest.TestCase):
         response_mock.json.return_value = {"message": {"content": "not used"}}
         response_mock.raise_for_status.return_value = None
 
-        with patch("llm_chat_completion.requests.post", return_value=response_mock):
+        with patch("llm_chat_completion.llm_client.post", return_value=response_mock):
             result = llm_chat_completion.chat_completion_ax650(conversation_file)
 
         self.assertEqual(result, llm_chat_completion.AX650_FALLBACK_RESPONSE)
@@ -114,8 +129,8 @@ class TestAx650ChatCompletion(unittest.TestCase):
             call_order.append("reset")
             return post_response
 
-        with patch("llm_chat_completion.requests.get", side_effect=get_side_effect) as mocked_get, patch(
-            "llm_chat_completion.requests.post", side_effect=post_side_effect
+        with patch("llm_chat_completion.llm_client.get", side_effect=get_side_effect) as mocked_get, patch(
+            "llm_chat_completion.llm_client.post", side_effect=post_side_effect
         ) as mocked_post:
             result = llm_chat_completion.ax650_soft_reset_and_reassert_prompt()
 
@@ -133,5 +148,120 @@ class TestAx650ChatCompletion(unittest.TestCase):
         self.assertEqual(reset_payload["system_prompt"], config.SYSTEM_MESSAGE_TEXT)
 
 
+class TestContextWindow(unittest.TestCase):
+    def _conversation(self, turns):
+        messages = [{"role": "system", "content": "persona"}]
+        for index in range(turns):
+            messages.append({"role": "user", "content": f"question {index} " + "x" * 200})
+            messages.append({"role": "assistant", "content": f"answer {index} " + "y" * 200})
+        return messages
+
+    def test_short_conversation_is_sent_unchanged(self):
+        window = llm_chat_completion.ContextWindow(MagicMock(), token_budget=10000, recent_turns=2)
+        messages = self._conversation(3)
+        self.assertEqual(window.build(messages), messages)
+
+    def test_long_conversation_keeps_system_and_recent_turns_within_budget(self):
+        window = llm_chat_completion.ContextWindow(MagicMock(), token_budget=300, recent_turns=2)
+        messages = self._conversation(10)
+
+        sent = window.build(messages)
+
+        self.assertEqual(sent[0], messages[0])
+        self.assertEqual(sent[-4:], messages[-4:])
+        self.assertLess(len(sent), len(messages))
+
+    def test_summary_replaces_older_turns_after_refresh(self):
+        summarize = MagicMock(return_value="I heard about rocket skates.")
+        window = llm_chat_completion.ContextWindow(summarize, token_budget=300, recent_turns=2)
+        messages = self._conversation(10)
+
+        window.build(messages)
+        window.refresh_summary_async()
+        window._worker.join(timeout=5)
+        sent = window.build(messages)
+
+        summarize.assert_called_once()
+        self.assertEqual(sent[1]["role"], "system")
+        self.assertIn("rocket skates", sent[1]["content"])
+        self.assertEqual(sent[-4:], messages[-4:])
+
+    def test_summary_is_dropped_when_conversation_is_replaced(self):
+        summarize = MagicMock(return_value="I heard about rocket skates.")
+        window = llm_chat_completion.ContextWindow(summarize, token_budget=300, recent_turns=2)
+        window.build(self._conversation(10))
+        window.refresh_summary_async()
+        window._worker.join(timeout=5)
+
+        fresh = self._conversation(10)
+        fresh[1] = {"role": "user", "content": "a different evening " + "z" * 200}
+        sent = window.build(fresh)
+
+        self.assertFalse(any("rocket skates" in m["content"] for m in sent))
+
+    def test_stable_prefix_appends_turns_until_a_rebase(self):
+        window = llm_chat_completion.ContextWindow(MagicMock(), token_budget=1200, recent_turns=2, stable_prefix=True)
+        messages = self._conversation(12)
+        previous = window.build(messages)
+        rebases = 0
+        for index in range(12, 30):
+            messages += [{"role": "user", "content": f"question {index} " + "x" * 200},
+                         {"role": "assistant", "content": f"answer {index} " + "y" * 200}]
+            sent = window.build(messages[:-1])
+            self.assertLessEqual(sum(llm_chat_completion._estimate_tokens(m) for m in sent), 1200)
+            self.assertEqual(sent[-1], messages[-2])
+            if sent[:len(previous)] != previous:
+                rebases += 1
+            previous = sent + [messages[-1]]
+
+        # Most turns only append to what was sent before.
+        self.assertLessEqual(rebases, 5)
+
+    def test_prompt_stats_count_messages_the_server_already_holds(self):
+        stats = llm_chat_completion.PromptStats()
+        first = [{"role": "system", "content": "persona"}, {"role": "user", "content": "hi"}]
+        stats.record(first, "hello", {"prompt_eval_count": 20, "prompt_eval_duration": 500_000_000})
+        second = first + [{"role": "assistant", "content": "hello"}, {"role": "user", "content": "skates?"}]
+        self.assertEqual(stats._unchanged(second), 3)
+        stats.record(second, "yes", {"prompt_eval_count": 6, "prompt_eval_duration": 100_000_000})
+
+        self.assertEqual(stats.totals(), {"turns": 2, "prompt_tokens": 28, "evaluated_tokens": 26, "eval_seconds": 0.6})
+
+
+class TestOllamaStream(unittest.TestCase):
+    def test_cancel_while_waiting_for_headers_closes_the_connection(self):
+        # A server still evaluating the prompt: it reads the request and never answers.
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        self.addCleanup(server.close)
+        disconnected = threading.Event()
+
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                while conn.recv(65536):
+                    pass
+            disconnected.set()
+
+        threading.Thread(target=serve, daemon=True).start()
+        self.addCleanup(llm_client.close)
+        conversation = MagicMock()
+        conversation.messages = [{"role": "user", "content": "skates?"}]
+        token = CancelToken("test")
+        threading.Timer(0.2, token.cancel).start()
+
+        started = time.monotonic()
+        endpoint = f"http://127.0.0.1:{server.getsockname()[1]}/api/chat"
+        with patch.multiple(config, create=True, OLLAMA_ENDPOINT=endpoint, OLLAMA_MODEL="coyote", OLLAMA_KEEP_ALIVE=-1), \
+                patch.object(llm_chat_completion, "_ollama_options", return_value={}):
+            chunks = list(llm_chat_completion.chat_completion_ollama_stream(conversation, token))
+
+        self.assertEqual(chunks, [])
+        self.assertLess(time.monotonic() - started, 1)
+        # Ollama stops generating when it sees the connection go.
+        self.assertTrue(disconnected.wait(1))
+
+
 if __name__ == "__main__":
     unittest.main()
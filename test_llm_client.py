@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch
+
+import llm_client
+
+
+class TestLlmClient(unittest.TestCase):
+    def tearDown(self):
+        llm_client.close()
+
+    def test_one_session_per_server(self):
+        first = llm_client.get_session("http://ollama.local:11434/api/chat")
+        self.assertIs(llm_client.get_session("http://ollama.local:11434/api/generate"), first)
+        self.assertIsNot(llm_client.get_session("http://127.0.0.1:8000/api/reset"), first)
+
+    def test_requests_get_default_timeouts_unless_given(self):
+        session = llm_client.get_session("http://ollama.local:11434/api/chat")
+        with patch.object(session, "request") as mocked:
+            llm_client.post("http://ollama.local:11434/api/chat", json={})
+            llm_client.get("http://ollama.local:11434/api/tags", timeout=3)
+
+        self.assertEqual(mocked.call_args_list[0].kwargs["timeout"], llm_client.default_timeout())
+        self.assertEqual(mocked.call_args_list[1].kwargs["timeout"], 3)
+
+    def test_posts_are_not_resent_after_reaching_the_server(self):
+        adapter = llm_client.get_session("http://ollama.local:11434/").get_adapter("http://ollama.local:11434/")
+        self.assertEqual(adapter.max_retries.read, 0)
+        self.assertGreater(adapter.max_retries.connect, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import config
+import llm_chat_completion
+import llm_dispatcher
+from interaction_scheduler import CancelToken
+
+
+def slow(reply, seconds):
+    def backend(conversation):
+        time.sleep(seconds)
+        return reply
+    return backend
+
+
+class TestLlmDispatcher(unittest.TestCase):
+    def setUp(self):
+        settings = {
+            "LLM": "ax650",
+            "LLM_FALLBACK_CHAIN": ["ollama", "canned"],
+            "LLM_BACKEND_DEADLINE_SECONDS": {"ax650": 0.2, "ollama": 0.2},
+            "LLM_HEDGE_AFTER_SECONDS": 0,
+            "LLM_ANSWER_DEADLINE_SECONDS": 2,
+            "LLM_STREAM_CHUNK_DEADLINE_SECONDS": 2,
+            "LLM_CANNED_RESPONSES": ["Meep."],
+        }
+        for name, value in settings.items():
+            p = patch.object(config, name, value, create=True)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def backends(self, ax650, ollama):
+        return patch.multiple(llm_chat_completion, chat_completion_ax650=ax650, chat_completion_ollama=ollama)
+
+    def test_first_backend_answers(self):
+        with self.backends(lambda c: "from ax650", lambda c: "from ollama"):
+            self.assertEqual(llm_chat_completion.llm_chat_completion([]), "from ax650")
+
+    def test_failure_falls_back_to_next_backend(self):
+        def broken(conversation):
+            raise ConnectionError("down")
+
+        with self.backends(broken, lambda c: "from ollama"):
+            self.assertEqual(llm_dispatcher.dispatch([]), "from ollama")
+        with self.backends(lambda c: llm_chat_completion.AX650_FALLBACK_RESPONSE, lambda c: "from ollama"):
+            self.assertEqual(llm_dispatcher.dispatch([]), "from ollama")
+
+    def test_missed_deadline_falls_back(self):
+        with self.backends(slow("too late", 1), lambda c: "from ollama"):
+            started = time.monotonic()
+            self.assertEqual(llm_dispatcher.dispatch([]), "from ollama")
+            self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_hedged_request_wins_when_first_is_slow(self):
+        config.LLM_BACKEND_DEADLINE_SECONDS = {"ax650": 1, "ollama": 1}
+        config.LLM_HEDGE_AFTER_SECONDS = 0.05
+        with self.backends(slow("slow ax650", 0.5), slow("fast ollama", 0.05)):
+            started = time.monotonic()
+            self.assertEqual(llm_dispatcher.dispatch([]), "fast ollama")
+            self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_canned_line_when_nothing_answers_in_time(self):
+        config.LLM_FALLBACK_CHAIN = ["ollama"]
+        config.LLM_ANSWER_DEADLINE_SECONDS = 0.3
+        with self.backends(slow("late", 1), slow("late", 1)):
+            self.assertEqual(llm_dispatcher.dispatch([]), "Meep.")
+
+    def test_silent_stream_falls_back_to_the_rest_of_the_chain(self):
+        config.LLM = "ollama"
+        config.LLM_FALLBACK_CHAIN = ["ax650"]
+
+        def silent_stream(conversation, token=None):
+            token.wait(5)
+            raise ConnectionError("closed")
+            yield
+
+        with patch.object(llm_chat_completion, "chat_completion_ollama_stream", silent_stream), \
+                self.backends(lambda c: "from ax650", None):
+            self.assertEqual(list(llm_dispatcher.stream_with_fallback([])), ["from ax650"])
+
+    def test_fallback_after_a_silent_stream_keeps_the_same_answer_deadline(self):
+        config.LLM = "ollama"
+        config.LLM_FALLBACK_CHAIN = ["ax650"]
+        config.LLM_BACKEND_DEADLINE_SECONDS = {"ollama": 0.4, "ax650": 5}
+        config.LLM_ANSWER_DEADLINE_SECONDS = 0.6
+
+        def silent_stream(conversation, token=None):
+            token.wait(5)
+            return
+            yield
+
+        with patch.object(llm_chat_completion, "chat_completion_ollama_stream", silent_stream), \
+                self.backends(slow("late", 2), None):
+            started = time.monotonic()
+            self.assertEqual(list(llm_dispatcher.stream_with_fallback([])), ["Meep."])
+            self.assertLess(time.monotonic() - started, 0.85)
+
+    def test_stream_that_stalls_mid_reply_is_ended(self):
+        config.LLM = "ollama"
+        config.LLM_BACKEND_DEADLINE_SECONDS = {"ollama": 5}
+        config.LLM_STREAM_CHUNK_DEADLINE_SECONDS = 0.2
+
+        def stalling_stream(conversation, token=None):
+            yield "Rocket skates. "
+            token.wait(5)
+            yield "Too late."
+
+        with patch.object(llm_chat_completion, "chat_completion_ollama_stream", stalling_stream):
+            started = time.monotonic()
+            self.assertEqual(list(llm_dispatcher.stream_with_fallback([])), ["Rocket skates. "])
+            self.assertLess(time.monotonic() - started, 1)
+
+    def test_cancel_while_waiting_for_the_stream_returns_at_once(self):
+        config.LLM = "ollama"
+        config.LLM_BACKEND_DEADLINE_SECONDS = {"ollama": 5}
+
+        def silent_stream(conversation, token=None):
+            token.wait(5)
+            return
+            yield
+
+        token = CancelToken("test")
+        threading.Timer(0.1, token.cancel).start()
+        with patch.object(llm_chat_completion, "chat_completion_ollama_stream", silent_stream):
+            started = time.monotonic()
+            self.assertEqual(list(llm_dispatcher.stream_with_fallback([], token)), [])
+            self.assertLess(time.monotonic() - started, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
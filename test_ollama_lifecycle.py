@@ -0,0 +1,49 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from ollama_lifecycle import OllamaLifecycle
+
+
+class TestOllamaLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        for name in ("ollama_preload_and_warm_prompt", "ollama_keep_warm", "ollama_unload"):
+            p = patch(f"ollama_lifecycle.{name}", side_effect=lambda name=name: self.calls.append(name) or True)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def stop(self, lifecycle):
+        lifecycle.stop()
+        lifecycle.thread.join(2)
+
+    def test_preloads_keeps_warm_and_unloads_on_sleep(self):
+        lifecycle = OllamaLifecycle(awake=True, interval=0.05).start()
+        time.sleep(0.2)
+        lifecycle.sleep()
+        time.sleep(0.1)
+        self.stop(lifecycle)
+
+        self.assertEqual(self.calls[0], "ollama_preload_and_warm_prompt")
+        self.assertIn("ollama_keep_warm", self.calls)
+        self.assertEqual(self.calls[-1], "ollama_unload")
+
+    def test_asleep_at_startup_unloads_once(self):
+        lifecycle = OllamaLifecycle(awake=False, interval=0.05).start()
+        time.sleep(0.2)
+        self.stop(lifecycle)
+
+        self.assertEqual(self.calls, ["ollama_unload"])
+
+    def test_wake_preloads_again(self):
+        lifecycle = OllamaLifecycle(awake=False, interval=10).start()
+        time.sleep(0.05)
+        lifecycle.wake()
+        time.sleep(0.05)
+        self.stop(lifecycle)
+
+        self.assertEqual(self.calls, ["ollama_unload", "ollama_preload_and_warm_prompt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
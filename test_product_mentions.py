@@ -0,0 +1,38 @@
+import unittest
+
+from audio_to_text.product_mentions import ProductIndex, extract_mentions
+
+
+class TestProductMentions(unittest.TestCase):
+    def test_extracts_capitalized_names_and_prices(self):
+        names, prices = extract_mentions("These Acme Rocket Skates go from zero to sixty. Only $19.99 or 3 payments of $7!")
+        self.assertEqual(names, ["Acme Rocket Skates"])
+        self.assertEqual(prices, ["$19.99", "$7"])
+
+    def test_sentence_openers_are_not_names(self):
+        self.assertEqual(extract_mentions("Order now. Call today and get the ShamWow free.")[0], ["ShamWow"])
+        self.assertEqual(extract_mentions("Amazing. I love it.")[0], [])
+
+    def test_ranks_repeated_recent_products_first(self):
+        index = ProductIndex(half_life=60, min_mentions=2)
+        index.add_record({"time": 0.0, "text": "Meet the Snuggie Blanket."})
+        index.add_record({"time": 10.0, "text": "The Snuggie Blanket keeps you warm."})
+        index.add_record({"time": 200.0, "text": "Introducing the ShamWow Mini, just $9.99."})
+        index.add_record({"time": 210.0, "text": "The ShamWow Mini soaks up anything."})
+        index.add_record({"time": 215.0, "text": "Ask for the Kitchen Mop."})
+
+        top = index.top(3, now=220.0)
+        self.assertEqual([p["name"] for p in top], ["ShamWow Mini", "Snuggie Blanket"])
+        self.assertEqual(top[0]["price"], "$9.99")
+        self.assertEqual((top[0]["first_heard"], top[0]["last_heard"]), (200.0, 210.0))
+
+    def test_old_mentions_are_forgotten(self):
+        index = ProductIndex(max_age=60, min_mentions=1)
+        index.add_record({"time": 0.0, "text": "Ask for the Kitchen Mop."})
+        self.assertEqual(len(index.top(now=30.0)), 1)
+        self.assertEqual(index.top(now=61.0), [])
+        self.assertEqual(index.products, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import patch
+
+from response_cache import ResponseCache, response_key
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_key_ignores_punctuation_and_case_but_not_persona(self):
+        self.assertEqual(response_key("Rocket skates, only $19!", "coyote"), response_key("rocket  skates only $19", "coyote"))
+        self.assertNotEqual(response_key("Rocket skates", "coyote"), response_key("Rocket skates", "roadrunner"))
+
+    def test_hits_misses_and_lru_eviction(self):
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", "Skates!")
+        cache.put("b", "Anvils!")
+        self.assertEqual(cache.get("a"), "Skates!")
+        cache.put("c", "Magnets!")
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "Skates!")
+        self.assertEqual(cache.stats(), {"hits": 2, "misses": 2, "entries": 2, "hit_rate": 0.5})
+
+    def test_entries_expire(self):
+        cache = ResponseCache(ttl_seconds=10)
+        with patch("response_cache.time.monotonic", return_value=100.0):
+            cache.put("a", "Skates!")
+        with patch("response_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
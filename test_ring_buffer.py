@@ -0,0 +1,46 @@
+import unittest
+
+from audio_to_text.ring_buffer import PcmRingBuffer
+
+
+class TestPcmRingBuffer(unittest.TestCase):
+    def test_span_across_wrap_is_contiguous(self):
+        ring = PcmRingBuffer(8)
+        ring.write(b"abcdef")
+        ring.write(b"ghij")
+
+        span = ring.span(4, 10)
+        self.assertIsInstance(span, memoryview)
+        self.assertEqual(bytes(span), b"efghij")
+
+    def test_span_is_clamped_to_what_is_held(self):
+        ring = PcmRingBuffer(8)
+        ring.write(b"0123456789ab")
+
+        self.assertEqual(ring.start_position(), 4)
+        self.assertEqual(bytes(ring.span(-100, 100)), b"456789ab")
+
+    def test_preroll_start_before_press(self):
+        ring = PcmRingBuffer(16)
+        ring.write(b"before")
+        press = ring.position()
+        ring.write(b"after!")
+
+        self.assertEqual(bytes(ring.span(press - 2, ring.position())), b"reafter!")
+
+    def test_readinto_write_view(self):
+        ring = PcmRingBuffer(8)
+        ring.write(b"012345")
+        view = ring.write_view(4)
+        self.assertEqual(len(view), 2)
+        view[:] = b"67"
+        ring.commit(2)
+        view = ring.write_view(4)
+        view[:2] = b"89"
+        ring.commit(2)
+
+        self.assertEqual(bytes(ring.span(2, 10)), b"23456789")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import speak_text
+from interaction_scheduler import CancelToken
+from speech_cache import SpeechCache, cache_key
+
+
+class TestSentenceStreaming(unittest.TestCase):
+    def test_split_waits_for_whitespace_after_ending(self):
+        sentences, remainder = speak_text.split_sentences("Only $19.")
+        self.assertEqual(sentences, [])
+        self.assertEqual(remainder, "Only $19.")
+
+        sentences, remainder = speak_text.split_sentences("Only $19.99! Buy it now")
+        self.assertEqual(sentences, ["Only $19.99!"])
+        self.assertEqual(remainder, " Buy it now")
+
+    def test_split_cuts_at_newline(self):
+        sentences, remainder = speak_text.split_sentences("Rocket skates\nAcme")
+        self.assertEqual(sentences, ["Rocket skates"])
+        self.assertEqual(remainder, "Acme")
+
+    def test_speak_streamed_speaks_sentences_as_they_complete(self):
+        spoken = []
+        chunks = ["I need ", "those skates. They ", "will catch him! And", " then"]
+        with patch("speak_text.speak_text", side_effect=lambda text, token=None: spoken.append(text)):
+            sentences = speak_text.speak_streamed(iter(chunks), str.strip)
+
+        self.assertEqual(sentences, ["I need those skates.", "They will catch him!"])
+        self.assertEqual(spoken, sentences)
+
+    def test_speak_streamed_speaks_final_sentence_without_trailing_space(self):
+        spoken = []
+        with patch("speak_text.speak_text", side_effect=lambda text, token=None: spoken.append(text)):
+            sentences = speak_text.speak_streamed(iter(["Hi there. Bye now."]), str.strip)
+
+        self.assertEqual(sentences, ["Hi there.", "Bye now."])
+        self.assertEqual(spoken, sentences)
+
+    def test_reply_sentences_match_what_is_streamed(self):
+        with patch("speak_text.speak_text"):
+            sentences = speak_text.speak_streamed(iter(["Buy now. ", "Call today."]), str.strip)
+        self.assertEqual(sentences, ["Buy now.", "Call today."])
+        self.assertEqual(speak_text.reply_sentences("Buy now. Call today.", str.strip), sentences)
+
+    def test_speak_streamed_keeps_reply_without_ending(self):
+        with patch("speak_text.speak_text"):
+            sentences = speak_text.speak_streamed(iter(["Meep meep"]), str.strip)
+        self.assertEqual(sentences, ["Meep meep"])
+
+    def test_speak_streamed_returns_spoken_part_when_stream_fails(self):
+        def chunks():
+            yield "First one. "
+            raise ConnectionError("dropped")
+
+        with patch("speak_text.speak_text"):
+            sentences = speak_text.speak_streamed(chunks(), str.strip)
+        self.assertEqual(sentences, ["First one."])
+
+    def test_barge_in_keeps_only_what_was_said(self):
+        from interaction_scheduler import CancelToken
+        token = CancelToken()
+
+        def fake_speak(text, token=None):
+            if text.startswith("Second"):
+                # The listener barges in half way through the second sentence.
+                token.cancel()
+                return 0.5
+            return 1.0
+
+        with patch("speak_text.speak_text", side_effect=fake_speak):
+            sentences = speak_text.speak_streamed(
+                iter(["First one. Second one has six words here. Third one. "]), str.strip, token=token)
+        self.assertEqual(sentences, ["First one.", "Second one has..."])
+
+    def test_spoken_part_keeps_json_quoting(self):
+        self.assertEqual(speak_text.spoken_part('"Buy the rocket skates today."', 0.6), '"Buy the rocket..."')
+        self.assertEqual(speak_text.spoken_part("Meep meep.", 0.1), "")
+
+
+class TestSpeechCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_ignores_whitespace_but_not_voice(self):
+        self.assertEqual(cache_key("Meep  meep.\n", "/voices/a.onnx"), cache_key("Meep meep.", "/other/a.onnx"))
+        self.assertNotEqual(cache_key("Meep meep.", "/voices/a.onnx"), cache_key("Meep meep.", "/voices/b.onnx"))
+
+    def test_key_changes_when_the_voice_file_is_replaced(self):
+        model_path = os.path.join(self.directory, "voice.onnx")
+        with open(model_path, "wb") as f:
+            f.write(b"old voice")
+        old_key = cache_key("Meep meep.", model_path)
+        with open(model_path, "wb") as f:
+            f.write(b"retrained voice")
+
+        self.assertNotEqual(cache_key("Meep meep.", model_path), old_key)
+
+    def test_put_then_get_counts_hits_and_misses(self):
+        cache = SpeechCache(self.directory)
+        self.assertIsNone(cache.get("hello", "voice.onnx"))
+        cache.put("hello", "voice.onnx", b"\x01\x00" * 10)
+
+        self.assertEqual(cache.get("hello", "voice.onnx"), b"\x01\x00" * 10)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SpeechCache(self.directory, max_bytes=250)
+        cache.put("first", "voice.onnx", b"a" * 100)
+        cache.put("second", "voice.onnx", b"b" * 100)
+        old = time.time() - 60
+        os.utime(os.path.join(self.directory, cache_key("second", "voice.onnx") + ".pcm"), (old, old))
+        cache.put("third", "voice.onnx", b"c" * 100)
+
+        self.assertIsNotNone(cache.get("first", "voice.onnx"))
+        self.assertIsNone(cache.get("second", "voice.onnx"))
+        self.assertLessEqual(cache.total_bytes, 250)
+
+    def test_prerender_stops_between_phrases_once_cancelled(self):
+        token = CancelToken("draft")
+        rendered = []
+
+        def render(safe_text, model_path):
+            rendered.append(safe_text)
+            token.cancel()
+
+        with patch("speak_text._resolve_piper_model_path", return_value="voice.onnx"), \
+                patch("speak_text._can_prerender", return_value=True), \
+                patch("speak_text.get_cache", return_value=SpeechCache(self.directory)), \
+                patch("speak_text.render_speech", side_effect=render):
+            speak_text.prerender_phrases(["Rocket skates!", "Roadrunner is doomed."], token)
+
+        self.assertEqual(len(rendered), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
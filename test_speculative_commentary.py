@@ -0,0 +1,75 @@
+import types
+import unittest
+from unittest.mock import patch
+
+import speculative_commentary
+from speculative_commentary import SpeculativeCommentary, start_speculative_commentary, transcript_similarity
+
+WINDOW = ["The Acme rocket skates are only $19.99", "Call now and get a second pair free"]
+
+
+class FakeConversation:
+    def __init__(self):
+        self.messages = [{"role": "system", "content": "You are Wile E. Coyote."}]
+
+
+class TestSpeculativeCommentary(unittest.TestCase):
+    def setUp(self):
+        self.conversation = FakeConversation()
+        television = types.SimpleNamespace(
+            recent_transcript_lines=lambda: WINDOW,
+            television_prompt=lambda lines: ("Here's what you heard: " + " ".join(lines).lower(), ""),
+            clean_response=str.strip,
+        )
+        self.speculator = SpeculativeCommentary(self.conversation, television)
+        self.requests = []
+
+        def fake_stream(draft, token=None):
+            self.requests.append(draft.messages)
+            yield "Rocket skates! "
+            yield "Roadrunner is doomed."
+
+        patches = [
+            patch("speculative_commentary.llm_chat_completion_stream", side_effect=fake_stream),
+            patch("speculative_commentary.prerender_phrases"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_similarity(self):
+        self.assertEqual(transcript_similarity(WINDOW, list(WINDOW)), 1.0)
+        self.assertLess(transcript_similarity(WINDOW, ["Tonight: a diamond tennis bracelet"]), 0.1)
+
+    def test_draft_is_used_while_transcript_and_conversation_are_unchanged(self):
+        self.speculator.refresh()
+        self.speculator.refresh()
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.requests[0][-1]["role"], "user")
+        self.assertIn("rocket skates", self.requests[0][-1]["content"])
+        phrases, token = speculative_commentary.prerender_phrases.call_args.args
+        self.assertEqual(phrases, ["Rocket skates!", "Roadrunner is doomed."])
+        # The draft's own token, so a press stops the rendering too.
+        self.assertFalse(token.cancelled)
+
+        candidate = self.speculator.take(WINDOW, self.conversation)
+        self.assertEqual(candidate.reply, "Rocket skates! Roadrunner is doomed.")
+        # Used up by the press.
+        self.assertIsNone(self.speculator.take(WINDOW, self.conversation))
+
+    def test_draft_is_dropped_when_stale(self):
+        self.speculator.refresh()
+        self.assertIsNone(self.speculator.take(["Tonight: a diamond tennis bracelet"], self.conversation))
+
+        self.speculator.refresh()
+        self.conversation.messages.append({"role": "user", "content": "Hello coyote"})
+        self.assertIsNone(self.speculator.take(WINDOW, self.conversation))
+
+    def test_not_started_for_ax650(self):
+        config = types.SimpleNamespace(SPECULATIVE_COMMENTARY=True, LLM="ax650")
+        self.assertIsNone(start_speculative_commentary(config, self.conversation))
+
+
+if __name__ == "__main__":
+    unittest.main()
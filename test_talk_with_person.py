@@ -0,0 +1,67 @@
+import json
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import patch
+
+# The LEDs need gpiozero and a Raspberry Pi; they are not what is under test here.
+_leds = types.SimpleNamespace(start_led=lambda gpio, pattern: None, stop_led=lambda thread: None)
+with patch.dict(sys.modules, {"leds.led_manager": _leds}):
+    import talk_with_person
+
+
+class FakeConversation:
+    def __init__(self):
+        self.messages = []
+
+    def append(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+    def write_text(self, path, text):
+        pass
+
+
+class TestTalkWithPerson(unittest.TestCase):
+    def setUp(self):
+        self.spoken = []
+        patches = [
+            patch.object(talk_with_person, "capture_intercom_speech", return_value="What should I buy?"),
+            patch.object(talk_with_person, "llm_chat_completion_stream", return_value=iter(["   "])),
+            patch.object(talk_with_person, "speak_text", side_effect=lambda text, token=None: self.spoken.append(text)),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_empty_text_cleans_to_nothing(self):
+        self.assertEqual(talk_with_person.clean_response(' "" '), "")
+        self.assertEqual(talk_with_person.clean_response('Buy "rockets".'), json.dumps("Buy rockets."))
+
+    def test_empty_stream_falls_back_to_a_plain_completion(self):
+        conversation = FakeConversation()
+        with patch.object(talk_with_person, "llm_chat_completion", return_value="Rocket skates!"):
+            talk_with_person.talk_with_person(conversation=conversation)
+
+        self.assertEqual(self.spoken, [json.dumps("Rocket skates!")])
+        self.assertEqual(conversation.messages[-1], {"role": "assistant", "content": json.dumps("Rocket skates!")})
+
+    def test_failed_fallback_says_so(self):
+        with patch.object(talk_with_person, "llm_chat_completion", side_effect=RuntimeError("down")):
+            talk_with_person.talk_with_person(conversation=FakeConversation())
+
+        self.assertEqual(self.spoken, [json.dumps(talk_with_person.LLM_ERROR_RESPONSE)])
+
+
+class TestCaptureIntercomSpeech(unittest.TestCase):
+    def test_failed_resident_capture_does_not_start_whisper_stream(self):
+        service = types.SimpleNamespace(capture_utterance=lambda bm, pressed_at=None: None)
+        with patch.object(talk_with_person, "get_person_speech_service", return_value=service), \
+                patch.object(talk_with_person, "_capture_with_whisper_stream") as whisper_stream, \
+                patch.object(talk_with_person.config, "CONVERSATION_DATA_PATH", tempfile.mkdtemp()):
+            self.assertEqual(talk_with_person.capture_intercom_speech(bm=object()), "")
+        whisper_stream.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
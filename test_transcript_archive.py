@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from audio_to_text import transcript_archive
+from audio_to_text.transcript_archive import TranscriptLog, last_archived_lines, lines_between
+
+
+class TestTranscriptArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.directory, "transcription.txt")
+        self.archive_dir = os.path.join(self.directory, "archive")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _index(self):
+        with open(os.path.join(self.archive_dir, transcript_archive.INDEX_FILE), "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_rotates_by_size_into_multi_member_gzip(self):
+        log = TranscriptLog(self.log_path, self.archive_dir, rotate_bytes=200)
+        for minute in range(10):
+            log.write(f"minute {minute} was about a steak knife", captured_at=1000.0 + minute * 60)
+        log.close()
+
+        segments = self._index()
+        self.assertGreaterEqual(len(segments), 1)
+        first = segments[0]
+        self.assertEqual(first["start"], 1000.0)
+        self.assertGreater(len(first["members"]), 1)
+        with gzip.open(os.path.join(self.archive_dir, first["file"]), "rt", encoding="utf-8") as f:
+            self.assertTrue(f.readline().startswith("minute 0"))
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            self.assertIn("minute 9", f.read())
+
+    def test_lines_between_reads_only_the_matching_window(self):
+        log = TranscriptLog(self.log_path, self.archive_dir, rotate_bytes=200)
+        for minute in range(10):
+            log.write(f"minute {minute}", captured_at=1000.0 + minute * 60)
+        log.close()
+
+        lines = lines_between(self.log_path, self.archive_dir, 1000.0 + 3 * 60, 1000.0 + 4 * 60)
+        self.assertIn("minute 3", lines)
+        self.assertNotIn("minute 0", lines)
+        self.assertNotIn("minute 9", lines)
+        # The live file is part of the lookup too.
+        self.assertIn("minute 9", lines_between(self.log_path, self.archive_dir, 1000.0 + 9 * 60, 2000.0))
+
+    def test_interrupted_rotation_is_finished_on_restart(self):
+        log = TranscriptLog(self.log_path, self.archive_dir)
+        log.write("half rotated", captured_at=1000.0)
+        log.close()
+        os.replace(self.log_path, self.log_path + ".rotating")
+
+        TranscriptLog(self.log_path, self.archive_dir).close()
+
+        self.assertFalse(os.path.exists(self.log_path + ".rotating"))
+        self.assertEqual(self._index()[0]["start"], 1000.0)
+
+    def test_segments_starting_in_the_same_second_are_all_kept(self):
+        log = TranscriptLog(self.log_path, self.archive_dir, rotate_bytes=100)
+        for index in range(3):
+            log.write(f"line {index} " + "x" * 120, captured_at=1000.0 + index * 0.2)
+        log.close()
+
+        files = [segment["file"] for segment in self._index()]
+        self.assertEqual(len(files), 2)
+        self.assertEqual(len(set(files)), 2)
+        self.assertTrue(all(os.path.exists(os.path.join(self.archive_dir, name)) for name in files))
+
+    def test_last_archived_lines_reads_the_tail_of_the_newest_segment(self):
+        self.assertEqual(last_archived_lines(self.archive_dir, 3), [])
+        log = TranscriptLog(self.log_path, self.archive_dir, rotate_bytes=90)
+        for minute in range(11):
+            log.write(f"minute {minute}", captured_at=1000.0 + minute * 60)
+        log.close()
+
+        self.assertEqual(last_archived_lines(self.archive_dir, 3), ["minute 7", "minute 8", "minute 9"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+
+from transcript_dedupe import WindowIndex, estimated_similarity, minhash
+
+PITCH = ("These rocket skates go from zero to sixty in under four seconds. "
+         "Order now and get a second pair free, just $19.99 plus shipping.")
+PITCH_AGAIN = ("These Rocket Skates go from zero to sixty in under four seconds! "
+               "Order now and get a second pair free, only $19.99 plus shipping.")
+OTHER = "Tonight only, a diamond tennis bracelet in fourteen karat white gold, call the number on your screen."
+
+
+class TestTranscriptDedupe(unittest.TestCase):
+    def test_similarity_of_repeats_and_different_pitches(self):
+        self.assertEqual(estimated_similarity(minhash(PITCH), minhash(PITCH)), 1.0)
+        self.assertGreater(estimated_similarity(minhash(PITCH), minhash(PITCH_AGAIN)), 0.6)
+        self.assertLess(estimated_similarity(minhash(PITCH), minhash(OTHER)), 0.2)
+        self.assertIsNone(minhash("..."))
+
+    def test_index_matches_near_repeats_only(self):
+        index = WindowIndex(threshold=0.6)
+        index.add(PITCH, "Skates! I'll take three.")
+
+        similarity, window = index.match(PITCH_AGAIN)
+        self.assertGreaterEqual(similarity, 0.6)
+        self.assertEqual(window.reply, "Skates! I'll take three.")
+        self.assertEqual(index.match(OTHER), (0.0, None))
+        self.assertEqual(index.repeats, 1)
+
+    def test_old_windows_are_forgotten(self):
+        index = WindowIndex(max_windows=2, max_age=60)
+        with patch("transcript_dedupe.time.monotonic", return_value=100.0):
+            index.add(PITCH, "Skates!")
+        with patch("transcript_dedupe.time.monotonic", return_value=161.0):
+            self.assertEqual(index.match(PITCH), (0.0, None))
+
+        index.add(PITCH, "Skates!")
+        index.add(OTHER, "Sparkly.")
+        index.add("Anvils by the dozen, delivered from a great height.", "Ouch.")
+        self.assertEqual(index.match(PITCH), (0.0, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
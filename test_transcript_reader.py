@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from audio_to_text.transcript_reader import TranscriptTail
+
+
+class TestTranscriptTail(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "transcription.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _append(self, text):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_last_lines_of_large_file(self):
+        self._append("".join(f"line {i}\n" for i in range(50000)))
+        tail = TranscriptTail(self.path, max_lines=20)
+
+        self.assertEqual(tail.last_lines(3), ["line 49997", "line 49998", "line 49999"])
+        self.assertEqual(len(tail.starts), 21)
+
+    def test_appended_lines_are_indexed_incrementally(self):
+        self._append("one\ntwo\n")
+        tail = TranscriptTail(self.path)
+        self.assertEqual(tail.last_lines(5), ["one", "two"])
+
+        self._append("three\nfour")
+        self.assertEqual(tail.last_lines(2), ["three", "four"])
+        self._append(" more\n\n")
+        # Blank lines count toward n, as with readlines()[-n:], and are then dropped.
+        self.assertEqual(tail.last_lines(3), ["three", "four more"])
+
+    def test_truncated_or_missing_file(self):
+        tail = TranscriptTail(self.path)
+        self.assertEqual(tail.last_lines(5), [])
+
+        self._append("old\n" * 10)
+        self.assertEqual(tail.last_lines(1), ["old"])
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("new\n")
+        self.assertEqual(tail.last_lines(5), ["new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from audio_to_text.transcript_records import is_usable, record_from_whisper_segment, strip_tags
+
+
+class TestTranscriptRecords(unittest.TestCase):
+    def test_strip_tags_keeps_ordinary_parentheses(self):
+        self.assertEqual(strip_tags(" [BLANK_AUDIO]"), "")
+        self.assertEqual(strip_tags("(upbeat music)"), "")
+        self.assertEqual(strip_tags("Call now (operators are standing by) (applause)"),
+                         "Call now (operators are standing by)")
+
+    def test_record_from_verbose_json_segment(self):
+        segment = {"start": 1.5, "end": 4.0, "text": " Three easy payments [MUSIC]",
+                   "avg_logprob": -0.1, "no_speech_prob": 0.02}
+        record = record_from_whisper_segment(segment, offset=1000.0)
+
+        self.assertEqual(record["time"], 1001.5)
+        self.assertEqual(record["end"], 1004.0)
+        self.assertEqual(record["text"], "Three easy payments")
+        self.assertAlmostEqual(record["avg_prob"], 0.905, places=3)
+        self.assertFalse(record["no_speech"])
+        self.assertTrue(is_usable(record))
+
+    def test_word_probabilities_are_used_without_avg_logprob(self):
+        segment = {"start": 0, "end": 1, "text": "Knives", "words": [{"probability": 0.2}, {"probability": 0.3}]}
+        record = record_from_whisper_segment(segment, offset=0)
+
+        self.assertEqual(record["avg_prob"], 0.25)
+        self.assertFalse(is_usable(record))
+
+    def test_junk_is_not_usable(self):
+        self.assertFalse(is_usable({"text": "Thanks for watching!", "avg_prob": 0.9, "no_speech": False}))
+        self.assertFalse(is_usable({"text": "Order today", "avg_prob": 0.9, "no_speech": True}))
+        self.assertTrue(is_usable({"text": "Order today", "avg_prob": None, "no_speech": False}))
+
+    def test_short_thanks_is_kept_only_when_whisper_is_confident(self):
+        self.assertTrue(is_usable({"text": "Thank you!", "avg_prob": 0.92, "no_speech": False}))
+        self.assertFalse(is_usable({"text": "Thank you.", "avg_prob": 0.5, "no_speech": False}))
+        self.assertFalse(is_usable({"text": "you", "avg_prob": None, "no_speech": False}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from audio_to_text import transcript_service
+from audio_to_text.product_mentions import ProductIndex
+from audio_to_text.transcript_service import TranscriptRing
+
+
+class TestTranscriptService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "transcript.sock")
+        self.ring = TranscriptRing(max_segments=3)
+        self.products = ProductIndex()
+        self.server = transcript_service.start_transcript_server(self.ring, self.socket_path, self.products)
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_ring_is_bounded(self):
+        for index in range(5):
+            self.ring.add(f"segment {index}", captured_at=index)
+        self.assertEqual([s["text"] for s in self.ring.last(10)], ["segment 2", "segment 3", "segment 4"])
+
+    def test_last_and_since_over_socket(self):
+        self.ring.add("old", captured_at=100.0)
+        self.ring.add("new", captured_at=200.0)
+
+        last = transcript_service.last_segments(1, self.socket_path)
+        self.assertEqual(last, [{"time": 200.0, "text": "new"}])
+        since = transcript_service.segments_since(150.0, self.socket_path)
+        self.assertEqual([s["text"] for s in since], ["new"])
+
+    def test_unreachable_socket_returns_none(self):
+        missing = os.path.join(self.directory, "missing.sock")
+        self.assertIsNone(transcript_service.last_segments(1, missing))
+
+    def test_top_products_over_socket(self):
+        self.assertEqual(transcript_service.top_products(1, self.socket_path), [])
+        self.products.add_record({"time": time.time(), "text": "The Acme Rocket Skates are only $19.99."})
+        self.products.add_record({"time": time.time(), "text": "Get your Acme Rocket Skates today."})
+
+        top = transcript_service.top_products(1, self.socket_path)
+        self.assertEqual([(p["name"], p["mentions"], p["price"]) for p in top], [("Acme Rocket Skates", 2, "$19.99")])
+
+    def test_subscribe_receives_backlog_and_new_segments(self):
+        self.ring.add("before", captured_at=100.0)
+        received = []
+        subscribed = threading.Event()
+
+        def listen():
+            stream = transcript_service.subscribe(self.socket_path, since_time=0)
+            for segment in stream:
+                received.append(segment["text"])
+                subscribed.set()
+                if len(received) == 2:
+                    stream.close()
+                    return
+
+        listener = threading.Thread(target=listen, daemon=True)
+        listener.start()
+        self.assertTrue(subscribed.wait(2))
+        self.ring.add("after")
+        listener.join(2)
+
+        self.assertEqual(received, ["before", "after"])
+
+
+if __name__ == "__main__":
+    unittest.main()
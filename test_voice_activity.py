@@ -0,0 +1,75 @@
+import array
+import math
+import random
+import unittest
+
+from audio_to_text.voice_activity import VoiceActivitySegmenter
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude, frequency=220):
+    count = int(seconds * SAMPLE_RATE)
+    return array.array("h", (int(amplitude * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE))
+                             for i in range(count))).tobytes()
+
+
+def silence(seconds):
+    return bytes(int(seconds * SAMPLE_RATE) * 2)
+
+
+class TestVoiceActivitySegmenter(unittest.TestCase):
+    def test_speech_between_pauses_is_one_segment(self):
+        segmenter = VoiceActivitySegmenter(SAMPLE_RATE)
+        segments = segmenter.feed(silence(2) + tone(1.5, 8000) + silence(1))
+
+        self.assertEqual(len(segments), 1)
+        start, pcm = segments[0]
+        # Starts a little before the speech and ends a little after it.
+        self.assertTrue(1.6 < start < 2.0)
+        self.assertGreater(len(pcm), int(1.5 * SAMPLE_RATE) * 2)
+        self.assertLess(len(pcm), int(2.2 * SAMPLE_RATE) * 2)
+        self.assertGreater(segmenter.fraction_skipped(), 0.5)
+
+    def test_short_click_is_not_sent(self):
+        segmenter = VoiceActivitySegmenter(SAMPLE_RATE)
+        segments = segmenter.feed(silence(1) + tone(0.12, 8000) + silence(1))
+
+        self.assertEqual(segments, [])
+        self.assertEqual(segmenter.seconds_sent, 0)
+
+    def test_long_speech_is_cut_at_the_quietest_point(self):
+        segmenter = VoiceActivitySegmenter(SAMPLE_RATE, max_segment_seconds=4)
+        speech = tone(2.9, 8000) + tone(0.09, 1500) + tone(2, 8000)
+        segments = segmenter.feed(silence(1) + speech + silence(1))
+
+        self.assertEqual(len(segments), 2)
+        # The second segment picks up exactly where the first was cut.
+        (first_start, first), (second_start, _) = segments
+        self.assertAlmostEqual(second_start, first_start + len(first) / 2 / SAMPLE_RATE)
+
+    def test_steady_noise_after_silence_stops_counting_as_speech(self):
+        rng = random.Random(1)
+        noise = array.array("h", (max(-32768, min(32767, int(rng.gauss(0, 2000))))
+                                  for _ in range(60 * SAMPLE_RATE))).tobytes()
+        segmenter = VoiceActivitySegmenter(SAMPLE_RATE)
+        segmenter.feed(silence(2) + noise)
+
+        # Only the first floor window of noise gets through.
+        self.assertGreater(segmenter.fraction_skipped(), 0.8)
+
+    def test_speech_is_still_found_over_steady_noise(self):
+        rng = random.Random(2)
+
+        def noise(seconds):
+            return array.array("h", (int(rng.gauss(0, 300)) for _ in range(int(seconds * SAMPLE_RATE)))).tobytes()
+
+        segmenter = VoiceActivitySegmenter(SAMPLE_RATE)
+        segmenter.feed(noise(10))
+        segments = segmenter.feed(tone(1.5, 8000) + noise(1))
+
+        self.assertEqual(len(segments), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
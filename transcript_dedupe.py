@@ -0,0 +1,118 @@
+"""
+Near-duplicate detection for TV transcript windows.
+
+Home-shopping channels repeat the same pitch many times with small
+differences in wording and in how whisper hears it, so the exact-match
+response cache misses them. Each window the coyote comments on is reduced to
+a MinHash signature of its word pairs; a new window whose estimated
+similarity to a recent one reaches the threshold is a repeat. Everything is
+local and takes well under a millisecond for a few lines of transcript.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+
+NUM_PERMUTATIONS = 64
+SHINGLE_WORDS = 2
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_MAX_WINDOWS = 16
+DEFAULT_MAX_AGE_SECONDS = 900
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must be comparable across calls.
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(text):
+    """The set of overlapping SHINGLE_WORDS-word runs in `text`, ignoring case and punctuation."""
+    words = re.findall(r"[a-z0-9$][a-z0-9$']*(?:\.[0-9]+)?", text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text):
+    """MinHash signature of `text`, or None if it has no words."""
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+              for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimated_similarity(signature, other_signature):
+    """Estimated Jaccard similarity of the word pairs behind two signatures, from 0.0 to 1.0."""
+    if signature is None or other_signature is None:
+        return 0.0
+    return sum(x == y for x, y in zip(signature, other_signature)) / NUM_PERMUTATIONS
+
+
+class Window:
+    """A transcript window that was commented on, and the reply it got."""
+
+    def __init__(self, transcript, reply, signature):
+        self.transcript = transcript
+        self.reply = reply
+        self.signature = signature
+        self.seen_at = time.monotonic()
+
+
+class WindowIndex:
+    """The most recent commented-on windows, searched for near duplicates of a new one."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_windows=DEFAULT_MAX_WINDOWS,
+                 max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.threshold = threshold
+        self.max_windows = max_windows
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.windows = []
+        self.repeats = 0
+
+    def match(self, transcript):
+        """Return (similarity, Window) for the closest recent window at or above the threshold, else (0.0, None)."""
+        signature = minhash(transcript)
+        best, best_similarity = None, 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.windows = [w for w in self.windows if now - w.seen_at <= self.max_age]
+            for window in self.windows:
+                similarity = estimated_similarity(signature, window.signature)
+                if similarity > best_similarity:
+                    best, best_similarity = window, similarity
+            if best_similarity < self.threshold:
+                return 0.0, None
+            self.repeats += 1
+            return best_similarity, best
+
+    def add(self, transcript, reply):
+        signature = minhash(transcript)
+        if signature is None:
+            return
+        with self.lock:
+            self.windows.append(Window(transcript, reply, signature))
+            del self.windows[:-self.max_windows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_window_index():
+    """Return the shared WindowIndex, or None when TRANSCRIPT_DEDUPE is off in config."""
+    global _index
+    import config
+    if not getattr(config, "TRANSCRIPT_DEDUPE", False):
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = WindowIndex(
+                getattr(config, "TRANSCRIPT_DEDUPE_THRESHOLD", DEFAULT_THRESHOLD),
+                getattr(config, "TRANSCRIPT_DEDUPE_WINDOWS", DEFAULT_MAX_WINDOWS),
+                getattr(config, "TRANSCRIPT_DEDUPE_MAX_AGE_SECONDS", DEFAULT_MAX_AGE_SECONDS),
+            )
+        return _index